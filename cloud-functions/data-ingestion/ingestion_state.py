@@ -0,0 +1,61 @@
+"""
+Per-source high-water mark untuk incremental ingestion
+State disimpan sebagai object JSON kecil di bucket: {STATE_FOLDER}/{source}.json
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+STATE_FOLDER = 'state'
+
+
+def state_blob_name(source, folder=STATE_FOLDER):
+    return f"{folder}/{source}.json"
+
+
+def load_state(bucket, source, folder=STATE_FOLDER):
+    """
+    Ambil state source dari bucket; {} jika belum pernah ada run
+
+    Fields: watermark, watermark_type ('timestamp'/'cursor'), etag, last_modified
+    """
+    blob = bucket.blob(state_blob_name(source, folder))
+    if not blob.exists():
+        logger.info(f"No ingestion state for source '{source}', running full fetch")
+        return {}
+    state = json.loads(blob.download_as_bytes())
+    logger.info(f"Loaded ingestion state for '{source}': watermark={state.get('watermark')}")
+    return state
+
+
+def save_state(bucket, source, state, folder=STATE_FOLDER):
+    """Simpan state source (dipanggil setelah data tersimpan dan ETL ter-trigger)"""
+    state = dict(state, source=source, updated_at=datetime.now(timezone.utc).isoformat())
+    bucket.blob(state_blob_name(source, folder)).upload_from_string(
+        json.dumps(state),
+        content_type='application/json'
+    )
+    logger.info(f"Saved ingestion state for '{source}': watermark={state.get('watermark')}")
+    return state
+
+
+def compute_watermark(records, updated_field, previous=None, fallback=None):
+    """
+    High-water mark baru = nilai updated_field terbesar di records
+
+    Timestamp ISO-8601 dengan format yang sama dibandingkan sebagai string.
+    Jika records tidak punya updated_field, pakai fallback (waktu mulai fetch - overlap).
+    """
+    latest = None
+    for record in records:
+        value = record.get(updated_field)
+        if value is not None and (latest is None or str(value) > latest):
+            latest = str(value)
+    if latest is None:
+        latest = fallback
+    if previous is not None and latest is not None and str(previous) > latest:
+        return previous
+    return latest if latest is not None else previous
@@ -4,14 +4,25 @@ Mengambil data dari API/sumber eksternal dan menyimpan ke Cloud Storage
 """
 
 import functions_framework
-from google.cloud import storage
-from google.cloud import pubsub_v1
-import requests
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import logging
 import os
 import random
+import base64
+
+from shared.clients import client_stats, get_storage_client
+from shared.metrics import instrumented, span
+from shared.publisher import BatchPublisher
+from shared.raw_format import raw_blob_name, write_raw_blob
+from shared.sharding import write_shards
+# requests, pyarrow/numpy dan GCP SDK di-import lazy di code path yang memakainya,
+# jadi cold start health_check dan HTTP wrapper tidak memuatnya
+from ingestion_state import compute_watermark, load_state, save_state
+from snapshot_diff import diff_snapshot, index_blob_name, load_index, save_index
+from source_api import (
+    FetchStats, build_headers, extract_records, fetch_conditional, fetch_pages, get_session
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +32,61 @@ logger = logging.getLogger(__name__)
 PROJECT_ID = os.environ.get('GCP_PROJECT')
 BUCKET_NAME = os.environ.get('BUCKET_NAME', 'umkm-data-lake')
 RAW_FOLDER = os.environ.get('RAW_FOLDER', 'raw')
+# Format raw blob: 'json' (envelope lama), 'ndjson.gz' atau 'parquet'
+RAW_FORMAT = os.environ.get('RAW_FORMAT', 'json').lower()
+# Batas ukuran shard (bytes, NDJSON belum dikompresi); 0 = satu blob per run
+RAW_SHARD_MAX_BYTES = int(os.environ.get('RAW_SHARD_MAX_BYTES', '0'))
+RAW_UPLOAD_WORKERS = int(os.environ.get('RAW_UPLOAD_WORKERS', '4'))
+# Jumlah record sample per run (USE_SAMPLE_DATA=true), mis. untuk run lokal/benchmark
+SAMPLE_DATA_ROWS = int(os.environ.get('SAMPLE_DATA_ROWS', '100'))
+
+# Pagination settings: 'none' (single request), 'offset' atau 'cursor'
+API_PAGINATION = os.environ.get('API_PAGINATION', 'none').lower()
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '1000'))
+API_MAX_IN_FLIGHT = int(os.environ.get('API_MAX_IN_FLIGHT', '4'))
+API_RECORDS_KEY = os.environ.get('API_RECORDS_KEY', 'data')
+
+# Request executor: rate limit adaptif, retry, circuit breaker dan hedged requests
+API_TIMEOUT = float(os.environ.get('API_TIMEOUT', '30'))
+API_RATE_LIMIT = float(os.environ.get('API_RATE_LIMIT', '10'))
+API_MAX_RETRIES = int(os.environ.get('API_MAX_RETRIES', '5'))
+# Jumlah request beruntun yang gagal setelah retry habis sebelum circuit open
+API_CIRCUIT_THRESHOLD = int(os.environ.get('API_CIRCUIT_THRESHOLD', '5'))
+API_CIRCUIT_COOLDOWN = float(os.environ.get('API_CIRCUIT_COOLDOWN', '30'))
+# Hedging menambah request ke source API (tetap lewat rate limiter), jadi opt-in
+API_HEDGE = os.environ.get('API_HEDGE', 'false').lower() == 'true'
+
+# Incremental ingestion (opt-in): hanya ambil record yang berubah sejak high-water mark
+INCREMENTAL_INGESTION = os.environ.get('INCREMENTAL_INGESTION', 'false').lower() == 'true'
+SOURCE_NAME = os.environ.get('SOURCE_NAME', 'api')
+API_SINCE_PARAM = os.environ.get('API_SINCE_PARAM', 'updated_since')
+API_UPDATED_FIELD = os.environ.get('API_UPDATED_FIELD', 'updated_at')
+# Jika API mengembalikan sync cursor di envelope, cursor dipakai sebagai watermark
+API_SYNC_CURSOR_KEY = os.environ.get('API_SYNC_CURSOR_KEY', 'sync_cursor')
+API_CURSOR_SINCE_PARAM = os.environ.get('API_CURSOR_SINCE_PARAM', 'since_cursor')
+# Tanpa sync cursor dan tanpa API_UPDATED_FIELD di records, watermark = waktu mulai
+# fetch dikurangi overlap ini (detik), supaya perubahan yang commit di source
+# selama fetch berjalan tidak terlewat di run berikutnya
+API_WATERMARK_OVERLAP = float(os.environ.get('API_WATERMARK_OVERLAP', '300'))
+STATE_FOLDER = os.environ.get('STATE_FOLDER', 'state')
+# Statistik detail per run (fetch/request/snapshot diff) sebagai object terpisah;
+# blob metadata GCS dibatasi 8 KiB, jadi raw blob hanya menyimpan nama object ini
+STATS_FOLDER = os.environ.get('STATS_FOLDER', 'ingestion-stats')
+
+# Snapshot diffing: hanya ingest record yang berubah dibanding snapshot sebelumnya
+SNAPSHOT_DIFF = os.environ.get('SNAPSHOT_DIFF', 'false').lower() == 'true'
+SNAPSHOT_IGNORE_FIELDS = tuple(
+    field.strip()
+    for field in os.environ.get('SNAPSHOT_IGNORE_FIELDS', 'timestamp,updated_at,change_type').split(',')
+    if field.strip()
+)
+
+# Pub/Sub batch settings untuk ETL trigger messages
+PUBSUB_MAX_MESSAGES = int(os.environ.get('PUBSUB_MAX_MESSAGES', '100'))
+PUBSUB_MAX_BYTES = int(os.environ.get('PUBSUB_MAX_BYTES', str(1024 * 1024)))
+PUBSUB_MAX_LATENCY = float(os.environ.get('PUBSUB_MAX_LATENCY', '0.05'))
+
+_publisher = None
 
 
 def get_secret(secret_id):
@@ -67,14 +133,30 @@ def generate_sample_data(num_products=50):
     return products
 
 
-def fetch_from_api(api_url, api_key=None):
+def create_request_executor():
+    """RequestExecutor baru per run (statistik latency/retry per run)"""
+    from request_executor import RequestExecutor
+    
+    return RequestExecutor(
+        rate=API_RATE_LIMIT,
+        max_retries=API_MAX_RETRIES,
+        failure_threshold=API_CIRCUIT_THRESHOLD,
+        cooldown=API_CIRCUIT_COOLDOWN,
+        hedge=API_HEDGE
+    )
+
+
+def fetch_from_api(api_url, api_key=None, executor=None):
     """Fetch data dari external API"""
+    import requests
+    
     try:
-        headers = {}
-        if api_key:
-            headers['Authorization'] = f'Bearer {api_key}'
+        headers = build_headers(api_key)
         
-        response = requests.get(api_url, headers=headers, timeout=30)
+        if executor is not None:
+            response = executor.get(get_session(), api_url, headers=headers, timeout=API_TIMEOUT)
+        else:
+            response = get_session().get(api_url, headers=headers, timeout=API_TIMEOUT)
         response.raise_for_status()
         
         data = response.json()
@@ -86,42 +168,193 @@ def fetch_from_api(api_url, api_key=None):
         raise
 
 
-def validate_data(data):
-    """Validasi basic data sebelum disimpan"""
-    required_fields = ['product_id', 'product_name', 'price', 'category']
+def fetch_and_validate_pages(api_url, api_key=None, stats=None, params=None, executor=None):
+    """Fetch API secara paginated dan validasi per page (tanpa menahan raw response utuh)"""
+    import requests
+    
     validated_data = []
+    try:
+        for page in fetch_pages(
+            api_url,
+            api_key,
+            mode=API_PAGINATION,
+            page_size=API_PAGE_SIZE,
+            max_in_flight=API_MAX_IN_FLIGHT,
+            records_key=API_RECORDS_KEY,
+            stats=stats,
+            params=params,
+            sync_cursor_key=API_SYNC_CURSOR_KEY,
+            timeout=API_TIMEOUT,
+            executor=executor
+        ):
+            validated_data.extend(validate_data(page))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Paginated API request failed: {e}")
+        raise
+    return validated_data
+
+
+def fetch_incremental(api_url, api_key, state, full_refresh=False, executor=None):
+    """
+    Fetch hanya record yang berubah sejak watermark di state
+    
+    Memakai filter API_SINCE_PARAM (atau API_CURSOR_SINCE_PARAM untuk sync cursor)
+    dan conditional request (ETag / If-Modified-Since) jika source mendukung.
+    full_refresh=True mengabaikan state dan mengambil seluruh katalog.
+    
+    Watermark baru: sync cursor dari source jika ada, selain itu nilai
+    API_UPDATED_FIELD terbesar, atau waktu mulai fetch - API_WATERMARK_OVERLAP.
+    
+    Returns:
+        (validated_data, fetched_count, fetch_stats, new_state)
+    """
+    state = {} if full_refresh else dict(state)
+    
+    params = {}
+    if state.get('watermark'):
+        since_param = API_CURSOR_SINCE_PARAM if state.get('watermark_type') == 'cursor' else API_SINCE_PARAM
+        params[since_param] = state['watermark']
+        logger.info(f"Incremental fetch since {since_param}={state['watermark']}")
+    elif full_refresh:
+        logger.info("Full refresh requested, ignoring ingestion state")
     
-    for item in data:
-        # Check required fields
-        if all(field in item for field in required_fields):
-            # Basic data cleaning
-            item['price'] = float(item.get('price', 0))
-            item['sales_count'] = int(item.get('sales_count', 0))
+    fetch_stats = None
+    sync_cursor = None
+    new_state = dict(state)
+    # Diambil tepat sebelum request pertama, bukan saat run mulai
+    fetch_started = datetime.now(timezone.utc)
+    
+    if API_PAGINATION == 'none':
+        payload, validators = fetch_conditional(
+            api_url,
+            api_key,
+            params=params,
+            etag=state.get('etag'),
+            last_modified=state.get('last_modified'),
+            timeout=API_TIMEOUT,
+            executor=executor
+        )
+        new_state.update(validators)
+        if payload is None:
+            return [], 0, None, new_state
+        raw_data = extract_records(payload, API_RECORDS_KEY)
+        fetched_count = len(raw_data)
+        if isinstance(payload, dict):
+            sync_cursor = payload.get(API_SYNC_CURSOR_KEY)
+        validated_data = validate_data(raw_data)
+    else:
+        fetch_stats = FetchStats()
+        validated_data = fetch_and_validate_pages(
+            api_url, api_key, stats=fetch_stats, params=params, executor=executor
+        )
+        fetched_count = fetch_stats.records
+        sync_cursor = fetch_stats.sync_cursor
+    
+    if sync_cursor:
+        new_state.update(watermark=sync_cursor, watermark_type='cursor')
+    else:
+        previous = state.get('watermark') if state.get('watermark_type') != 'cursor' else None
+        fallback = (fetch_started - timedelta(seconds=API_WATERMARK_OVERLAP)).isoformat()
+        new_state.update(
+            watermark=compute_watermark(validated_data, API_UPDATED_FIELD, previous, fallback=fallback),
+            watermark_type='timestamp'
+        )
+    return validated_data, fetched_count, fetch_stats, new_state
+
+
+def parse_event_options(cloud_event):
+    """Options dari Pub/Sub message data (JSON base64), mis. {"full_refresh": true}"""
+    data = cloud_event.data if hasattr(cloud_event.data, 'get') else {}
+    message = data.get('message', {})
+    encoded = message.get('data', '') if hasattr(message, 'get') else ''
+    if not encoded:
+        return {}
+    try:
+        options = json.loads(base64.b64decode(encoded).decode('utf-8'))
+        return options if isinstance(options, dict) else {}
+    except ValueError:
+        logger.warning("Ignoring non-JSON event message data")
+        return {}
+
+
+def validate_data(data):
+    """
+    Validasi basic data sebelum disimpan
+    
+    Satu loop per-row (record di-clean in place); bad rows tidak di-log satu per
+    satu, tapi diringkas dalam satu reject report (RejectReport, shared/schema.py).
+    Required fields dan range price diambil dari schema raw_sales.
+    """
+    from shared.schema import RejectReport, get_schema
+    
+    schema = get_schema('raw_sales')
+    required_fields = schema.required
+    price_column = schema.by_name.get('price')
+    min_price = price_column.minimum if price_column is not None else None
+    max_price = price_column.maximum if price_column is not None else None
+    
+    rejects = RejectReport()
+    validated_data = []
+    with span('validate') as stage:
+        for item in data:
+            reason = None
+            for field in required_fields:
+                if item.get(field) is None:
+                    reason = f'missing_{field}'
+                    break
+            if reason is None:
+                # Basic data cleaning
+                try:
+                    price = float(item['price'])
+                except (TypeError, ValueError):
+                    reason = 'invalid_price'
+                else:
+                    if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                        reason = 'out_of_range_price'
+            if reason is None:
+                try:
+                    sales_count = int(item.get('sales_count') or 0)
+                except (TypeError, ValueError):
+                    reason = 'invalid_sales_count'
+            if reason is not None:
+                rejects.add(reason, item)
+                continue
+            item['price'] = price
+            item['sales_count'] = sales_count
             validated_data.append(item)
-        else:
-            logger.warning(f"Item missing required fields: {item.get('product_id', 'unknown')}")
+        report = rejects.as_dict(len(data))
+        stage.set(rows=report['total'], accepted=report['accepted'], rejected=report['rejected'])
+    
+    if report['rejected']:
+        logger.warning(f"Rejected {report['rejected']} records: {json.dumps(report['rules'])} "
+                       f"(sample ids: {json.dumps(report['sample_ids'])})")
     
-    logger.info(f"Validated {len(validated_data)}/{len(data)} records")
+    logger.info(f"Validated {report['accepted']}/{report['total']} records")
     return validated_data
 
 
-def save_to_gcs(data, bucket_name, folder):
-    """Simpan data ke Google Cloud Storage"""
+def save_to_gcs(data, bucket_name, folder, raw_format=None):
+    """
+    Simpan data ke Google Cloud Storage
+    
+    data adalah envelope {'metadata': ..., 'data': [...]}. Untuk format
+    ndjson.gz/parquet, metadata disimpan sebagai blob metadata.
+    """
     try:
-        storage_client = storage.Client()
+        raw_format = raw_format or RAW_FORMAT
+        storage_client = get_storage_client(PROJECT_ID)
         bucket = storage_client.bucket(bucket_name)
         
         # Create filename with timestamp
         timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
-        blob_name = f"{folder}/{timestamp}.json"
+        blob_name = raw_blob_name(folder, timestamp, raw_format)
         
         blob = bucket.blob(blob_name)
-        blob.upload_from_string(
-            json.dumps(data, indent=2, ensure_ascii=False),
-            content_type='application/json'
-        )
+        with span('save', raw_format=raw_format, shards=1) as stage:
+            info = write_raw_blob(blob, data['data'], data['metadata'], raw_format=raw_format)
+            stage.set(rows=info['records'], nbytes=info['bytes'])
         
-        logger.info(f"Data saved to gs://{bucket_name}/{blob_name}")
+        logger.info(f"Data saved to gs://{bucket_name}/{blob_name} ({raw_format})")
         return blob_name
         
     except Exception as e:
@@ -129,24 +362,100 @@ def save_to_gcs(data, bucket_name, folder):
         raise
 
 
-def publish_message(topic_name, message_data):
-    """Publish message ke Pub/Sub untuk trigger ETL pipeline"""
+def save_run_stats(run_stats, bucket_name, ingestion_id, folder=None):
+    """
+    Simpan statistik detail run sebagai JSON di {STATS_FOLDER}/{ingestion_id}.json
+    
+    Statistik hanya untuk diagnosis, jadi kegagalan tidak menggagalkan ingestion.
+    """
     try:
-        publisher = pubsub_v1.PublisherClient()
-        topic_path = publisher.topic_path(PROJECT_ID, topic_name)
+        blob_name = f"{folder or STATS_FOLDER}/{ingestion_id}.json"
+        bucket = get_storage_client(PROJECT_ID).bucket(bucket_name)
+        bucket.blob(blob_name).upload_from_string(
+            json.dumps(run_stats, ensure_ascii=False),
+            content_type='application/json'
+        )
+        return blob_name
         
-        data = json.dumps(message_data).encode('utf-8')
-        future = publisher.publish(topic_path, data)
+    except Exception as e:
+        logger.error(f"Failed to save run stats: {e}")
+        return None
+
+
+def save_shards_to_gcs(data, bucket_name, folder, raw_format=None, max_bytes=None):
+    """
+    Simpan data sebagai beberapa shard + manifest di Cloud Storage
+    
+    Shard di-upload paralel ke {folder}/{timestamp}/part-NNNNN.*; return manifest.
+    """
+    try:
+        raw_format = raw_format or RAW_FORMAT
+        max_bytes = RAW_SHARD_MAX_BYTES if max_bytes is None else max_bytes
+        bucket = get_storage_client(PROJECT_ID).bucket(bucket_name)
         
-        message_id = future.result()
-        logger.info(f"Published message to {topic_name}: {message_id}")
+        timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        with span('save', raw_format=raw_format) as stage:
+            manifest = write_shards(
+                bucket,
+                f"{folder}/{timestamp}",
+                data['data'],
+                data['metadata'],
+                raw_format=raw_format,
+                max_bytes=max_bytes,
+                max_workers=RAW_UPLOAD_WORKERS
+            )
+            stage.set(rows=manifest['total_rows'], nbytes=manifest['total_bytes'],
+                      shards=len(manifest['shards']))
+        return manifest
+        
+    except Exception as e:
+        logger.error(f"Failed to save shards to GCS: {e}")
+        raise
+
+
+def get_batch_publisher():
+    """Batch publisher per proses (dipakai ulang pada warm instance)"""
+    global _publisher
+    if _publisher is None:
+        _publisher = BatchPublisher(
+            PROJECT_ID,
+            max_messages=PUBSUB_MAX_MESSAGES,
+            max_bytes=PUBSUB_MAX_BYTES,
+            max_latency=PUBSUB_MAX_LATENCY
+        )
+    return _publisher
+
+
+def publish_message(topic_name, message_data):
+    """
+    Publish message ke Pub/Sub untuk trigger ETL pipeline
+    
+    Non-blocking: message masuk batch dan future ditunggu di flush_messages()
+    """
+    try:
+        return get_batch_publisher().publish(topic_name, message_data)
         
     except Exception as e:
         logger.error(f"Failed to publish message: {e}")
         # Don't raise - ingestion should succeed even if publish fails
+        return None
+
+
+def flush_messages(timeout=60):
+    """Tunggu semua message yang di-publish selama invocation ini"""
+    try:
+        # publish() non-blocking, jadi waktu stage publish ada di flush
+        with span('publish') as stage:
+            result = get_batch_publisher().flush(timeout=timeout)
+            stage.set(rows=result['published'], failed=result['failed'])
+        return result
+    except Exception as e:
+        logger.error(f"Failed to flush Pub/Sub messages: {e}")
+        return {'published': 0, 'failed': 0, 'timed_out': 0, 'message_ids': []}
 
 
 @functions_framework.cloud_event
+@instrumented('data-ingestion')
 def ingest_data(cloud_event):
     """
     Main function untuk data ingestion
@@ -158,13 +467,24 @@ def ingest_data(cloud_event):
         # Parse event data
         event_data = cloud_event.data
         logger.info(f"Event data: {event_data}")
+        options = parse_event_options(cloud_event)
+        full_refresh = bool(options.get('full_refresh')) or \
+            os.environ.get('FULL_REFRESH', 'false').lower() == 'true'
         
         # Determine data source
         use_sample_data = os.environ.get('USE_SAMPLE_DATA', 'true').lower() == 'true'
+        fetch_stats = None
+        request_stats = None
+        state_bucket = None
+        state = {}
+        new_state = None
         
         if use_sample_data:
             logger.info("Using sample data for testing")
-            raw_data = generate_sample_data(num_products=100)
+            with span('fetch', source='sample') as stage:
+                raw_data = generate_sample_data(num_products=SAMPLE_DATA_ROWS)
+                stage.set(rows=len(raw_data))
+            validated_data = validate_data(raw_data)
         else:
             # Get API credentials from Secret Manager
             api_url = os.environ.get('API_URL')
@@ -176,15 +496,64 @@ def ingest_data(cloud_event):
             
             # Fetch from API
             logger.info(f"Fetching data from API: {api_url}")
-            raw_data = fetch_from_api(api_url, api_key)
-        
-        # Validate data
-        validated_data = validate_data(raw_data)
+            executor = create_request_executor()
+            with span('fetch', source='api') as stage:
+                try:
+                    if INCREMENTAL_INGESTION:
+                        state_bucket = get_storage_client(PROJECT_ID).bucket(BUCKET_NAME)
+                        state = load_state(state_bucket, SOURCE_NAME, STATE_FOLDER)
+                        validated_data, fetched_count, fetch_stats, new_state = fetch_incremental(
+                            api_url, api_key, state, full_refresh=full_refresh, executor=executor
+                        )
+                    elif API_PAGINATION == 'none':
+                        raw_data = fetch_from_api(api_url, api_key, executor=executor)
+                        fetched_count = len(raw_data)
+                        validated_data = validate_data(raw_data)
+                    else:
+                        fetch_stats = FetchStats()
+                        validated_data = fetch_and_validate_pages(
+                            api_url, api_key, stats=fetch_stats, executor=executor
+                        )
+                        fetched_count = fetch_stats.records
+                    stage.set(rows=fetched_count)
+                finally:
+                    request_stats = executor.summary()
+                    executor.close()
+                    stage.set(requests=request_stats['requests'], retries=request_stats['retries'],
+                              latency_p95_ms=request_stats['latency_p95_ms'])
+                    logger.info(f"Source API request stats: {json.dumps(request_stats)}")
+            
+            if new_state is not None and fetched_count == 0:
+                save_state(state_bucket, SOURCE_NAME, new_state, STATE_FOLDER)
+                logger.info("No changed records since last run")
+                return {'status': 'no_changes', 'record_count': 0}
         
         if not validated_data:
             logger.error("No valid data to process")
             return {'status': 'error', 'message': 'No valid data'}
         
+        # Change detection: hanya teruskan record insert/update/delete
+        snapshot_index = None
+        diff_stats = None
+        if SNAPSHOT_DIFF:
+            state_bucket = state_bucket or get_storage_client(PROJECT_ID).bucket(BUCKET_NAME)
+            index_name = index_blob_name('sample' if use_sample_data else SOURCE_NAME, STATE_FOLDER)
+            # Delta incremental tidak berisi seluruh katalog, jadi delete tidak bisa dideteksi
+            full_snapshot = new_state is None or full_refresh or not state.get('watermark')
+            with span('snapshot_diff') as stage:
+                validated_data, snapshot_index, diff_stats = diff_snapshot(
+                    validated_data,
+                    load_index(state_bucket, index_name),
+                    full_snapshot=full_snapshot,
+                    ignore_fields=SNAPSHOT_IGNORE_FIELDS
+                )
+                stage.set(rows=diff_stats['total'], changed=len(validated_data))
+            if not validated_data:
+                if new_state is not None:
+                    save_state(state_bucket, SOURCE_NAME, new_state, STATE_FOLDER)
+                logger.info("Snapshot unchanged since last run")
+                return {'status': 'no_changes', 'record_count': 0, 'snapshot_diff': diff_stats}
+        
         # Add metadata
         ingestion_metadata = {
             'ingestion_id': f"ING_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}",
@@ -192,31 +561,72 @@ def ingest_data(cloud_event):
             'record_count': len(validated_data),
             'source': 'sample' if use_sample_data else 'api'
         }
+        if new_state is not None:
+            ingestion_metadata['incremental'] = not full_refresh
+            ingestion_metadata['watermark'] = new_state.get('watermark')
+        if diff_stats is not None:
+            # Ringkasan kecil tetap di metadata; breakdown lengkap ada di stats_blob
+            ingestion_metadata['diff_ratio'] = diff_stats['diff_ratio']
+            ingestion_metadata['changed_count'] = diff_stats['insert'] + diff_stats['update'] + diff_stats['delete']
+            ingestion_metadata['unchanged_count'] = diff_stats['unchanged']
+        run_stats = {}
+        if fetch_stats is not None:
+            run_stats['fetch_stats'] = fetch_stats.as_dict()
+        if request_stats is not None:
+            run_stats['request_stats'] = request_stats
+        if diff_stats is not None:
+            run_stats['snapshot_diff'] = diff_stats
+        if run_stats:
+            stats_blob = save_run_stats(run_stats, BUCKET_NAME, ingestion_metadata['ingestion_id'])
+            if stats_blob:
+                ingestion_metadata['stats_blob'] = stats_blob
         
         final_data = {
             'metadata': ingestion_metadata,
             'data': validated_data
         }
         
-        # Save to Cloud Storage
-        blob_name = save_to_gcs(final_data, BUCKET_NAME, RAW_FOLDER)
-        
-        # Publish message to trigger ETL pipeline
         etl_trigger_topic = os.environ.get('ETL_TRIGGER_TOPIC', 'etl-pipeline-trigger')
-        publish_message(etl_trigger_topic, {
-            'blob_name': blob_name,
+        result = {
+            'status': 'success',
             'ingestion_id': ingestion_metadata['ingestion_id'],
             'record_count': ingestion_metadata['record_count']
-        })
+        }
+        
+        if RAW_SHARD_MAX_BYTES > 0:
+            # Save shards + manifest; ETL fan-out satu invocation per shard
+            manifest = save_shards_to_gcs(final_data, BUCKET_NAME, RAW_FOLDER)
+            result['manifest_name'] = manifest['manifest_name']
+            result['shard_count'] = len(manifest['shards'])
+            publish_message(etl_trigger_topic, {
+                'manifest_name': manifest['manifest_name'],
+                'ingestion_id': ingestion_metadata['ingestion_id'],
+                'record_count': ingestion_metadata['record_count'],
+                'shard_count': result['shard_count']
+            })
+        else:
+            # Save to Cloud Storage
+            blob_name = save_to_gcs(final_data, BUCKET_NAME, RAW_FOLDER)
+            result['blob_name'] = blob_name
+            
+            # Publish message to trigger ETL pipeline
+            publish_message(etl_trigger_topic, {
+                'blob_name': blob_name,
+                'ingestion_id': ingestion_metadata['ingestion_id'],
+                'record_count': ingestion_metadata['record_count']
+            })
+        flush_messages()
+        
+        # Watermark baru disimpan setelah data tersimpan, jadi run gagal tidak memajukannya
+        if new_state is not None:
+            save_state(state_bucket, SOURCE_NAME, new_state, STATE_FOLDER)
+        if snapshot_index is not None:
+            save_index(state_bucket, index_name, snapshot_index)
         
         logger.info("Data ingestion completed successfully")
+        logger.info(f"Client registry stats: {client_stats()}")
         
-        return {
-            'status': 'success',
-            'ingestion_id': ingestion_metadata['ingestion_id'],
-            'record_count': ingestion_metadata['record_count'],
-            'blob_name': blob_name
-        }
+        return result
         
     except Exception as e:
         logger.error(f"Data ingestion failed: {e}", exc_info=True)
@@ -240,7 +650,13 @@ def ingest_data_http(request):
             "type": "google.cloud.pubsub.topic.v1.messagePublished",
             "source": "manual-trigger"
         }
-        data = {"message": {"data": ""}}
+        
+        # Body opsional, mis. {"full_refresh": true}
+        request_json = request.get_json(silent=True) if request is not None else None
+        message_data = ""
+        if request_json:
+            message_data = base64.b64encode(json.dumps(request_json).encode()).decode()
+        data = {"message": {"data": message_data}}
         
         event = CloudEvent(attributes, data)
         result = ingest_data(event)
@@ -0,0 +1,304 @@
+"""
+Request executor untuk source API
+
+- Token bucket rate limiter yang adaptif (AIMD): turun saat 429, naik pelan saat sukses,
+  dan patuh pada header Retry-After
+- Retry dengan exponential backoff + full jitter untuk 429/5xx/timeout/connection error
+- Circuit breaker: setelah N request beruntun gagal (retry habis), request langsung
+  ditolak selama cooldown
+- Hedged request opsional (default off): jika request melewati p95 latency, kirim
+  duplikat dan pakai response yang selesai lebih dulu. Duplikat juga memakai token
+  rate limiter; jika token tidak tersedia, hedge dilewati
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker sedang open - source API dianggap down"""
+
+
+class RetryableStatusError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def parse_retry_after(value):
+    """Retry-After dalam detik (angka atau HTTP-date); None jika tidak valid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class AdaptiveTokenBucket:
+    """Token bucket dengan rate yang diturunkan saat throttled dan dinaikkan saat sukses"""
+
+    def __init__(self, rate, burst=None, min_rate=0.5, increase=0.5, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.rate)
+        self.increase = increase
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Ambil satu token jika ada; return 0 jika berhasil, selain itu detik yang harus ditunggu"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait_for = self.blocked_until - now
+            if wait_for <= 0 and self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            if wait_for <= 0:
+                wait_for = (1 - self.tokens) / self.rate
+            return wait_for
+
+    def acquire(self):
+        while True:
+            wait_for = self._take()
+            if not wait_for:
+                return
+            self._sleep(wait_for)
+
+    def try_acquire(self):
+        """Ambil token tanpa menunggu; False jika harus menunggu"""
+        return not self._take()
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, self._clock() + retry_after)
+        logger.warning(f"Source API throttled, rate lowered to {self.rate:.2f} req/s"
+                       + (f", pausing {retry_after:.1f}s" if retry_after else ""))
+
+
+class CircuitBreaker:
+    """
+    closed → open setelah failure_threshold kegagalan beruntun → half-open setelah cooldown
+
+    Satu kegagalan = satu request logis yang gagal setelah retry habis, bukan tiap
+    attempt; jadi satu request yang di-retry tidak membuka breaker sendirian.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self._clock() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def before_request(self):
+        if self.state == 'open':
+            raise CircuitOpenError(
+                f"Circuit open after {self.failures} consecutive failures, retry in "
+                f"{self.cooldown - (self._clock() - self.opened_at):.1f}s"
+            )
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Circuit breaker opened after {self.failures} consecutive failures")
+                self.opened_at = self._clock()
+
+
+class RequestExecutor:
+    """
+    Eksekusi GET ke source API dengan rate limit, retry, circuit breaker dan hedging
+
+    Satu executor per run ingestion; summary() berisi percentile latency dan retry count.
+    """
+
+    def __init__(self, rate=10.0, burst=None, max_retries=5, backoff_base=0.5, backoff_cap=30.0,
+                 failure_threshold=5, cooldown=30.0, hedge=False, hedge_min_samples=20,
+                 hedge_workers=8, sleep=time.sleep):
+        import requests
+
+        self._request_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self.limiter = AdaptiveTokenBucket(rate, burst, sleep=sleep)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._sleep = sleep
+        self._pool = ThreadPoolExecutor(max_workers=hedge_workers) if hedge else None
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.retries = 0
+        self.throttled = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_skipped = 0
+        self.failures = 0
+
+    def _record_latency(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _hedge_threshold(self):
+        with self._lock:
+            if len(self.latencies) < self.hedge_min_samples:
+                return None
+            return percentile(self.latencies, 95)
+
+    def _timed_get(self, session, url, kwargs):
+        start = time.monotonic()
+        response = session.get(url, **kwargs)
+        self._record_latency(time.monotonic() - start)
+        return response
+
+    def _send(self, session, url, kwargs):
+        """Satu attempt; dengan hedging jika latency melewati p95"""
+        threshold = self._hedge_threshold() if self._pool else None
+        if threshold is None:
+            return self._timed_get(session, url, kwargs)
+
+        primary = self._pool.submit(self._timed_get, session, url, kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        if not self.limiter.try_acquire():
+            # Duplikat tetap dihitung rate limit; tanpa token, tunggu primary saja
+            with self._lock:
+                self.hedge_skipped += 1
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        hedge = self._pool.submit(self._timed_get, session, url, kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get(self, session, url, **kwargs):
+        """
+        GET dengan retry; return response terakhir untuk status non-retryable
+        (termasuk 304 dan 4xx lain - caller yang memutuskan raise_for_status)
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_request()
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                response = self._send(session, url, kwargs)
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.on_success()
+                    self.limiter.on_success()
+                    return response
+                if response.status_code == 429:
+                    with self._lock:
+                        self.throttled += 1
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.limiter.on_throttled(retry_after)
+                error = RetryableStatusError(response)
+            except self._request_errors as e:
+                error = e
+
+            if attempt >= self.max_retries:
+                self.breaker.on_failure()
+                with self._lock:
+                    self.failures += 1
+                if isinstance(error, RetryableStatusError):
+                    return error.response
+                raise error
+
+            delay = max(retry_after or 0.0, self._backoff(attempt))
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            logger.info(f"Retrying {url} in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {error}")
+            self._sleep(delay)
+
+    def summary(self):
+        with self._lock:
+            latencies = list(self.latencies)
+        return {
+            'requests': len(latencies),
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'hedge_skipped': self.hedge_skipped,
+            'failures': self.failures,
+            'latency_p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'latency_p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'latency_p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'final_rate': round(self.limiter.rate, 2),
+            'circuit': self.breaker.state,
+        }
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,110 @@
+"""
+Snapshot diffing untuk Data Ingestion
+
+Menyimpan index content-hash (product_id → hash 64-bit) dari snapshot sebelumnya
+sebagai Parquet kecil di bucket, lalu hanya meneruskan record yang insert,
+update atau delete (dengan field change_type).
+"""
+
+import hashlib
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANGE_INSERT = 'insert'
+CHANGE_UPDATE = 'update'
+CHANGE_DELETE = 'delete'
+
+# Field yang berubah tiap run walau isi produk sama
+DEFAULT_IGNORE_FIELDS = ('timestamp', 'updated_at', 'change_type')
+
+
+def index_blob_name(source, folder='state'):
+    return f"{folder}/{source}.snapshot.parquet"
+
+
+def record_hash(record, ignore_fields=DEFAULT_IGNORE_FIELDS):
+    """Hash 64-bit (signed, muat di int64 Parquet) dari isi record"""
+    content = {key: value for key, value in record.items() if key not in ignore_fields}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'big', signed=True)
+
+
+def load_index(bucket, blob_name):
+    """Index snapshot sebelumnya; {} jika belum ada"""
+    import pyarrow.parquet as pq
+
+    blob = bucket.blob(blob_name)
+    if not blob.exists():
+        logger.info(f"No snapshot index at {blob_name}, treating all records as inserts")
+        return {}
+    table = pq.read_table(io.BytesIO(blob.download_as_bytes()))
+    return dict(zip(table.column('id').to_pylist(), table.column('hash').to_pylist()))
+
+
+def save_index(bucket, blob_name, index):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({
+        'id': pa.array(list(index.keys()), type=pa.string()),
+        'hash': pa.array(list(index.values()), type=pa.int64()),
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression='zstd')
+    bucket.blob(blob_name).upload_from_string(
+        buffer.getvalue(),
+        content_type='application/vnd.apache.parquet'
+    )
+    logger.info(f"Saved snapshot index ({len(index)} ids, {buffer.tell()} bytes) to {blob_name}")
+
+
+def diff_snapshot(records, previous_index, full_snapshot=True, id_field='product_id',
+                  ignore_fields=DEFAULT_IGNORE_FIELDS):
+    """
+    Bandingkan records dengan index snapshot sebelumnya
+
+    Args:
+        full_snapshot: True jika records berisi seluruh katalog, sehingga id yang
+            hilang dianggap delete. False untuk delta incremental (tanpa delete).
+
+    Returns:
+        (changes, new_index, stats) - changes berisi record dengan change_type
+    """
+    new_index = {} if full_snapshot else dict(previous_index)
+    changes = []
+    counts = {CHANGE_INSERT: 0, CHANGE_UPDATE: 0, CHANGE_DELETE: 0, 'unchanged': 0}
+
+    for record in records:
+        record_id = str(record[id_field])
+        digest = record_hash(record, ignore_fields)
+        previous = previous_index.get(record_id)
+        new_index[record_id] = digest
+
+        if previous is None:
+            change_type = CHANGE_INSERT
+        elif previous != digest:
+            change_type = CHANGE_UPDATE
+        else:
+            counts['unchanged'] += 1
+            continue
+
+        counts[change_type] += 1
+        record['change_type'] = change_type
+        changes.append(record)
+
+    if full_snapshot:
+        for record_id in previous_index.keys() - new_index.keys():
+            counts[CHANGE_DELETE] += 1
+            changes.append({id_field: record_id, 'change_type': CHANGE_DELETE})
+
+    total = len(records)
+    changed = counts[CHANGE_INSERT] + counts[CHANGE_UPDATE] + counts[CHANGE_DELETE]
+    stats = dict(counts, total=total, diff_ratio=round(changed / total, 4) if total else 0.0)
+    logger.info(
+        f"Snapshot diff: {counts[CHANGE_INSERT]} inserted, {counts[CHANGE_UPDATE]} updated, "
+        f"{counts[CHANGE_DELETE]} deleted, {counts['unchanged']} unchanged (ratio {stats['diff_ratio']})"
+    )
+    return changes, new_index, stats
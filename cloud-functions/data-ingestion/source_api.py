@@ -0,0 +1,238 @@
+"""
+Source API client untuk Data Ingestion
+Paginated fetch (offset/cursor) lewat pooled keep-alive HTTP session
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+
+# Session dipakai ulang antar invocation pada warm instance
+_sessions = {}
+
+
+def get_session(pool_size=8):
+    """Ambil pooled keep-alive session (satu per ukuran pool per proses)"""
+    session = _sessions.get(pool_size)
+    if session is None:
+        # Import di sini supaya requests tidak ikut dimuat saat cold start health_check
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _sessions[pool_size] = session
+    return session
+
+
+def build_headers(api_key=None):
+    """Header standar untuk request ke source API"""
+    headers = {'Accept': 'application/json'}
+    if api_key:
+        headers['Authorization'] = f'Bearer {api_key}'
+    return headers
+
+
+class FetchStats:
+    """Statistik throughput satu run fetch"""
+
+    def __init__(self):
+        self.pages = 0
+        self.records = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        # Sync cursor terakhir dari envelope page (untuk incremental ingestion)
+        self.sync_cursor = None
+
+    def add_page(self, record_count):
+        self.pages += 1
+        self.records += record_count
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def records_per_sec(self):
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'pages': self.pages,
+            'records': self.records,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'pages_per_sec': round(self.pages_per_sec, 2),
+            'records_per_sec': round(self.records_per_sec, 2),
+        }
+
+
+def extract_records(payload, records_key='data'):
+    """Ambil list record dari response page (list langsung atau envelope dict)"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        return payload.get(records_key) or []
+    return []
+
+
+def _send_get(session, url, params, headers, timeout, executor=None):
+    """GET langsung, atau lewat RequestExecutor (rate limit/retry/hedging) jika ada"""
+    if executor is not None:
+        return executor.get(session, url, params=params, headers=headers, timeout=timeout)
+    return session.get(url, params=params, headers=headers, timeout=timeout)
+
+
+def _get_json(session, url, params, headers, timeout, executor=None):
+    response = _send_get(session, url, params, headers, timeout, executor)
+    response.raise_for_status()
+    return response.json()
+
+
+def _track_sync_cursor(payload, sync_cursor_key, stats):
+    if sync_cursor_key and isinstance(payload, dict) and payload.get(sync_cursor_key):
+        stats.sync_cursor = payload[sync_cursor_key]
+
+
+def fetch_conditional(api_url, api_key=None, params=None, etag=None, last_modified=None,
+                      timeout=DEFAULT_TIMEOUT, session=None, executor=None):
+    """
+    GET dengan conditional headers (If-None-Match / If-Modified-Since)
+
+    Returns:
+        (payload, validators) - payload None jika server menjawab 304 Not Modified;
+        validators berisi ETag/Last-Modified dari response untuk run berikutnya.
+    """
+    session = session or get_session()
+    headers = build_headers(api_key)
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    response = _send_get(session, api_url, params, headers, timeout, executor)
+    validators = {
+        'etag': response.headers.get('ETag') or etag,
+        'last_modified': response.headers.get('Last-Modified') or last_modified,
+    }
+    if response.status_code == 304:
+        logger.info(f"Source not modified since last run ({api_url})")
+        return None, validators
+
+    response.raise_for_status()
+    return response.json(), validators
+
+
+def _fetch_offset_pages(session, api_url, headers, page_size, max_in_flight,
+                        records_key, offset_param, limit_param, timeout, stats,
+                        params=None, sync_cursor_key=None, executor=None):
+    """
+    Offset pagination: beberapa page di-fetch paralel (maksimal max_in_flight),
+    tetap di-yield berurutan. Berhenti saat page pertama yang tidak penuh.
+    """
+    next_offset = 0
+
+    def submit(pool):
+        nonlocal next_offset
+        page_params = dict(params or {})
+        page_params.update({offset_param: next_offset, limit_param: page_size})
+        next_offset += page_size
+        return pool.submit(_get_json, session, api_url, page_params, headers, timeout, executor)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        in_flight = deque(submit(pool) for _ in range(max_in_flight))
+        try:
+            while in_flight:
+                payload = in_flight.popleft().result()
+                _track_sync_cursor(payload, sync_cursor_key, stats)
+                records = extract_records(payload, records_key)
+                stats.add_page(len(records))
+                if records:
+                    yield records
+                if len(records) < page_size:
+                    break
+                in_flight.append(submit(pool))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _fetch_cursor_pages(session, api_url, headers, page_size, records_key,
+                        cursor_param, limit_param, next_cursor_key, timeout, stats,
+                        params=None, sync_cursor_key=None, executor=None):
+    """Cursor pagination: page berikutnya bergantung pada cursor dari page sebelumnya"""
+    cursor = None
+    while True:
+        page_params = dict(params or {})
+        page_params[limit_param] = page_size
+        if cursor:
+            page_params[cursor_param] = cursor
+        payload = _get_json(session, api_url, page_params, headers, timeout, executor)
+        _track_sync_cursor(payload, sync_cursor_key, stats)
+        records = extract_records(payload, records_key)
+        stats.add_page(len(records))
+        if records:
+            yield records
+        cursor = payload.get(next_cursor_key) if isinstance(payload, dict) else None
+        if not cursor or not records:
+            break
+
+
+def fetch_pages(api_url, api_key=None, mode='offset', page_size=1000, max_in_flight=4,
+                records_key='data', offset_param='offset', limit_param='limit',
+                cursor_param='cursor', next_cursor_key='next_cursor',
+                timeout=DEFAULT_TIMEOUT, session=None, stats=None,
+                params=None, sync_cursor_key=None, executor=None):
+    """
+    Fetch data dari source API secara paginated, yield list record per page
+
+    Args:
+        mode: 'offset' (page paralel) atau 'cursor' (page berurutan)
+        max_in_flight: jumlah maksimal request offset yang berjalan bersamaan
+        stats: FetchStats opsional untuk mengumpulkan pages/sec dan records/sec
+        params: query params tambahan untuk tiap page (mis. filter updated_since)
+        sync_cursor_key: key envelope berisi sync cursor untuk run berikutnya
+        executor: RequestExecutor opsional (rate limit, retry, circuit breaker, hedging)
+    """
+    if mode not in ('offset', 'cursor'):
+        raise ValueError(f"Unknown pagination mode: {mode}")
+
+    max_in_flight = max(1, int(max_in_flight))
+    session = session or get_session(pool_size=max_in_flight)
+    stats = stats if stats is not None else FetchStats()
+    headers = build_headers(api_key)
+
+    try:
+        if mode == 'offset':
+            yield from _fetch_offset_pages(
+                session, api_url, headers, page_size, max_in_flight,
+                records_key, offset_param, limit_param, timeout, stats,
+                params=params, sync_cursor_key=sync_cursor_key, executor=executor
+            )
+        else:
+            yield from _fetch_cursor_pages(
+                session, api_url, headers, page_size, records_key,
+                cursor_param, limit_param, next_cursor_key, timeout, stats,
+                params=params, sync_cursor_key=sync_cursor_key, executor=executor
+            )
+    finally:
+        stats.finish()
+        logger.info(
+            f"Fetched {stats.records} records in {stats.pages} pages "
+            f"({stats.elapsed:.2f}s, {stats.pages_per_sec:.1f} pages/s, "
+            f"{stats.records_per_sec:.1f} records/s)"
+        )
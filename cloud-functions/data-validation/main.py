@@ -6,55 +6,326 @@ Validates data quality and schema compliance
 import functions_framework
 import json
 import logging
-from google.cloud import storage
+import os
+import time
+from datetime import datetime, timezone
+
+from shared.clients import get_storage_client
+from shared.metrics import instrumented, span
+from shared.raw_format import detect_format, is_profile, iter_raw_records, profile_blob_name, read_metadata
+from shared.schema import RejectReport, get_schema
+from shared.sharding import is_manifest
+from quarantine import CLEAN_FOLDER, QUARANTINE_FOLDER, CleanCopyWriter, QuarantineWriter, clean_blob_name
+from validation_cache import CACHE_FOLDER, content_key, get_entry, put_entry
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROJECT_ID = os.environ.get('GCP_PROJECT')
+# Allowlist: hanya object di bawah folder raw data ingestion yang divalidasi.
+# Object lain di bucket (state/, ledger/, ingestion-stats/, output function ini) dilewati
+RAW_FOLDER = os.environ.get('RAW_FOLDER', 'raw')
+# Berhenti membaca file setelah sekian invalid records; 0 = selalu baca sampai habis
+VALIDATION_MAX_INVALID = int(os.environ.get('VALIDATION_MAX_INVALID', '0'))
+# Invalid records ke quarantine/
+VALIDATION_QUARANTINE = os.environ.get('VALIDATION_QUARANTINE', 'true').lower() == 'true'
+# Valid records ke clean copy di CLEAN_FOLDER. Opt-in: ETL tidak membacanya karena
+# di-trigger Pub/Sub ingestion bersamaan dengan function ini (clean copy belum tentu
+# ada) dan memfilter record dengan schema yang sama. Untuk consumer yang membaca
+# setelah validasi selesai, mis. load/backfill BigQuery langsung dari clean/
+VALIDATION_CLEAN_COPY = os.environ.get('VALIDATION_CLEAN_COPY', 'false').lower() == 'true'
+QUARANTINE_FOLDER = os.environ.get('QUARANTINE_FOLDER', QUARANTINE_FOLDER)
+CLEAN_FOLDER = os.environ.get('CLEAN_FOLDER', CLEAN_FOLDER)
+QUARANTINE_BATCH_SIZE = int(os.environ.get('QUARANTINE_BATCH_SIZE', '1000'))
+QUARANTINE_WORKERS = int(os.environ.get('QUARANTINE_WORKERS', '4'))
+# Cache hasil validasi per isi object (checksum GCS): isi sama tidak di-download ulang
+VALIDATION_CACHE = os.environ.get('VALIDATION_CACHE', 'true').lower() == 'true'
+VALIDATION_CACHE_FOLDER = os.environ.get('VALIDATION_CACHE_FOLDER', CACHE_FOLDER)
+# Column profile (null, min/max, mean, HLL distinct, KLL quantiles) sebagai sidecar <blob>.profile.json
+VALIDATION_PROFILE = os.environ.get('VALIDATION_PROFILE', 'true').lower() == 'true'
+TABLE_ID = 'raw_sales'
+
+
+def check_records(records, max_invalid=0, report=None, on_valid=None, on_invalid=None):
+    """
+    Hitung valid/invalid records dalam satu pass, tanpa menyimpan records
+
+    Tiap record dicek validator raw_sales hasil compile DDL (NOT NULL, tipe,
+    range); reason code invalid records dicatat di report (RejectReport).
+    on_valid(record) / on_invalid(reason, record) opsional, mis. untuk clean
+    copy dan quarantine.
+
+    Returns:
+        (valid_records, invalid_records, stopped_early)
+    """
+    validate = get_schema(TABLE_ID).validate
+    report = report if report is not None else RejectReport()
+    valid_records = 0
+
+    for record in records:
+        reason = validate(record)
+        if reason is None:
+            valid_records += 1
+            if on_valid is not None:
+                on_valid(record)
+        else:
+            report.add(reason, record)
+            if on_invalid is not None:
+                on_invalid(reason, record)
+            if max_invalid and report.rejected >= max_invalid:
+                return valid_records, report.rejected, True
+
+    return valid_records, report.rejected, False
+
+
+def cached_result(bucket, blob, key, fingerprint):
+    """
+    Hasil validasi dari cache untuk object dengan isi yang sama
+
+    Returns:
+        dict result (cache='hit') atau None jika miss
+    """
+    entry = get_entry(bucket, key, fingerprint, VALIDATION_CACHE_FOLDER)
+    settings = (VALIDATION_MAX_INVALID, VALIDATION_QUARANTINE, VALIDATION_CLEAN_COPY)
+    if entry is None or (entry.get('max_invalid'), entry.get('quarantine'), entry.get('clean_copy')) != settings:
+        logger.info(f"Validation cache miss for gs://{bucket.name}/{blob.name}@{blob.generation} ({key})")
+        return None
+
+    result = dict(entry['result'])
+    # Blob dengan nama lain (copy/rewrite): clean copy dan profile cukup di-copy server-side
+    outputs = (('clean_blob', clean_blob_name(blob.name, CLEAN_FOLDER)),
+               ('profile_blob', profile_blob_name(blob.name)))
+    for field, name in outputs:
+        if result.get(field) and result[field] != name:
+            try:
+                bucket.copy_blob(bucket.blob(result[field]), bucket, name)
+            except Exception as e:
+                logger.warning(f"Ignoring validation cache entry {key}: cannot copy {result[field]}: {e}")
+                return None
+            result[field] = name
+
+    result.update(
+        status='success',
+        file_name=blob.name,
+        generation=blob.generation,
+        cache='hit',
+        cached_from={'file_name': entry['file_name'], 'generation': entry['generation']},
+    )
+    logger.info(
+        f"Validation cache hit for gs://{bucket.name}/{blob.name}@{blob.generation} ({key}): "
+        f"verdict {result['verdict']} from {entry['file_name']}@{entry['generation']}"
+    )
+    return result
+
+
+def source_metadata(blob, raw_format, stream_stats):
+    """Ingestion metadata blob sumber, dibawa ke clean copy"""
+    if raw_format == 'json':
+        # Envelope json: metadata sudah terbaca parser sebelum array data
+        return stream_stats.get('envelope', {}).get('metadata', {})
+    return read_metadata(blob)
+
+
 @functions_framework.cloud_event
+@instrumented('data-validation')
 def validate_data(cloud_event):
     """
     Validates data uploaded to GCS
     Triggered by GCS object finalize
+
+    Blob dibaca sebagai stream (json, ndjson.gz atau parquet), jadi memory tidak
+    bergantung pada ukuran file. Validasi berhenti lebih awal begitu
+    VALIDATION_MAX_INVALID invalid records tercapai.
+
+    Hanya object di bawah RAW_FOLDER yang divalidasi; object lain yang
+    men-trigger notifikasi bucket (state, ledger, stats, output sendiri) dilewati.
+
+    Dengan VALIDATION_QUARANTINE, invalid records ditulis di background ke
+    QUARANTINE_FOLDER (per reason code dan tanggal); dengan VALIDATION_CLEAN_COPY,
+    valid records juga ke clean copy di CLEAN_FOLDER (lihat quarantine.py).
+
+    Dengan VALIDATION_PROFILE, profile per kolom dihitung di pass yang sama dan
+    ditulis sebagai sidecar <blob>.profile.json (lihat shared/profiling.py).
+
+    Dengan VALIDATION_CACHE, object yang isinya (checksum GCS) sudah pernah
+    divalidasi dengan rule yang sama langsung memakai hasil cache tanpa download.
     """
     data = cloud_event.data
 
     bucket_name = data["bucket"]
     file_name = data["name"]
 
+    if is_manifest(file_name):
+        logger.info(f"Skipping shard manifest: gs://{bucket_name}/{file_name}")
+        return {'status': 'skipped', 'file_name': file_name}
+
+    if not file_name.startswith(f"{RAW_FOLDER}/") or is_profile(file_name):
+        # Bukan raw data (mis. state ingestion, ledger ETL, atau sidecar/output function ini)
+        logger.info(f"Skipping non-raw object: gs://{bucket_name}/{file_name}")
+        return {'status': 'skipped', 'file_name': file_name}
+
     logger.info(f"Validating file: gs://{bucket_name}/{file_name}")
 
     try:
-        storage_client = storage.Client()
+        storage_client = get_storage_client(PROJECT_ID)
         bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(file_name)
+        # Hanya metadata object (generation, checksum), isi belum di-download
+        blob = bucket.get_blob(file_name)
+        if blob is None:
+            raise FileNotFoundError(f"gs://{bucket_name}/{file_name} not found")
 
-        content = blob.download_as_text()
-        json_content = json.loads(content)
+        # json, ndjson.gz atau parquet - dideteksi dari nama blob
+        raw_format = detect_format(file_name)
 
-        # Check structure
-        if 'metadata' not in json_content or 'data' not in json_content:
-            raise ValueError("Invalid file structure. Missing 'metadata' or 'data' keys.")
+        cache_key = content_key(blob) if VALIDATION_CACHE else None
+        fingerprint = get_schema(TABLE_ID).fingerprint
+        if cache_key:
+            with span('cache_lookup') as stage:
+                cached = cached_result(bucket, blob, cache_key, fingerprint)
+                stage.set(hit=cached is not None)
+            if cached is not None:
+                return cached
+
+        stream_stats = {}
+        rejects = RejectReport()
+
+        quarantine = clean_copy = None
+        if VALIDATION_QUARANTINE:
+            quarantine = QuarantineWriter(bucket, file_name, QUARANTINE_FOLDER,
+                                          QUARANTINE_BATCH_SIZE, QUARANTINE_WORKERS)
+        if VALIDATION_CLEAN_COPY:
+            clean_name = clean_blob_name(file_name, CLEAN_FOLDER)
+            clean_copy = CleanCopyWriter(bucket.blob(clean_name),
+                                         lambda: source_metadata(blob, raw_format, stream_stats),
+                                         detect_format(clean_name), QUARANTINE_BATCH_SIZE)
 
-        data_records = json_content['data']
+        profiler = None
+        if VALIDATION_PROFILE:
+            # numpy di-import lazy supaya cold start tetap ringan
+            from shared.profiling import ProfileBuilder, write_profile
 
-        # Perform validation logic (example)
-        valid_records = 0
-        invalid_records = 0
+            # Kolom mengikuti field record hasil ingestion, bukan DDL raw_sales (schema transaksi)
+            profiler = ProfileBuilder()
 
-        for record in data_records:
-            if 'product_id' in record and 'price' in record:
-                valid_records += 1
+        start = time.perf_counter()
+
+        with span('validate', raw_format=raw_format) as stage:
+            raw_records = iter_raw_records(blob, stats=stream_stats)
+            # Profiling menumpang di iterator yang sama, tidak ada pass kedua
+            records = profiler.observe(raw_records) if profiler else raw_records
+            try:
+                valid_records, invalid_records, stopped_early = check_records(
+                    records, VALIDATION_MAX_INVALID, rejects,
+                    on_valid=clean_copy.add if clean_copy else None,
+                    on_invalid=quarantine.add if quarantine else None
+                )
+            except Exception:
+                if clean_copy is not None:
+                    clean_copy.abort()
+                if quarantine is not None:
+                    quarantine.close()
+                raise
+            finally:
+                # Early stop: tutup stream tanpa membaca sisa file
+                raw_records.close()
+            total_records = valid_records + invalid_records
+            stage.set(rows=total_records, nbytes=stream_stats.get('bytes_read'),
+                      valid=valid_records, invalid=invalid_records, stopped_early=stopped_early)
+
+        elapsed = time.perf_counter() - start
+
+        quarantine_stats = clean_stats = None
+        if quarantine is not None:
+            # Yang ditunggu di sini hanya batch terakhir; batch lain sudah ditulis selama validasi
+            with span('quarantine') as stage:
+                quarantine_stats = quarantine.close()
+                stage.set(rows=quarantine_stats['records'], files=quarantine_stats['files'])
+        if clean_copy is not None:
+            if stopped_early:
+                # File terlalu banyak invalid record: clean copy parsial dibuang
+                clean_copy.abort()
             else:
-                invalid_records += 1
+                with span('clean_copy') as stage:
+                    clean_stats = clean_copy.close()
+                    stage.set(rows=clean_stats['records'] if clean_stats else 0)
+
+        # Check structure (envelope JSON lama wajib punya metadata dan data)
+        envelope_keys = stream_stats.get('envelope_keys')
+        if envelope_keys is not None and not {'metadata', 'data'} <= set(envelope_keys):
+            raise ValueError("Invalid file structure. Missing 'metadata' or 'data' keys.")
+
+        profile_name = None
+        if profiler is not None:
+            with span('profile') as stage:
+                profile_name = profile_blob_name(file_name)
+                profile = profiler.to_dict(
+                    source=f"gs://{bucket_name}/{file_name}",
+                    generation=blob.generation,
+                    table=TABLE_ID,
+                    date=datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+                    complete=not stopped_early,
+                )
+                stage.set(rows=profile['records'], nbytes=write_profile(bucket.blob(profile_name), profile))
+
+        bytes_read = stream_stats.get('bytes_read', 0)
+        result = {
+            'status': 'success',
+            'file_name': file_name,
+            'generation': blob.generation,
+            'cache': 'miss' if cache_key else None,
+            'verdict': 'invalid' if invalid_records > 0 else 'valid',
+            'valid_records': valid_records,
+            'invalid_records': invalid_records,
+            'stopped_early': stopped_early,
+            'rules': rejects.rules,
+            'sample_ids': rejects.sample_ids,
+            'bytes_read': bytes_read,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_sec': round(total_records / elapsed, 1) if elapsed > 0 else None,
+            'bytes_per_sec': round(bytes_read / elapsed, 1) if elapsed > 0 else None,
+            'quarantine': quarantine_stats,
+            'clean_blob': clean_name if clean_stats else None,
+            'clean_records': clean_stats['records'] if clean_stats else None,
+            'profile_blob': profile_name,
+        }
+
+        logger.info(
+            f"Validation complete. Valid: {valid_records}, Invalid: {invalid_records} "
+            f"({result['records_per_sec']} records/sec, {result['bytes_per_sec']} bytes/sec, "
+            f"{bytes_read} bytes read)"
+        )
+
+        if stopped_early:
+            logger.warning(
+                f"Stopped validating {file_name} after {invalid_records} invalid records "
+                f"(VALIDATION_MAX_INVALID={VALIDATION_MAX_INVALID})"
+            )
+        elif invalid_records > 0:
+            logger.warning(f"Found {invalid_records} invalid records in {file_name}: "
+                           f"{json.dumps(rejects.rules)} (sample ids: {json.dumps(rejects.sample_ids)})")
+
+        if quarantine_stats:
+            logger.info(
+                f"Quarantined {quarantine_stats['records']} records in {quarantine_stats['files']} files "
+                f"under {quarantine_stats['prefix']} ({quarantine_stats['close_seconds']}s waiting at close, "
+                f"{quarantine_stats['blocked_seconds']}s blocked)"
+            )
+        if clean_stats:
+            logger.info(f"Wrote clean copy {clean_name} with {clean_stats['records']} records")
 
-        logger.info(f"Validation complete. Valid: {valid_records}, Invalid: {invalid_records}")
+        if cache_key:
+            try:
+                put_entry(bucket, cache_key, fingerprint, blob, result, VALIDATION_CACHE_FOLDER,
+                          max_invalid=VALIDATION_MAX_INVALID, quarantine=VALIDATION_QUARANTINE,
+                          clean_copy=VALIDATION_CLEAN_COPY)
+            except Exception as e:
+                # Cache hanya optimasi; validasi tetap sukses
+                logger.warning(f"Failed to write validation cache entry {cache_key}: {e}")
 
-        if invalid_records > 0:
-            logger.warning(f"Found {invalid_records} invalid records in {file_name}")
-            # Potentially move to a quarantine bucket or send alert
+        return result
 
     except Exception as e:
         logger.error(f"Error validating file {file_name}: {e}")
         # Handle error
+        return {'status': 'error', 'file_name': file_name, 'message': str(e)}
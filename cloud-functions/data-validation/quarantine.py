@@ -0,0 +1,207 @@
+"""
+Quarantine dan clean copy untuk Data Validation
+
+- QuarantineWriter : invalid records dikumpulkan per reason code, lalu tiap batch
+                     penuh ditulis oleh thread pool di background ke
+                     {QUARANTINE_FOLDER}/reason=<reason>/date=<YYYY-MM-DD>/<stem>-<seq>.ndjson.gz
+- CleanCopyWriter  : valid records di-stream oleh satu background thread ke
+                     {CLEAN_FOLDER}/<stem>.<format> (opt-in, lihat VALIDATION_CLEAN_COPY
+                     di main.py)
+
+Thread validasi hanya menambah record ke list dan sesekali submit batch, jadi
+biaya quarantine di jalur validasi kira-kira konstan; yang ditunggu di akhir
+hanya batch terakhir per reason dan sisa antrian clean copy (dibatasi).
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from shared.raw_format import EXTENSIONS, detect_format, raw_blob_name, write_raw_blob
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_FOLDER = 'quarantine'
+CLEAN_FOLDER = 'clean'
+QUARANTINE_FORMAT = 'ndjson.gz'
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+
+def blob_stem(blob_name):
+    """raw/20240101_020000.ndjson.gz → 20240101_020000 (folder pertama dan ekstensi dibuang)"""
+    name = blob_name[:-len(EXTENSIONS[detect_format(blob_name)])]
+    return name.split('/', 1)[1] if '/' in name else name
+
+
+def clean_blob_name(blob_name, folder=CLEAN_FOLDER):
+    """Nama clean copy; envelope json ditulis ulang sebagai ndjson.gz supaya bisa di-stream"""
+    raw_format = detect_format(blob_name)
+    if raw_format == 'json':
+        raw_format = 'ndjson.gz'
+    return raw_blob_name(folder, blob_stem(blob_name), raw_format)
+
+
+class QuarantineWriter:
+    """
+    Tulis invalid records ke quarantine per batch dari thread pool
+
+    add() dipanggil dari loop validasi; jumlah batch yang sedang ditulis dibatasi
+    (max_pending) supaya memory tetap terbatas walaupun sebagian besar file invalid.
+    """
+
+    def __init__(self, bucket, source_name, folder=QUARANTINE_FOLDER, batch_size=DEFAULT_BATCH_SIZE,
+                 workers=DEFAULT_WORKERS, today=None):
+        self.bucket = bucket
+        self.source_name = source_name
+        self.folder = folder
+        self.batch_size = batch_size
+        self.today = today or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        self.stem = blob_stem(source_name).replace('/', '_')
+        self.max_pending = workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quarantine')
+        self._buffers = {}
+        self._sequence = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self.records = 0
+        self.files = []
+        self.failed = 0
+        self.blocked_seconds = 0.0
+
+    def blob_name(self, reason, sequence):
+        return f"{self.folder}/reason={reason}/date={self.today}/{self.stem}-{sequence:05d}{EXTENSIONS[QUARANTINE_FORMAT]}"
+
+    def add(self, reason, record):
+        buffer = self._buffers.get(reason)
+        if buffer is None:
+            buffer = self._buffers[reason] = []
+        buffer.append(record)
+        if len(buffer) >= self.batch_size:
+            self._submit(reason, buffer)
+            self._buffers[reason] = []
+
+    def _submit(self, reason, batch):
+        # Backpressure: tunggu batch tertua jika writer tertinggal jauh
+        if len(self._pending) >= self.max_pending:
+            start = time.perf_counter()
+            self._pending.pop(0).result()
+            self.blocked_seconds += time.perf_counter() - start
+        sequence = self._sequence.get(reason, 0)
+        self._sequence[reason] = sequence + 1
+        self.records += len(batch)
+        self._pending.append(self._executor.submit(self._write_batch, reason, sequence, batch))
+
+    def _write_batch(self, reason, sequence, batch):
+        name = self.blob_name(reason, sequence)
+        metadata = {
+            'source_blob': f"gs://{self.bucket.name}/{self.source_name}",
+            'reason': reason,
+            'quarantined_at': datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            write_raw_blob(self.bucket.blob(name), batch, metadata, QUARANTINE_FORMAT)
+            with self._lock:
+                self.files.append(name)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            logger.error(f"Failed to write quarantine batch {name}: {e}")
+
+    def close(self):
+        """Flush sisa buffer, tunggu semua batch; return stats"""
+        start = time.perf_counter()
+        try:
+            for reason, buffer in self._buffers.items():
+                if buffer:
+                    self._submit(reason, buffer)
+            self._buffers = {}
+            for future in self._pending:
+                future.result()
+            self._pending = []
+        finally:
+            self._executor.shutdown(wait=True)
+        return {
+            'prefix': f"{self.folder}/",
+            'records': self.records - self.failed,
+            'files': len(self.files),
+            'failed_records': self.failed,
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'close_seconds': round(time.perf_counter() - start, 3),
+        }
+
+
+class CleanCopyWriter:
+    """
+    Stream valid records ke clean copy dari satu background thread
+
+    Records dikirim per batch lewat queue terbatas. metadata_fn dipanggil saat
+    thread mulai (batch pertama), setelah envelope metadata sumber terbaca.
+    """
+
+    _DONE = object()
+
+    def __init__(self, blob, metadata_fn, raw_format, batch_size=DEFAULT_BATCH_SIZE, max_batches=4):
+        self.blob = blob
+        self.metadata_fn = metadata_fn
+        self.raw_format = raw_format
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._batch = []
+        self._thread = None
+        self._stats = None
+        self._error = None
+
+    def add(self, record):
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self._put(self._batch)
+            self._batch = []
+
+    def _put(self, batch):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='clean-copy', daemon=True)
+            self._thread.start()
+        self._queue.put(batch)
+
+    def _records(self):
+        while True:
+            batch = self._queue.get()
+            if batch is self._DONE:
+                return
+            yield from batch
+
+    def _run(self):
+        try:
+            self._stats = write_raw_blob(self.blob, self._records(), self.metadata_fn(), self.raw_format)
+        except Exception as e:
+            self._error = e
+            # Kosongkan antrian supaya _put tidak menunggu selamanya
+            for _ in self._records():
+                pass
+
+    def close(self):
+        """Tulis sisa batch dan tunggu upload selesai; return stats write_raw_blob (None jika tanpa record)"""
+        if self._thread is None and not self._batch:
+            return None
+        if self._batch:
+            self._put(self._batch)
+            self._batch = []
+        self._queue.put(self._DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._stats
+
+    def abort(self):
+        """Hentikan clean copy (mis. validasi berhenti lebih awal) dan hapus blob parsial"""
+        if self._thread is not None:
+            self._batch = []
+            self._queue.put(self._DONE)
+            self._thread.join()
+            if self.blob.exists():
+                self.blob.delete()
@@ -0,0 +1,63 @@
+"""
+Cache hasil validasi per isi object
+
+Satu object JSON kecil per isi blob: {CACHE_FOLDER}/{schema fingerprint}/{content key}.json
+Content key diambil dari checksum GCS (md5Hash, atau crc32c + size untuk composite
+object), jadi blob yang ditulis ulang, di-copy atau di-replay dengan isi sama
+cukup membaca entry ini - tanpa download object. Fingerprint schema ikut di
+path, jadi perubahan DDL atau TABLE_RULES otomatis membuat cache baru.
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER = 'validation-cache'
+
+# Field hasil validasi yang disimpan; timing dan status per-invocation tidak ikut
+CACHED_FIELDS = (
+    'verdict', 'valid_records', 'invalid_records', 'stopped_early', 'rules', 'sample_ids',
+    'bytes_read', 'quarantine', 'clean_blob', 'clean_records', 'profile_blob',
+)
+
+
+def content_key(blob):
+    """Key dari checksum object; None jika GCS tidak memberi checksum"""
+    if blob.md5_hash:
+        return 'md5-' + base64.b64decode(blob.md5_hash).hex()
+    if blob.crc32c:
+        return f"crc32c-{base64.b64decode(blob.crc32c).hex()}-{blob.size}"
+    return None
+
+
+def cache_blob_name(key, fingerprint, folder=CACHE_FOLDER):
+    return f"{folder}/{fingerprint}/{key}.json"
+
+
+def get_entry(bucket, key, fingerprint, folder=CACHE_FOLDER):
+    """Entry cache untuk isi object; None jika belum pernah divalidasi"""
+    cache_blob = bucket.blob(cache_blob_name(key, fingerprint, folder))
+    if not cache_blob.exists():
+        return None
+    return json.loads(cache_blob.download_as_bytes())
+
+
+def put_entry(bucket, key, fingerprint, blob, result, folder=CACHE_FOLDER, **details):
+    """Simpan hasil validasi (dipanggil setelah validasi penuh sukses)"""
+    entry = dict(
+        details,
+        key=key,
+        schema=fingerprint,
+        file_name=blob.name,
+        generation=blob.generation,
+        validated_at=datetime.now(timezone.utc).isoformat(),
+        result={field: result.get(field) for field in CACHED_FIELDS},
+    )
+    bucket.blob(cache_blob_name(key, fingerprint, folder)).upload_from_string(
+        json.dumps(entry),
+        content_type='application/json'
+    )
+    return entry
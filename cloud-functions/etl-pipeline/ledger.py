@@ -0,0 +1,52 @@
+"""
+Processed-blob ledger untuk ETL Pipeline
+
+Satu object JSON kecil per raw blob yang sudah di-load: {LEDGER_FOLDER}/{blob_name}@{generation}.json
+Key memakai generation GCS, jadi blob yang ditulis ulang dengan nama sama tetap
+diproses, sementara redelivery Pub/Sub / replay manual untuk blob yang sama di-skip.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FOLDER = 'ledger'
+
+
+def ledger_blob_name(blob_name, generation, folder=LEDGER_FOLDER):
+    return f"{folder}/{blob_name}@{generation}.json"
+
+
+def current_generation(bucket, blob_name):
+    """Generation raw blob saat ini; None jika blob tidak ada"""
+    blob = bucket.get_blob(blob_name)
+    return blob.generation if blob is not None else None
+
+
+def get_entry(bucket, blob_name, generation, folder=LEDGER_FOLDER):
+    """Entry ledger untuk blob+generation; None jika belum pernah di-load"""
+    if generation is None:
+        return None
+    ledger_blob = bucket.blob(ledger_blob_name(blob_name, generation, folder))
+    if not ledger_blob.exists():
+        return None
+    return json.loads(ledger_blob.download_as_bytes())
+
+
+def record_entry(bucket, blob_name, generation, row_count, folder=LEDGER_FOLDER, **details):
+    """Catat load yang selesai (dipanggil setelah load job BigQuery sukses)"""
+    entry = dict(
+        details,
+        blob_name=blob_name,
+        generation=generation,
+        row_count=row_count,
+        processed_at=datetime.now(timezone.utc).isoformat()
+    )
+    bucket.blob(ledger_blob_name(blob_name, generation, folder)).upload_from_string(
+        json.dumps(entry),
+        content_type='application/json'
+    )
+    logger.info(f"Recorded {blob_name}@{generation} in ledger ({row_count} rows)")
+    return entry
@@ -4,13 +4,24 @@ Alternatif GRATIS untuk Cloud Composer/Airflow DAG
 Triggered by Pub/Sub message dari data ingestion
 """
 
+import contextvars
 import functions_framework
-from google.cloud import storage, bigquery
-from google.cloud import pubsub_v1
 import json
 from datetime import datetime, timezone, timedelta
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# google.cloud.bigquery di-import lazy (hanya load path yang butuh) untuk cold start
+from shared.clients import client_stats, get_bigquery_client, get_storage_client
+from shared.metrics import instrumented, span
+from shared.publisher import BatchPublisher
+from shared.raw_format import detect_format, is_profile, iter_raw_records, read_raw_blob
+from shared.schema import RejectReport, get_schema
+from shared.sharding import is_manifest, read_manifest
+from ledger import current_generation, get_entry, record_entry
+from stream_load import DEFAULT_CHUNK_SIZE, NdjsonGzipStream
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -20,17 +31,45 @@ logger = logging.getLogger(__name__)
 PROJECT_ID = os.environ.get('GCP_PROJECT')
 BUCKET_NAME = os.environ.get('BUCKET_NAME', 'umkm-data-lake')
 DATASET_ID = os.environ.get('DATASET_ID', 'umkm_analytics')
+# Topic ETL sendiri, dipakai untuk fan-out satu message per shard dari manifest
+ETL_TRIGGER_TOPIC = os.environ.get('ETL_TRIGGER_TOPIC', 'etl-pipeline-trigger')
+# Streaming mode: blob → transform → load job per chunk, memory konstan
+ETL_STREAMING = os.environ.get('ETL_STREAMING', 'false').lower() == 'true'
+ETL_CHUNK_SIZE = int(os.environ.get('ETL_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+# Transform engine: 'dict' (per-record) atau 'arrow' (columnar, lihat columnar_transform.py)
+ETL_TRANSFORM_ENGINE = os.environ.get('ETL_TRANSFORM_ENGINE', 'dict')
+# Load path: 'json' (load_table_from_json) atau 'parquet' (buffer Parquet bertipe)
+ETL_LOAD_FORMAT = os.environ.get('ETL_LOAD_FORMAT', 'json')
+# Micro-batch: manifest diproses sebagai satu batch (bukan fan-out per shard)
+ETL_MICRO_BATCH = os.environ.get('ETL_MICRO_BATCH', 'false').lower() == 'true'
+ETL_READ_WORKERS = int(os.environ.get('ETL_READ_WORKERS', 8))
+# Ledger blob yang sudah di-load (blob name + generation); event dengan force=true tetap diproses
+ETL_LEDGER = os.environ.get('ETL_LEDGER', 'true').lower() == 'true'
+LEDGER_FOLDER = os.environ.get('LEDGER_FOLDER', 'ledger')
+
+_publisher = None
+
+
+def log_rejects(report, engine):
+    """Ringkas records yang ditolak validator raw_sales dalam satu log line"""
+    if report['rejected']:
+        logger.warning(
+            f"Rejected {report['rejected']} transformed records ({engine} engine) failing raw_sales schema: "
+            f"{json.dumps(report['rules'])} (sample ids: {json.dumps(report['sample_ids'])})"
+        )
 
 
 def load_raw_data_from_gcs(bucket_name, blob_name):
     """Load raw data from Cloud Storage"""
     try:
-        storage_client = storage.Client()
+        storage_client = get_storage_client(PROJECT_ID)
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         
-        content = blob.download_as_string()
-        data = json.loads(content)
+        # json, ndjson.gz atau parquet - dideteksi dari nama blob
+        with span('load_gcs') as stage:
+            data = read_raw_blob(blob)
+            stage.set(rows=len(data.get('data', [])))
         
         logger.info(f"Loaded data from gs://{bucket_name}/{blob_name}")
         return data
@@ -40,38 +79,64 @@ def load_raw_data_from_gcs(bucket_name, blob_name):
         raise
 
 
+def transform_record(record, today=None):
+    """Clean and enrich satu record; None untuk delete marker dari snapshot diff"""
+    # Delete markers dari snapshot diff tidak punya baris penjualan
+    if record.get('change_type') == 'delete':
+        return None
+    
+    today = today or datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    transformed = {
+        'product_id': str(record.get('product_id', '')),
+        'product_name': str(record.get('product_name', '')).strip(),
+        'category': str(record.get('category', 'Unknown')),
+        'price': float(record.get('price', 0)),
+        'original_price': float(record.get('original_price', record.get('price', 0))),
+        'discount_percent': int(record.get('discount_percent', 0)),
+        'sales_count': int(record.get('sales_count', 0)),
+        'rating': float(record.get('rating', 0)),
+        'review_count': int(record.get('review_count', 0)),
+        'stock': int(record.get('stock', 0)),
+        'seller_name': str(record.get('seller_name', '')),
+        'seller_location': str(record.get('seller_location', '')),
+        'ingestion_date': today,
+        'sale_date': today
+    }
+    
+    # Calculate revenue
+    transformed['revenue'] = transformed['price'] * transformed['sales_count']
+    return transformed
+
+
 def transform_data(raw_data):
     """Transform raw data - cleaning and enrichment"""
     try:
         metadata = raw_data.get('metadata', {})
         records = raw_data.get('data', [])
         
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
         transformed_records = []
-        
-        for record in records:
-            # Clean and transform each record
-            transformed = {
-                'product_id': str(record.get('product_id', '')),
-                'product_name': str(record.get('product_name', '')).strip(),
-                'category': str(record.get('category', 'Unknown')),
-                'price': float(record.get('price', 0)),
-                'original_price': float(record.get('original_price', record.get('price', 0))),
-                'discount_percent': int(record.get('discount_percent', 0)),
-                'sales_count': int(record.get('sales_count', 0)),
-                'rating': float(record.get('rating', 0)),
-                'review_count': int(record.get('review_count', 0)),
-                'stock': int(record.get('stock', 0)),
-                'seller_name': str(record.get('seller_name', '')),
-                'seller_location': str(record.get('seller_location', '')),
-                'ingestion_date': datetime.now(timezone.utc).strftime('%Y-%m-%d'),
-                'sale_date': datetime.now(timezone.utc).strftime('%Y-%m-%d')
-            }
-            
-            # Calculate revenue
-            transformed['revenue'] = transformed['price'] * transformed['sales_count']
-            
-            transformed_records.append(transformed)
-        
+        skipped_deletes = 0
+        # Validator raw_sales hasil compile DDL, dijalankan di loop transform yang sama
+        validate = get_schema('raw_sales').validate
+        rejects = RejectReport()
+        
+        with span('transform', engine='dict') as stage:
+            for record in records:
+                transformed = transform_record(record, today)
+                if transformed is None:
+                    skipped_deletes += 1
+                    continue
+                reason = validate(transformed)
+                if reason is not None:
+                    rejects.add(reason, transformed)
+                    continue
+                transformed_records.append(transformed)
+            stage.set(rows=len(transformed_records), rejected=rejects.rejected)
+        
+        if skipped_deletes:
+            logger.info(f"Skipped {skipped_deletes} delete markers")
+        log_rejects(rejects.as_dict(len(transformed_records) + rejects.rejected), 'dict')
         logger.info(f"Transformed {len(transformed_records)} records")
         return transformed_records
         
@@ -80,68 +145,279 @@ def transform_data(raw_data):
         raise
 
 
-def load_to_bigquery(records, table_id):
-    """Load transformed data to BigQuery"""
+def transform_data_columnar(raw_data):
+    """Transform raw data dengan Arrow engine; return pyarrow.Table (kolom sama dengan transform_data)"""
+    # pyarrow di-import lazy supaya cold start health_check tetap ringan
+    from columnar_transform import transform_columnar
+    
     try:
-        client = bigquery.Client()
+        with span('transform', engine='arrow') as stage:
+            table = transform_columnar(raw_data.get('data', []))
+            table, report = get_schema('raw_sales').filter_table(table)
+            stage.set(rows=table.num_rows, rejected=report['rejected'])
+        log_rejects(report, 'arrow')
+        return table
+    except Exception as e:
+        logger.error(f"Columnar transform failed: {e}")
+        raise
+
+
+def iter_transformed(records, counts):
+    """
+    Transform records satu per satu (streaming); counts diisi transformed,
+    skipped_deletes, sale_dates (partition yang disentuh) dan rejects
+    (RejectReport records yang gagal validator raw_sales)
+    """
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    sale_dates = counts.setdefault('sale_dates', set())
+    rejects = counts.setdefault('rejects', RejectReport())
+    validate = get_schema('raw_sales').validate
+    for record in records:
+        transformed = transform_record(record, today)
+        if transformed is None:
+            counts['skipped_deletes'] += 1
+            continue
+        reason = validate(transformed)
+        if reason is not None:
+            rejects.add(reason, transformed)
+            continue
+        counts['transformed'] += 1
+        sale_dates.add(transformed['sale_date'])
+        yield transformed
+
+
+def _log_load_job(load_format, job, row_count, upload_bytes, elapsed, table_ref):
+    """Log bytes dan durasi load job supaya jalur json dan parquet bisa dibandingkan"""
+    job_seconds = (job.ended - job.started).total_seconds() if job.started and job.ended else None
+    stats = {
+        'format': load_format,
+        'rows': row_count,
+        'upload_bytes': upload_bytes if upload_bytes is not None else job.input_file_bytes,
+        'elapsed_seconds': round(elapsed, 3),
+        'job_seconds': job_seconds,
+    }
+    logger.info(
+        f"Loaded {row_count} records to {table_ref} via {load_format} "
+        f"({stats['upload_bytes']} bytes uploaded, {stats['elapsed_seconds']}s total, "
+        f"job {job_seconds}s)"
+    )
+    return stats
+
+
+def load_to_bigquery(records, table_id, load_format=None):
+    """
+    Load transformed data to BigQuery
+    
+    Args:
+        records: list of dict atau pyarrow.Table (hasil Arrow engine)
+        load_format: 'parquet' atau 'json' (default ETL_LOAD_FORMAT); json jadi fallback
+    
+    Returns:
+        dict stats load job (format, rows, upload_bytes, elapsed_seconds, job_seconds)
+    """
+    from google.cloud import bigquery
+    
+    load_format = load_format or ETL_LOAD_FORMAT
+    
+    try:
+        client = get_bigquery_client(PROJECT_ID)
         
         table_ref = f"{PROJECT_ID}.{DATASET_ID}.{table_id}"
+        start = time.monotonic()
+        
+        with span('bq_load', format=load_format) as stage:
+            if load_format == 'parquet':
+                from parquet_load import bigquery_schema, to_parquet_buffer
+                
+                buffer, row_count = to_parquet_buffer(records)
+                upload_bytes = buffer.getbuffer().nbytes
+                job_config = bigquery.LoadJobConfig(
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                    source_format=bigquery.SourceFormat.PARQUET,
+                    schema=bigquery_schema()
+                )
+                job = client.load_table_from_file(buffer, table_ref, job_config=job_config)
+            else:
+                if not isinstance(records, list):
+                    records = records.to_pylist()
+                row_count = len(records)
+                # Ukuran NDJSON yang di-upload client dibaca dari statistik job
+                upload_bytes = None
+                
+                # Configure load job
+                job_config = bigquery.LoadJobConfig(
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+                )
+                
+                # Load data
+                job = client.load_table_from_json(
+                    records,
+                    table_ref,
+                    job_config=job_config
+                )
+            
+            job.result()  # Wait for job to complete
+            
+            stats = _log_load_job(load_format, job, row_count, upload_bytes, time.monotonic() - start, table_ref)
+            stage.set(rows=row_count, nbytes=stats['upload_bytes'], job_seconds=stats['job_seconds'])
+        return stats
         
-        # Configure load job
-        job_config = bigquery.LoadJobConfig(
-            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
-        )
-        
-        # Convert to newline delimited JSON
-        ndjson = '\n'.join(json.dumps(record) for record in records)
+    except Exception as e:
+        logger.error(f"BigQuery load failed ({load_format}): {e}")
+        raise
+
+
+def _iter_blobs_transformed(bucket, blob_names, chunk_size, counts):
+    """Records hasil transform dari beberapa blob berurutan; counts['blob_rows'] per blob"""
+    blob_rows = counts.setdefault('blob_rows', {})
+    for blob_name in blob_names:
+        before = counts['transformed']
+        yield from iter_transformed(iter_raw_records(bucket.blob(blob_name), chunk_size), counts)
+        blob_rows[blob_name] = counts['transformed'] - before
+
+
+def stream_to_bigquery(bucket_name, blob_name, table_id, chunk_size=None):
+    """
+    Streaming ETL: baca raw blob sebagai stream, transform dan serialize per chunk
+    langsung ke upload stream load job - peak memory tidak bergantung ukuran blob
+    
+    blob_name boleh list: semua blob di-stream berurutan ke satu load job.
+    
+    Returns:
+        dict counts: transformed, skipped_deletes, sale_dates, rejects, raw_bytes,
+        upload_bytes, blob_rows
+    """
+    from google.cloud import bigquery
+    
+    blob_names = [blob_name] if isinstance(blob_name, str) else list(blob_name)
+    source = f"gs://{bucket_name}/{blob_names[0]}" if len(blob_names) == 1 else f"{len(blob_names)} blobs"
+    try:
+        chunk_size = chunk_size or ETL_CHUNK_SIZE
+        bucket = get_storage_client(PROJECT_ID).bucket(bucket_name)
+        client = get_bigquery_client(PROJECT_ID)
+        table_ref = f"{PROJECT_ID}.{DATASET_ID}.{table_id}"
         
-        # Load data
-        job = client.load_table_from_json(
-            records,
-            table_ref,
-            job_config=job_config
+        # Load, transform dan upload berjalan sebagai satu stream, jadi diukur sebagai satu stage
+        with span('bq_load', format='ndjson.gz', mode='streaming') as stage:
+            counts = {'transformed': 0, 'skipped_deletes': 0, 'sale_dates': set()}
+            records = _iter_blobs_transformed(bucket, blob_names, chunk_size, counts)
+            stream = NdjsonGzipStream(records, chunk_size)
+            
+            job_config = bigquery.LoadJobConfig(
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+            )
+            job = client.load_table_from_file(stream, table_ref, job_config=job_config)
+            job.result()  # Wait for job to complete
+            
+            counts.update(raw_bytes=stream.raw_bytes, upload_bytes=stream.compressed_bytes)
+            stage.set(rows=counts['transformed'], nbytes=counts['upload_bytes'])
+        if counts['skipped_deletes']:
+            logger.info(f"Skipped {counts['skipped_deletes']} delete markers")
+        rejects = counts.setdefault('rejects', RejectReport())
+        log_rejects(rejects.as_dict(counts['transformed'] + rejects.rejected), 'streaming')
+        logger.info(
+            f"Streamed {counts['transformed']} records from {source} "
+            f"to {table_ref} ({counts['raw_bytes']} bytes NDJSON, "
+            f"{counts['upload_bytes']} bytes uploaded)"
         )
-        
-        job.result()  # Wait for job to complete
-        
-        logger.info(f"Loaded {len(records)} records to {table_ref}")
-        return True
+        return counts
         
     except Exception as e:
-        logger.error(f"BigQuery load failed: {e}")
+        logger.error(f"Streaming load failed: {e}")
         raise
 
 
-def generate_daily_summary(date_str=None):
-    """Generate daily summary statistics"""
+def generate_daily_summary(sale_dates=None):
+    """
+    Refresh daily summary hanya untuk partition sale_date yang disentuh batch ini
+    
+    Satu MERGE: raw_sales di-scan sekali untuk partition tersebut (top_category
+    dihitung dari agregat per kategori, bukan subquery kedua), lalu baris
+    summary di-upsert sehingga run berulang tidak menambah duplikat.
+    
+    Args:
+        sale_dates: 'YYYY-MM-DD' atau iterable tanggal (default: hari ini UTC)
+    
+    Returns:
+        dict stats (dates, bytes_processed, bytes_billed, rows_affected) atau False jika gagal
+    """
+    from datetime import date
+    
+    from google.cloud import bigquery
+    
     try:
-        client = bigquery.Client()
+        client = get_bigquery_client(PROJECT_ID)
         
-        if date_str is None:
-            date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        if sale_dates is None:
+            sale_dates = [datetime.now(timezone.utc).strftime('%Y-%m-%d')]
+        elif isinstance(sale_dates, str):
+            sale_dates = [sale_dates]
+        sale_dates = sorted({str(value) for value in sale_dates})
+        if not sale_dates:
+            logger.info("No sale_date partitions touched, skipping daily summary")
+            return False
         
         query = f"""
-        INSERT INTO `{PROJECT_ID}.{DATASET_ID}.daily_summary`
-        SELECT 
-            DATE('{date_str}') as summary_date,
-            SUM(revenue) as total_sales,
-            SUM(sales_count) as total_quantity,
-            AVG(price) as avg_price,
-            (SELECT category FROM `{PROJECT_ID}.{DATASET_ID}.raw_sales` 
-             WHERE ingestion_date = DATE('{date_str}')
-             GROUP BY category 
-             ORDER BY SUM(sales_count) DESC 
-             LIMIT 1) as top_category
-        FROM `{PROJECT_ID}.{DATASET_ID}.raw_sales`
-        WHERE ingestion_date = DATE('{date_str}')
+        MERGE `{PROJECT_ID}.{DATASET_ID}.daily_summary` AS target
+        USING (
+            WITH by_category AS (
+                SELECT
+                    sale_date,
+                    category,
+                    SUM(revenue) AS revenue,
+                    SUM(sales_count) AS quantity,
+                    SUM(price) AS price_sum,
+                    COUNT(price) AS price_count
+                FROM `{PROJECT_ID}.{DATASET_ID}.raw_sales`
+                WHERE sale_date IN UNNEST(@sale_dates)
+                GROUP BY sale_date, category
+            )
+            SELECT
+                sale_date AS summary_date,
+                SUM(revenue) AS total_sales,
+                SUM(quantity) AS total_quantity,
+                SAFE_DIVIDE(SUM(price_sum), SUM(price_count)) AS avg_price,
+                ARRAY_AGG(category ORDER BY quantity DESC LIMIT 1)[OFFSET(0)] AS top_category
+            FROM by_category
+            GROUP BY sale_date
+        ) AS source
+        ON target.summary_date = source.summary_date
+            AND target.summary_date IN UNNEST(@sale_dates)
+        WHEN MATCHED THEN UPDATE SET
+            total_sales = source.total_sales,
+            total_quantity = source.total_quantity,
+            avg_price = source.avg_price,
+            top_category = source.top_category
+        WHEN NOT MATCHED THEN
+            INSERT (summary_date, total_sales, total_quantity, avg_price, top_category)
+            VALUES (source.summary_date, source.total_sales, source.total_quantity,
+                    source.avg_price, source.top_category)
         """
         
-        job = client.query(query)
-        job.result()
-        
-        logger.info(f"Generated daily summary for {date_str}")
-        return True
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter(
+                'sale_dates', 'DATE', [date.fromisoformat(value) for value in sale_dates]
+            )
+        ])
+        with span('summary', partitions=len(sale_dates)) as stage:
+            job = client.query(query, job_config=job_config)
+            job.result()
+            stage.set(rows=job.num_dml_affected_rows, nbytes=job.total_bytes_processed)
+        
+        stats = {
+            'dates': sale_dates,
+            'bytes_processed': job.total_bytes_processed,
+            'bytes_billed': job.total_bytes_billed,
+            'rows_affected': job.num_dml_affected_rows,
+        }
+        logger.info(
+            f"Refreshed daily summary for {len(sale_dates)} partitions {sale_dates}: "
+            f"{stats['rows_affected']} rows merged, {stats['bytes_processed']} bytes processed, "
+            f"{stats['bytes_billed']} bytes billed"
+        )
+        return stats
         
     except Exception as e:
         logger.error(f"Failed to generate summary: {e}")
@@ -149,7 +425,139 @@ def generate_daily_summary(date_str=None):
         return False
 
 
+def get_batch_publisher():
+    """Batch publisher per proses untuk fan-out shard"""
+    global _publisher
+    if _publisher is None:
+        _publisher = BatchPublisher(PROJECT_ID)
+    return _publisher
+
+
+def manifest_shard_names(bucket_name, manifest_name):
+    bucket = get_storage_client(PROJECT_ID).bucket(bucket_name)
+    return [shard['name'] for shard in read_manifest(bucket, manifest_name)['shards']]
+
+
+def fan_out_manifest(bucket_name, manifest_name, event_data):
+    """
+    Publish satu ETL trigger message per shard di manifest
+    
+    Returns list nama shard yang di-publish (kosong jika manifest hanya punya
+    satu shard - shard itu langsung diproses oleh invocation ini).
+    """
+    bucket = get_storage_client(PROJECT_ID).bucket(bucket_name)
+    manifest = read_manifest(bucket, manifest_name)
+    shard_names = [shard['name'] for shard in manifest['shards']]
+    
+    if len(shard_names) <= 1:
+        return shard_names, False
+    
+    publisher = get_batch_publisher()
+    for shard in manifest['shards']:
+        publisher.publish(ETL_TRIGGER_TOPIC, {
+            'blob_name': shard['name'],
+            'manifest_name': manifest_name,
+            'ingestion_id': event_data.get('ingestion_id'),
+            'record_count': shard['row_count']
+        })
+    flush_result = publisher.flush()
+    if flush_result['failed']:
+        raise RuntimeError(f"Failed to publish {flush_result['failed']} shard messages")
+    
+    logger.info(f"Fanned out {len(shard_names)} shards from {manifest_name}")
+    return shard_names, True
+
+
+def list_raw_blobs(bucket_name, prefix):
+    """Nama raw blob (json/ndjson.gz/parquet) di bawah prefix, tanpa manifest"""
+    storage_client = get_storage_client(PROJECT_ID)
+    blob_names = []
+    for blob in storage_client.list_blobs(bucket_name, prefix=prefix):
+        if is_manifest(blob.name) or is_profile(blob.name):
+            continue
+        try:
+            detect_format(blob.name)
+        except ValueError:
+            continue
+        blob_names.append(blob.name)
+    return sorted(blob_names)
+
+
+def lookup_ledger(bucket, blob_names, max_workers=None):
+    """{blob_name: (generation, ledger entry atau None)} - lookup paralel"""
+    def lookup(blob_name):
+        generation = current_generation(bucket, blob_name)
+        return blob_name, (generation, get_entry(bucket, blob_name, generation, LEDGER_FOLDER))
+    
+    max_workers = max(1, min(max_workers or ETL_READ_WORKERS, len(blob_names)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(lookup, blob_names))
+
+
+def _read_and_transform(bucket_name, blob_name):
+    raw_data = load_raw_data_from_gcs(bucket_name, blob_name)
+    if ETL_TRANSFORM_ENGINE == 'arrow':
+        return transform_data_columnar(raw_data)
+    return transform_data(raw_data)
+
+
+def run_micro_batch(bucket_name, blob_names, table_id='raw_sales', max_workers=None):
+    """
+    Micro-batch ETL: banyak raw blob dalam satu load job BigQuery
+    
+    Satu load job atomic (semua row masuk atau tidak sama sekali), jadi retry
+    setelah kegagalan tidak menduplikasi row yang sudah ter-load; ledger ditulis
+    caller setelah job ini sukses. ETL_STREAMING dan ETL_TRANSFORM_ENGINE berlaku
+    sama seperti jalur satu blob.
+    
+    Returns:
+        dict blob_count, records_processed, sale_dates, load_jobs, blob_rows {blob_name: rows}
+    """
+    if ETL_STREAMING:
+        # Blob di-stream berurutan ke satu upload: memory tetap konstan
+        counts = stream_to_bigquery(bucket_name, blob_names, table_id)
+        blob_rows = counts['blob_rows']
+        sale_dates = counts['sale_dates']
+        load_jobs = 1
+    else:
+        max_workers = max(1, min(max_workers or ETL_READ_WORKERS, len(blob_names)))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # copy_context per task supaya span load_gcs/transform ikut tercatat di invocation ini
+            futures = [pool.submit(contextvars.copy_context().run, _read_and_transform, bucket_name, name)
+                       for name in blob_names]
+            batches = [future.result() for future in futures]
+        blob_rows = {name: len(batch) for name, batch in zip(blob_names, batches)}
+        
+        if ETL_TRANSFORM_ENGINE == 'arrow':
+            import pyarrow as pa
+            
+            batch = pa.concat_tables(batches)
+            sale_dates = set(batch.column('sale_date').unique().to_pylist())
+        else:
+            batch = [record for records in batches for record in records]
+            sale_dates = {record['sale_date'] for record in batch}
+        
+        load_jobs = 0
+        if len(batch):
+            load_to_bigquery(batch, table_id)
+            load_jobs = 1
+    
+    result = {
+        'blob_count': len(blob_names),
+        'records_processed': sum(blob_rows.values()),
+        'sale_dates': sorted(sale_dates),
+        'load_jobs': load_jobs,
+        'blob_rows': blob_rows,
+    }
+    logger.info(
+        f"Micro-batch loaded {result['records_processed']} records from {len(blob_names)} blobs "
+        f"in {result['load_jobs']} load job ({len(sale_dates)} sale_date partitions)"
+    )
+    return result
+
+
 @functions_framework.cloud_event
+@instrumented('etl-pipeline')
 def etl_pipeline(cloud_event):
     """
     Main ETL Pipeline function
@@ -160,6 +568,12 @@ def etl_pipeline(cloud_event):
     2. Transform data
     3. Load to BigQuery
     4. Generate daily summary
+    
+    Micro-batch: event dengan blob_names (list) atau prefix diproses sebagai
+    satu batch - satu load job atomic dan satu refresh summary.
+    
+    Blob yang sudah tercatat di ledger (nama + generation) di-skip kecuali
+    event membawa force=true.
     """
     try:
         logger.info("Starting ETL Pipeline")
@@ -181,35 +595,131 @@ def etl_pipeline(cloud_event):
         logger.info(f"Event data: {event_data}")
         
         blob_name = event_data.get('blob_name')
+        manifest_name = event_data.get('manifest_name')
+        blob_names = event_data.get('blob_names')
+        prefix = event_data.get('prefix')
+        force = bool(event_data.get('force'))
+        bucket = get_storage_client(PROJECT_ID).bucket(BUCKET_NAME)
+        
+        if not blob_name and manifest_name and ETL_MICRO_BATCH:
+            blob_names = manifest_shard_names(BUCKET_NAME, manifest_name)
+        elif not blob_name and manifest_name:
+            shard_names, fanned_out = fan_out_manifest(BUCKET_NAME, manifest_name, event_data)
+            if fanned_out:
+                return {
+                    'status': 'fanned_out',
+                    'manifest_name': manifest_name,
+                    'shard_count': len(shard_names),
+                    'timestamp': datetime.now(timezone.utc).isoformat()
+                }
+            blob_name = shard_names[0] if shard_names else None
+        
+        if not blob_name and not blob_names and prefix:
+            blob_names = list_raw_blobs(BUCKET_NAME, prefix)
+            if not blob_names:
+                logger.info(f"No raw blobs under prefix {prefix}")
+                return {'status': 'no_data', 'prefix': prefix}
+        
+        if not blob_name and blob_names:
+            ledger = lookup_ledger(bucket, blob_names) if ETL_LEDGER else {}
+            skipped = [] if force else [name for name in blob_names if ledger.get(name, (None, None))[1]]
+            if skipped:
+                logger.info(f"Skipping {len(skipped)} already processed blobs (ledger)")
+                skipped_names = set(skipped)
+                blob_names = [name for name in blob_names if name not in skipped_names]
+            if not blob_names:
+                return {
+                    'status': 'already_processed',
+                    'skipped_blobs': len(skipped),
+                    'timestamp': datetime.now(timezone.utc).isoformat()
+                }
+            
+            logger.info(f"Step 1-3: Micro-batch ETL over {len(blob_names)} blobs")
+            batch_result = run_micro_batch(BUCKET_NAME, blob_names, 'raw_sales')
+            
+            for name, row_count in batch_result['blob_rows'].items():
+                generation = ledger.get(name, (None, None))[0]
+                if generation is not None:
+                    record_entry(bucket, name, generation, row_count, LEDGER_FOLDER,
+                                 ingestion_id=event_data.get('ingestion_id'), forced=force)
+            
+            # Step 4: Satu refresh summary per batch, hanya partition yang disentuh
+            logger.info("Step 4: Generating daily summary")
+            generate_daily_summary(batch_result['sale_dates'])
+            
+            result = dict(
+                batch_result,
+                status='success',
+                skipped_blobs=len(skipped),
+                timestamp=datetime.now(timezone.utc).isoformat()
+            )
+            logger.info(f"ETL Pipeline completed: {result}")
+            logger.info(f"Client registry stats: {client_stats()}")
+            return result
         
         if not blob_name:
             logger.error("No blob_name in event data")
             return {'status': 'error', 'message': 'No blob_name provided'}
         
-        # Step 1: Load raw data
-        logger.info("Step 1: Loading raw data from GCS")
-        raw_data = load_raw_data_from_gcs(BUCKET_NAME, blob_name)
-        
-        # Step 2: Transform
-        logger.info("Step 2: Transforming data")
-        transformed_data = transform_data(raw_data)
-        
-        # Step 3: Load to BigQuery
-        logger.info("Step 3: Loading to BigQuery")
-        load_to_bigquery(transformed_data, 'raw_sales')
+        # Step 0: Cek ledger - redelivery/replay untuk blob+generation yang sama cukup di-skip
+        generation = current_generation(bucket, blob_name) if ETL_LEDGER else None
+        entry = None if force else get_entry(bucket, blob_name, generation, LEDGER_FOLDER)
+        if entry:
+            logger.info(f"Skipping {blob_name}@{generation}: already processed at {entry.get('processed_at')}")
+            return {
+                'status': 'already_processed',
+                'blob_name': blob_name,
+                'generation': generation,
+                'records_processed': entry.get('row_count'),
+                'processed_at': entry.get('processed_at'),
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }
         
-        # Step 4: Generate summary
+        if ETL_STREAMING:
+            # Step 1-3: Load, transform dan load ke BigQuery sebagai satu stream
+            logger.info("Step 1-3: Streaming raw data from GCS to BigQuery")
+            counts = stream_to_bigquery(BUCKET_NAME, blob_name, 'raw_sales')
+            records_processed = counts['transformed']
+            sale_dates = counts['sale_dates']
+        else:
+            # Step 1: Load raw data
+            logger.info("Step 1: Loading raw data from GCS")
+            raw_data = load_raw_data_from_gcs(BUCKET_NAME, blob_name)
+            
+            # Step 2: Transform
+            logger.info(f"Step 2: Transforming data ({ETL_TRANSFORM_ENGINE} engine)")
+            if ETL_TRANSFORM_ENGINE == 'arrow':
+                # Table langsung dipakai jalur parquet; jalur json mengubahnya ke list
+                transformed_data = transform_data_columnar(raw_data)
+            else:
+                transformed_data = transform_data(raw_data)
+            
+            # Step 3: Load to BigQuery
+            logger.info("Step 3: Loading to BigQuery")
+            load_to_bigquery(transformed_data, 'raw_sales')
+            records_processed = len(transformed_data)
+            if ETL_TRANSFORM_ENGINE == 'arrow':
+                sale_dates = set(transformed_data.column('sale_date').unique().to_pylist())
+            else:
+                sale_dates = {record['sale_date'] for record in transformed_data}
+        
+        if generation is not None:
+            record_entry(bucket, blob_name, generation, records_processed, LEDGER_FOLDER,
+                         ingestion_id=event_data.get('ingestion_id'), forced=force)
+        
+        # Step 4: Generate summary untuk partition yang disentuh
         logger.info("Step 4: Generating daily summary")
-        generate_daily_summary()
+        generate_daily_summary(sale_dates)
         
         result = {
             'status': 'success',
-            'records_processed': len(transformed_data),
+            'records_processed': records_processed,
             'blob_name': blob_name,
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
         
         logger.info(f"ETL Pipeline completed: {result}")
+        logger.info(f"Client registry stats: {client_stats()}")
         return result
         
     except Exception as e:
@@ -226,14 +736,21 @@ def etl_pipeline_http(request):
     try:
         from cloudevents.http import CloudEvent
         
-        # Get blob_name from request
-        request_json = request.get_json(silent=True)
-        blob_name = request_json.get('blob_name') if request_json else None
+        # Get blob_name (atau manifest_name untuk output sharded, blob_names/prefix
+        # untuk micro-batch) from request
+        request_json = request.get_json(silent=True) or {}
+        payload = {
+            key: request_json[key]
+            for key in ('blob_name', 'manifest_name', 'blob_names', 'prefix') if request_json.get(key)
+        }
+        if payload and request_json.get('force'):
+            # Reprocess walaupun blob sudah tercatat di ledger
+            payload['force'] = True
         
-        if not blob_name:
+        if not payload:
             return json.dumps({
                 'status': 'error',
-                'message': 'blob_name required in request body'
+                'message': 'blob_name, manifest_name, blob_names or prefix required in request body'
             }), 400
         
         # Create mock event
@@ -243,7 +760,7 @@ def etl_pipeline_http(request):
         }
         
         import base64
-        message_data = base64.b64encode(json.dumps({'blob_name': blob_name}).encode()).decode()
+        message_data = base64.b64encode(json.dumps(payload).encode()).decode()
         data = {"message": {"data": message_data}}
         
         event = CloudEvent(attributes, data)
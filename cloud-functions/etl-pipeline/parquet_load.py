@@ -0,0 +1,67 @@
+"""
+Parquet load path untuk ETL Pipeline
+
+Batch hasil transform ditulis ke buffer Parquet in-memory dengan tipe dari
+schema raw_sales, lalu di-load dengan SourceFormat.PARQUET. BigQuery membaca
+kolom bertipe langsung, tanpa re-serialize tiap row ke JSON dan parse teks.
+"""
+
+import io
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from shared.schema import load_schema
+
+logger = logging.getLogger(__name__)
+
+# Schema load raw_sales dari shared/schema.py (LOAD_SCHEMAS), sama dengan `bq mk` di deploy
+RAW_SALES_SCHEMA = load_schema('raw_sales')
+
+ARROW_TYPES = {
+    'STRING': pa.string(),
+    'FLOAT': pa.float64(),
+    'INTEGER': pa.int64(),
+    'DATE': pa.date32(),
+}
+
+DEFAULT_COMPRESSION = 'zstd'
+
+
+def arrow_schema(schema=RAW_SALES_SCHEMA):
+    return pa.schema([(name, ARROW_TYPES[field_type]) for name, field_type in schema])
+
+
+def bigquery_schema(schema=RAW_SALES_SCHEMA):
+    from google.cloud import bigquery
+
+    return [bigquery.SchemaField(name, field_type) for name, field_type in schema]
+
+
+def to_arrow_table(batch, schema=RAW_SALES_SCHEMA):
+    """List of dict atau pyarrow.Table → Table dengan tipe kolom dari schema"""
+    target = arrow_schema(schema)
+    if not isinstance(batch, pa.Table):
+        columns = {name: [record.get(name) for record in batch] for name in target.names}
+        # Tanggal dari transform berupa string 'YYYY-MM-DD'; di-cast di bawah
+        batch = pa.table({
+            name: pa.array(values, type=pa.string() if pa.types.is_date(target.field(name).type)
+                           else target.field(name).type)
+            for name, values in columns.items()
+        })
+    return batch.select(target.names).cast(target)
+
+
+def to_parquet_buffer(batch, schema=RAW_SALES_SCHEMA, compression=DEFAULT_COMPRESSION):
+    """
+    Serialize batch ke Parquet in-memory
+
+    Returns:
+        (io.BytesIO di posisi 0, jumlah rows)
+    """
+    table = to_arrow_table(batch, schema)
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression=compression)
+    buffer.seek(0)
+    return buffer, table.num_rows
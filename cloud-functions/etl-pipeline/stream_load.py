@@ -0,0 +1,78 @@
+"""
+Streaming load untuk ETL Pipeline
+
+Records hasil transform di-serialize per chunk menjadi NDJSON ter-gzip dan
+dibaca langsung oleh upload stream load job BigQuery, jadi tidak ada list
+records, string NDJSON, atau file sementara sebesar blob di memory.
+"""
+
+import json
+import logging
+import zlib
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# wbits 31 = deflate dengan header/trailer gzip
+_GZIP_WBITS = 31
+
+
+def iter_chunks(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Potong iterable records menjadi list berukuran chunk_size"""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class NdjsonGzipStream:
+    """
+    File-like (read/tell) yang menghasilkan NDJSON gzip dari iterable records
+
+    Hanya satu chunk records dan sisa bytes terkompresi yang belum dibaca
+    yang ada di memory; upload client yang menentukan ukuran read().
+    """
+
+    def __init__(self, records, chunk_size=DEFAULT_CHUNK_SIZE, compresslevel=1):
+        self._chunks = iter_chunks(records, chunk_size)
+        self._compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, _GZIP_WBITS)
+        self._buffer = bytearray()
+        self._position = 0
+        self._exhausted = False
+        self.records = 0
+        self.raw_bytes = 0
+
+    def _produce(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._buffer += self._compressor.flush()
+            self._exhausted = True
+            return
+        payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk).encode('utf-8')
+        self.records += len(chunk)
+        self.raw_bytes += len(payload)
+        self._buffer += self._compressor.compress(payload)
+
+    def read(self, size=-1):
+        while not self._exhausted and (size is None or size < 0 or len(self._buffer) < size):
+            self._produce()
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(data)
+        return data
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    @property
+    def compressed_bytes(self):
+        return self._position
@@ -0,0 +1,4 @@
+"""
+Shared modules untuk semua Cloud Functions
+Folder ini di-copy ke source tiap function saat deploy (lihat scripts/deploy-free-tier.sh)
+"""
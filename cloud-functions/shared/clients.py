@@ -0,0 +1,121 @@
+"""
+Process-wide client registry untuk Cloud Functions dan scripts
+Client GCP dibuat lazy sekali per proses, lalu dipakai ulang pada warm instance
+"""
+
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_lock = threading.Lock()
+_created = Counter()
+_reused = Counter()
+
+
+def _create_storage_client(project, location, **options):
+    from google.cloud import storage
+    return storage.Client(project=project)
+
+
+def _create_bigquery_client(project, location, **options):
+    from google.cloud import bigquery
+    return bigquery.Client(project=project, location=location)
+
+
+def _create_publisher_client(project, location, batch_settings=None, **options):
+    from google.cloud import pubsub_v1
+    if batch_settings is None:
+        return pubsub_v1.PublisherClient()
+    return pubsub_v1.PublisherClient(batch_settings=pubsub_v1.types.BatchSettings(*batch_settings))
+
+
+_FACTORIES = {
+    'storage': _create_storage_client,
+    'bigquery': _create_bigquery_client,
+    'publisher': _create_publisher_client,
+}
+_DEFAULT_FACTORIES = dict(_FACTORIES)
+
+
+def get_client(kind, project=None, location=None, **options):
+    """
+    Ambil client dari registry, buat baru jika belum ada untuk (kind, project, location)
+
+    options (harus hashable) ikut menjadi bagian key, mis. batch_settings publisher.
+    """
+    if kind not in _FACTORIES:
+        raise ValueError(f"Unknown client kind: {kind}")
+
+    key = (kind, project, location, tuple(sorted(options.items())))
+    client = _clients.get(key)
+    if client is not None:
+        _reused[kind] += 1
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _FACTORIES[kind](project, location, **options)
+            _clients[key] = client
+            _created[kind] += 1
+            logger.info(f"Created {kind} client (project={project}, location={location})")
+        else:
+            _reused[kind] += 1
+    return client
+
+
+def get_storage_client(project=None):
+    """Shared google.cloud.storage.Client"""
+    return get_client('storage', project)
+
+
+def get_bigquery_client(project=None, location=None):
+    """Shared google.cloud.bigquery.Client"""
+    return get_client('bigquery', project, location)
+
+
+def get_publisher_client(batch_settings=None):
+    """
+    Shared google.cloud.pubsub_v1.PublisherClient
+
+    batch_settings: tuple (max_bytes, max_latency, max_messages) opsional
+    """
+    if batch_settings is None:
+        return get_client('publisher')
+    return get_client('publisher', batch_settings=tuple(batch_settings))
+
+
+def set_factory(kind, factory=None):
+    """
+    Ganti factory untuk satu jenis client, mis. stand-in lokal di
+    scripts/run_local_pipeline.py; factory=None kembali ke client GCP
+
+    Client yang sudah dibuat untuk jenis tersebut dibuang dari registry.
+    """
+    if kind not in _DEFAULT_FACTORIES:
+        raise ValueError(f"Unknown client kind: {kind}")
+
+    with _lock:
+        _FACTORIES[kind] = factory or _DEFAULT_FACTORIES[kind]
+        for key in [key for key in _clients if key[0] == kind]:
+            del _clients[key]
+
+
+def client_stats():
+    """Counter berapa kali client dibuat vs dipakai ulang, per jenis client"""
+    return {
+        kind: {'created': _created[kind], 'reused': _reused[kind]}
+        for kind in _FACTORIES
+    }
+
+
+def reset_clients():
+    """Kosongkan registry (dipakai di tests)"""
+    with _lock:
+        _FACTORIES.update(_DEFAULT_FACTORIES)
+        _clients.clear()
+        _created.clear()
+        _reused.clear()
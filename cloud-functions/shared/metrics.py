@@ -0,0 +1,244 @@
+"""
+Span dan metrics per stage untuk Cloud Functions
+
+Tiap stage (fetch, validate, save, publish, load_gcs, transform, bq_load,
+summary, ...) menghasilkan satu baris JSON di stdout. Cloud Functions gen2
+mem-parse baris JSON sebagai jsonPayload, jadi log-based metrics bisa mengambil
+duration_ms/rows/bytes langsung (lihat monitoring/log-filters/pipeline-stage-*.yaml).
+
+    @functions_framework.cloud_event
+    @instrumented('etl-pipeline')
+    def etl_pipeline(cloud_event):
+        with span('transform') as s:
+            records = ...
+            s.set(rows=len(records), nbytes=...)
+
+span() di luar invocation ter-instrument tetap jalan, tanpa emit log.
+Span boleh nested: duration_ms adalah waktu stage itu sendiri (tanpa child span),
+wall_ms termasuk child span.
+
+Invocation aktif dan stack span disimpan di contextvars, jadi request yang
+berjalan bersamaan di satu proses (thread/concurrency gen2) tidak saling
+tercampur. Span di thread pool milik invocation hanya tercatat jika task
+dijalankan dengan contextvars.copy_context().
+
+Memory per stage: rss_mb (RSS saat stage selesai) dan rss_delta_mb (perubahan
+RSS selama stage). High-water mark proses (ru_maxrss) hanya ada di ringkasan
+invocation sebagai process_peak_rss_mb, karena nilainya milik seluruh proses,
+bukan satu stage.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-Unix
+    resource = None
+
+STAGE_EVENT = 'pipeline_stage'
+INVOCATION_EVENT = 'pipeline_invocation'
+
+_active = contextvars.ContextVar('pipeline_metrics', default=None)
+# Tuple (immutable) supaya context hasil copy tidak berbagi list yang sama
+_spans = contextvars.ContextVar('pipeline_spans', default=())
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # pragma: no cover - non-Unix
+    _PAGE_SIZE = None
+
+
+def peak_rss_mb():
+    """High-water mark RSS proses (MB); ru_maxrss di Linux dalam KB"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def current_rss_mb():
+    """RSS proses saat ini (MB) dari /proc/self/statm; None jika tidak tersedia (non-Linux)"""
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * _PAGE_SIZE / (1024 * 1024), 1)
+
+
+class Span:
+    """Satu stage yang sedang berjalan; rows/nbytes/attributes diisi oleh caller"""
+
+    def __init__(self, stage, rows=None, nbytes=None, **attributes):
+        self.stage = stage
+        self.rows = rows
+        self.nbytes = nbytes
+        self.attributes = attributes
+        self.child_seconds = 0.0
+
+    def set(self, rows=None, nbytes=None, **attributes):
+        if rows is not None:
+            self.rows = rows
+        if nbytes is not None:
+            self.nbytes = nbytes
+        self.attributes.update(attributes)
+        return self
+
+
+class PipelineMetrics:
+    """Kumpulan stage satu invocation"""
+
+    def __init__(self, function_name, invocation_id=None, stream=None):
+        self.function_name = function_name
+        self.invocation_id = invocation_id or uuid.uuid4().hex[:12]
+        self.stages = []
+        self.started = time.perf_counter()
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def _emit(self, entry):
+        stream = self._stream or sys.stdout
+        stream.write(json.dumps(entry, default=str) + '\n')
+        stream.flush()
+
+    def record(self, stage, seconds, rows=None, nbytes=None, status='ok', wall_seconds=None,
+               rss_mb=None, rss_delta_mb=None, **attributes):
+        """Catat satu stage yang sudah selesai dan emit sebagai log JSON"""
+        duration_ms = round(seconds * 1000, 2)
+        entry = {
+            'severity': 'ERROR' if status == 'error' else 'INFO',
+            'message': f"[{self.function_name}] stage {stage} {status} in {duration_ms}ms"
+                       + (f" ({rows} rows)" if rows is not None else ''),
+            'event': STAGE_EVENT,
+            'function': self.function_name,
+            'invocation_id': self.invocation_id,
+            'stage': stage,
+            'status': status,
+            'duration_ms': duration_ms,
+            'wall_ms': round((wall_seconds if wall_seconds is not None else seconds) * 1000, 2),
+            'rows': rows,
+            'bytes': nbytes,
+            'rows_per_sec': round(rows / seconds, 1) if rows and seconds > 0 else None,
+            'rss_mb': rss_mb,
+            'rss_delta_mb': rss_delta_mb,
+        }
+        entry.update(attributes)
+        with self._lock:
+            self.stages.append(entry)
+        self._emit(entry)
+        return entry
+
+    def finish(self, status='ok', **attributes):
+        """Emit ringkasan invocation: total waktu dan waktu per stage"""
+        stage_ms = {}
+        rows = {}
+        with self._lock:
+            for entry in self.stages:
+                stage_ms[entry['stage']] = round(stage_ms.get(entry['stage'], 0.0) + entry['duration_ms'], 2)
+                if entry['rows'] is not None:
+                    rows[entry['stage']] = rows.get(entry['stage'], 0) + entry['rows']
+        total_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        entry = {
+            'severity': 'ERROR' if status == 'error' else 'INFO',
+            'message': f"[{self.function_name}] invocation {status} in {total_ms}ms",
+            'event': INVOCATION_EVENT,
+            'function': self.function_name,
+            'invocation_id': self.invocation_id,
+            'status': status,
+            'duration_ms': total_ms,
+            'stage_ms': stage_ms,
+            'stage_rows': rows,
+            'process_peak_rss_mb': peak_rss_mb(),
+        }
+        entry.update(attributes)
+        self._emit(entry)
+        return entry
+
+
+def current_metrics():
+    return _active.get()
+
+
+def start_invocation(function_name, invocation_id=None, stream=None):
+    metrics = PipelineMetrics(function_name, invocation_id, stream)
+    _active.set(metrics)
+    return metrics
+
+
+def end_invocation(status='ok', **attributes):
+    metrics = _active.get()
+    _active.set(None)
+    return metrics.finish(status, **attributes) if metrics is not None else None
+
+
+@contextmanager
+def span(stage, rows=None, nbytes=None, **attributes):
+    """Ukur satu stage; emit log JSON jika ada invocation aktif"""
+    current = Span(stage, rows, nbytes, **attributes)
+    stack = _spans.get()
+    parent = stack[-1] if stack else None
+    token = _spans.set(stack + (current,))
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield current
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        wall = time.perf_counter() - start
+        _spans.reset(token)
+        if parent is not None:
+            parent.child_seconds += wall
+        metrics = _active.get()
+        if metrics is not None:
+            rss_after = current_rss_mb()
+            metrics.record(
+                stage,
+                max(0.0, wall - current.child_seconds),
+                current.rows,
+                current.nbytes,
+                status=status,
+                wall_seconds=wall,
+                rss_mb=rss_after,
+                rss_delta_mb=round(rss_after - rss_before, 1) if rss_after is not None else None,
+                **current.attributes
+            )
+
+
+def instrumented(function_name):
+    """
+    Decorator entry point: satu PipelineMetrics per invocation, ringkasan di akhir
+
+    Status ringkasan diambil dari key 'status' hasil function (dict). Invocation
+    nested (mis. *_http memanggil handler cloud_event) memakai metrics yang sama.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _active.get() is not None:
+                return fn(*args, **kwargs)
+            start_invocation(function_name)
+            status = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                if isinstance(result, dict):
+                    status = result.get('status', 'ok')
+                else:
+                    status = 'ok'
+                return result
+            finally:
+                end_invocation(status)
+        return wrapper
+    return decorator
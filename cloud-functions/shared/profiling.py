@@ -0,0 +1,411 @@
+"""
+Column profiling satu pass dengan sketch yang bisa di-merge
+
+Per kolom: jumlah null, min/max, mean (numerik), perkiraan distinct count
+(HyperLogLog) dan quantiles (KLL sketch). Records ditampung per batch lalu
+tiap kolom diproses sekaligus dengan numpy, jadi biaya per record di loop
+validasi hanya satu append.
+
+Profile disimpan sebagai sidecar JSON kecil di sebelah raw blob
+(<blob>.profile.json). Sketch ikut disimpan sehingga sidecar beberapa blob
+bisa digabung menjadi profile harian (lihat merge_profiles dan
+scripts/merge_profiles.py) tanpa query BigQuery.
+"""
+
+import base64
+import json
+import logging
+import math
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from shared.raw_format import PROFILE_SUFFIX, is_profile, profile_blob_name  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+NUMERIC_TYPES = ('INT64', 'INTEGER', 'FLOAT64', 'FLOAT', 'NUMERIC', 'BIGNUMERIC')
+
+DEFAULT_BATCH_SIZE = 10000
+HLL_PRECISION = 11
+KLL_K = 128
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+# Lebar maksimum (karakter) untuk hash string vectorized
+MAX_VECTOR_WIDTH = 256
+
+
+def infer_type(value):
+    """Tipe BigQuery untuk kolom yang ditemukan dari record (tanpa schema)"""
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, int):
+        return 'INT64'
+    if isinstance(value, float):
+        return 'FLOAT64'
+    return 'STRING'
+
+
+def _mix64(values):
+    """Finalizer splitmix64 (vectorized) supaya bit hash tersebar rata"""
+    with np.errstate(over='ignore'):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (z ^ (z >> np.uint64(31))) & _MASK64
+
+
+def hash_strings(values):
+    """
+    Hash 64-bit stabil antar proses dari list string
+
+    FNV-1a per code point, dihitung per posisi karakter untuk semua string
+    sekaligus (array unicode fixed-width). String yang sangat panjang jatuh ke
+    crc32 + adler32 per string supaya memory array tetap kecil.
+    """
+    strings = np.array(values, dtype=str)
+    width = strings.dtype.itemsize // 4
+    if width > MAX_VECTOR_WIDTH:
+        hashes = np.fromiter(
+            ((zlib.crc32(data) << 32) | zlib.adler32(data) for data in (value.encode('utf-8') for value in values)),
+            dtype=np.uint64, count=len(values)
+        )
+        return _mix64(hashes)
+    codes = strings.view(np.uint32).reshape(len(values), width)
+    hashes = np.full(len(values), _FNV_OFFSET, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for position in range(width):
+            hashes = (hashes ^ codes[:, position]) * _FNV_PRIME
+    return _mix64(hashes)
+
+
+def hash_numbers(values):
+    """Hash 64-bit dari float64 (1 dan 1.0 dianggap sama)"""
+    return _mix64(np.ascontiguousarray(values, dtype=np.float64).view(np.uint64))
+
+
+class HyperLogLog:
+    """HyperLogLog dengan 2^precision register (error ~1.04/sqrt(m))"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = (hashes << p) & _MASK64
+        # rank = posisi bit 1 pertama pada sisa (64 - p) bit
+        width = 64 - self.precision
+        remaining = (rest >> p).astype(np.float64)
+        rank = np.where(remaining > 0, width - np.floor(np.log2(np.maximum(remaining, 1))), width + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting untuk cardinality kecil
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        packed = base64.b64encode(zlib.compress(self.registers.tobytes())).decode('ascii')
+        return {'precision': self.precision, 'registers': packed}
+
+    @classmethod
+    def from_dict(cls, data):
+        registers = np.frombuffer(zlib.decompress(base64.b64decode(data['registers'])), dtype=np.uint8).copy()
+        return cls(data['precision'], registers)
+
+
+class QuantileSketch:
+    """
+    KLL sketch: compactor per level, item level h berbobot 2^h
+
+    Kapasitas level bawah mengecil (faktor 2/3), jadi ukuran total ~3k item
+    berapa pun jumlah nilai yang masuk. Batch nilai dimasukkan sekaligus.
+    """
+
+    def __init__(self, k=KLL_K, levels=None, count=0, seed=None):
+        self.k = k
+        self.levels = levels or [np.empty(0)]
+        self.count = count
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(keep)]
+                promoted = items[int(self._rng.integers(2))::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Level baru di atas menggeser kapasitas level bawah; cek ulang dari bawah
+                level = 0
+                continue
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, fractions=QUANTILES):
+        if not self.count:
+            return {}
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        result = {}
+        for fraction in fractions:
+            index = min(int(np.searchsorted(cumulative, fraction * total)), len(values) - 1)
+            result[f'p{int(round(fraction * 100)):02d}'] = float(values[index])
+        return result
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        levels = [np.asarray(items, dtype=np.float64) for items in data['levels']]
+        return cls(data['k'], levels, data['count'])
+
+
+class ColumnProfile:
+    """Statistik satu kolom; numerik jika tipe BigQuery-nya angka"""
+
+    def __init__(self, name, bq_type, numeric=None):
+        self.name = name
+        self.type = bq_type
+        self.numeric = bq_type in NUMERIC_TYPES if numeric is None else numeric
+        self.count = 0
+        self.nulls = 0
+        self.invalid = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.hll = HyperLogLog()
+        self.quantiles = QuantileSketch() if self.numeric else None
+
+    def _update_range(self, minimum, maximum):
+        if self.minimum is None or minimum < self.minimum:
+            self.minimum = minimum
+        if self.maximum is None or maximum > self.maximum:
+            self.maximum = maximum
+
+    def update(self, values):
+        self.count += len(values)
+        present = [value for value in values if value is not None]
+        self.nulls += len(values) - len(present)
+        if not present:
+            return
+
+        if not self.numeric:
+            strings = [value if value.__class__ is str else str(value) for value in present]
+            self._update_range(min(strings), max(strings))
+            self.hll.add_hashes(hash_strings(strings))
+            return
+
+        try:
+            numbers = np.array(present, dtype=np.float64)
+        except (TypeError, ValueError):
+            numbers = []
+            for value in present:
+                try:
+                    numbers.append(float(value))
+                except (TypeError, ValueError):
+                    self.invalid += 1
+            numbers = np.array(numbers, dtype=np.float64)
+        numbers = numbers[np.isfinite(numbers)]
+        if not len(numbers):
+            return
+        self._update_range(float(numbers.min()), float(numbers.max()))
+        self.total += float(numbers.sum())
+        self.hll.add_hashes(hash_numbers(numbers))
+        self.quantiles.update(numbers)
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.invalid += other.invalid
+        if other.minimum is not None:
+            self._update_range(other.minimum, other.maximum)
+        self.total += other.total
+        self.hll.merge(other.hll)
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        return self
+
+    def to_dict(self):
+        data = {
+            'type': self.type,
+            'count': self.count,
+            'nulls': self.nulls,
+            'invalid': self.invalid,
+            'min': self.minimum,
+            'max': self.maximum,
+            'distinct': self.hll.estimate(),
+            'sketches': {'hll': self.hll.to_dict()},
+        }
+        if self.numeric:
+            data['sum'] = self.total
+            data['mean'] = self.total / self.quantiles.count if self.quantiles.count else None
+            data['quantiles'] = self.quantiles.quantiles()
+            data['sketches']['kll'] = self.quantiles.to_dict()
+        data['null_rate'] = round(self.nulls / self.count, 6) if self.count else None
+        return data
+
+    @classmethod
+    def from_dict(cls, name, data):
+        profile = cls(name, data['type'], numeric='kll' in data['sketches'])
+        profile.count = data['count']
+        profile.nulls = data['nulls']
+        profile.invalid = data.get('invalid', 0)
+        profile.minimum = data['min']
+        profile.maximum = data['max']
+        profile.total = data.get('sum', 0.0)
+        profile.hll = HyperLogLog.from_dict(data['sketches']['hll'])
+        if profile.numeric:
+            profile.quantiles = QuantileSketch.from_dict(data['sketches']['kll'])
+        return profile
+
+
+class ProfileBuilder:
+    """
+    Profile records dalam pass yang sama dengan validasi
+
+    observe(records) membungkus iterator records: records ditampung per batch
+    (batch_size), lalu tiap kolom diekstrak dan diproses sekaligus.
+
+    Tanpa columns, kolom diambil dari field records itu sendiri: field baru
+    dikenali per batch dan tipenya ditebak dari nilai pertama yang tidak kosong.
+    """
+
+    def __init__(self, columns=None, batch_size=DEFAULT_BATCH_SIZE):
+        # columns: [(name, bq_type)]; None = kolom mengikuti field records
+        self.discover = columns is None
+        self.columns = {name: ColumnProfile(name, bq_type) for name, bq_type in columns or ()}
+        self.batch_size = batch_size
+        self.records = 0
+        self._batch = []
+
+    def add(self, record):
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def observe(self, records):
+        batch = self._batch
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.flush()
+                batch = self._batch
+            yield record
+
+    def _discover_columns(self, batch):
+        columns = self.columns
+        new_names = [name for name in set().union(*batch) if name not in columns]
+        # Urutan mengikuti record pertama, field lain setelahnya secara alfabetis
+        first = [name for name in batch[0] if name in new_names]
+        for name in first + sorted(set(new_names) - set(first)):
+            value = next((record.get(name) for record in batch if record.get(name) is not None), None)
+            column = ColumnProfile(name, infer_type(value))
+            # Records sebelum field ini muncul dihitung sebagai null
+            column.count = column.nulls = self.records
+            columns[name] = column
+
+    def flush(self):
+        batch = self._batch
+        if not batch:
+            return
+        if self.discover:
+            self._discover_columns(batch)
+        for name, column in self.columns.items():
+            column.update([record.get(name) for record in batch])
+        self.records += len(batch)
+        self._batch = []
+
+    def to_dict(self, **details):
+        self.flush()
+        return dict(
+            details,
+            records=self.records,
+            profiled_at=datetime.now(timezone.utc).isoformat(),
+            columns={name: column.to_dict() for name, column in self.columns.items()},
+        )
+
+
+def merge_profiles(profiles, **details):
+    """
+    Gabungkan beberapa profile (dict sidecar) menjadi satu profile
+
+    Count/null/min/max/sum dijumlahkan langsung; distinct dan quantiles dari
+    merge sketch HLL/KLL, jadi hasilnya sama seperti profiling semua records sekaligus
+    (dalam batas error sketch).
+    """
+    columns = {}
+    records = 0
+    sources = []
+    for profile in profiles:
+        records += profile['records']
+        if profile.get('source'):
+            sources.append(profile['source'])
+        for name, data in profile['columns'].items():
+            column = ColumnProfile.from_dict(name, data)
+            if name in columns:
+                columns[name].merge(column)
+            else:
+                columns[name] = column
+    return dict(
+        details,
+        records=records,
+        sources=sources,
+        merged_at=datetime.now(timezone.utc).isoformat(),
+        columns={name: column.to_dict() for name, column in columns.items()},
+    )
+
+
+def write_profile(blob, profile):
+    """Upload profile sebagai JSON kecil"""
+    payload = json.dumps(profile, ensure_ascii=False, separators=(',', ':'))
+    blob.upload_from_string(payload, content_type='application/json')
+    return len(payload)
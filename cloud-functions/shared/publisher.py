@@ -0,0 +1,89 @@
+"""
+Batched, non-blocking Pub/Sub publishing
+Message dikumpulkan oleh client library per batch; future baru ditunggu sekali saat flush()
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from shared.clients import get_publisher_client
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPublisher:
+    """
+    Publisher yang tidak menunggu tiap message
+
+    publish() langsung mengembalikan future dan memasang callback yang
+    me-log kegagalan; flush() menunggu semua future di akhir invocation.
+    """
+
+    def __init__(self, project_id, max_messages=100, max_bytes=1024 * 1024, max_latency=0.05):
+        self.project_id = project_id
+        # Urutan field mengikuti pubsub_v1.types.BatchSettings
+        self.batch_settings = (int(max_bytes), float(max_latency), int(max_messages))
+        self._futures = []
+        self._lock = threading.Lock()
+        self._topic_paths = {}
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_publisher_client(self.batch_settings)
+        return self._client
+
+    def _topic_path(self, topic_name):
+        if topic_name not in self._topic_paths:
+            self._topic_paths[topic_name] = self.client.topic_path(self.project_id, topic_name)
+        return self._topic_paths[topic_name]
+
+    def _on_done(self, topic_name, future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Failed to publish message to {topic_name}: {error}")
+
+    def publish(self, topic_name, message_data, **attributes):
+        """Antrikan message (dict → JSON) ke topic, return future tanpa menunggu"""
+        data = json.dumps(message_data).encode('utf-8')
+        future = self.client.publish(self._topic_path(topic_name), data, **attributes)
+        future.add_done_callback(lambda f: self._on_done(topic_name, f))
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def flush(self, timeout=60):
+        """
+        Tunggu semua message yang sudah diantrikan; return jumlah published/failed
+
+        timeout berlaku untuk seluruh flush. Message yang belum selesai saat
+        timeout dihitung failed (timed_out) karena tidak ada konfirmasi publish.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+
+        deadline = time.monotonic() + timeout
+        published = 0
+        failed = 0
+        timed_out = 0
+        message_ids = []
+        for future in futures:
+            try:
+                message_ids.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+                published += 1
+            except (FutureTimeoutError, TimeoutError):
+                failed += 1
+                timed_out += 1
+            except Exception:
+                # Sudah di-log oleh callback
+                failed += 1
+
+        if timed_out:
+            logger.error(f"Timed out after {timeout}s waiting for {timed_out} Pub/Sub messages")
+        if futures:
+            logger.info(f"Flushed {len(futures)} Pub/Sub messages: {published} published, {failed} failed")
+        return {'published': published, 'failed': failed, 'timed_out': timed_out, 'message_ids': message_ids}
@@ -0,0 +1,349 @@
+"""
+Format blob raw data di Cloud Storage
+
+Format yang didukung:
+- json       : format lama, satu envelope {'metadata': ..., 'data': [...]}
+- ndjson.gz  : newline-delimited JSON terkompresi gzip
+- parquet    : Apache Parquet (butuh pyarrow)
+
+Untuk ndjson.gz dan parquet, envelope 'metadata' disimpan di blob metadata
+(key METADATA_KEY) sehingga file hanya berisi record. Reader mendeteksi format
+dari nama blob, jadi blob JSON lama tetap bisa dibaca.
+"""
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+RAW_FORMATS = ('json', 'ndjson.gz', 'parquet')
+
+EXTENSIONS = {
+    'json': '.json',
+    'ndjson.gz': '.ndjson.gz',
+    'parquet': '.parquet',
+}
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+METADATA_KEY = 'ingestion-metadata'
+# Batas total custom metadata per object di GCS
+METADATA_MAX_BYTES = 8 * 1024
+
+# Sidecar column profile di sebelah raw blob (lihat shared/profiling.py)
+PROFILE_SUFFIX = '.profile.json'
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Ukuran baca (karakter) untuk parser envelope json yang streaming
+JSON_READ_SIZE = 1 << 20
+
+
+def detect_format(blob_name):
+    """Tentukan format raw dari ekstensi nama blob"""
+    for raw_format in ('ndjson.gz', 'parquet', 'json'):
+        if blob_name.endswith(EXTENSIONS[raw_format]):
+            return raw_format
+    raise ValueError(f"Unknown raw format for blob: {blob_name}")
+
+
+def is_profile(blob_name):
+    return blob_name.endswith(PROFILE_SUFFIX)
+
+
+def profile_blob_name(blob_name):
+    """raw/x.ndjson.gz → raw/x.ndjson.gz.profile.json"""
+    return blob_name + PROFILE_SUFFIX
+
+
+def raw_blob_name(folder, stem, raw_format):
+    """Nama blob untuk raw data, mis. raw/20240101_020000.ndjson.gz"""
+    if raw_format not in RAW_FORMATS:
+        raise ValueError(f"Unknown raw format: {raw_format}")
+    return f"{folder}/{stem}{EXTENSIONS[raw_format]}"
+
+
+class _ChecksumWriter:
+    """Bungkus blob writer: hitung bytes dan MD5 (format sama dengan md5Hash GCS)"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.size = 0
+        self._md5 = hashlib.md5()
+        self.closed = False
+
+    def write(self, data):
+        self._md5.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def md5(self):
+        return base64.b64encode(self._md5.digest()).decode('ascii')
+
+
+def _chunks(records, chunk_size):
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Satu encoder dipakai ulang: json.dumps dengan kwargs membuat encoder baru per record
+_NDJSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+def _write_ndjson_gz(blob, records, chunk_size):
+    encode = _NDJSON_ENCODER.encode
+    count = 0
+    with blob.open('wb', content_type=CONTENT_TYPES['ndjson.gz'], ignore_flush=True) as raw:
+        out = _ChecksumWriter(raw)
+        with gzip.GzipFile(fileobj=out, mode='wb') as gz:
+            for chunk in _chunks(records, chunk_size):
+                lines = ''.join(encode(record) + '\n' for record in chunk)
+                gz.write(lines.encode('utf-8'))
+                count += len(chunk)
+    return count, out
+
+
+def _write_parquet(blob, records, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    count = 0
+    with blob.open('wb', content_type=CONTENT_TYPES['parquet'], ignore_flush=True) as raw:
+        out = _ChecksumWriter(raw)
+        try:
+            for chunk in _chunks(records, chunk_size):
+                if writer is None:
+                    table = pa.Table.from_pylist(chunk)
+                    writer = pq.ParquetWriter(out, table.schema, compression='snappy')
+                else:
+                    table = pa.Table.from_pylist(chunk, schema=writer.schema)
+                writer.write_table(table)
+                count += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    return count, out
+
+
+def write_raw_blob(blob, records, metadata, raw_format='ndjson.gz', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Tulis records ke blob dengan format yang dipilih
+
+    Format ndjson.gz dan parquet di-stream per chunk lewat blob writer,
+    jadi payload tidak perlu di-serialize utuh di memory.
+
+    Returns:
+        dict {'records', 'bytes', 'md5'} untuk blob yang ditulis
+    """
+    if raw_format == 'json':
+        records = list(records)
+        payload = json.dumps(
+            {'metadata': metadata, 'data': records}, indent=2, ensure_ascii=False
+        ).encode('utf-8')
+        blob.upload_from_string(payload, content_type=CONTENT_TYPES['json'])
+        md5 = base64.b64encode(hashlib.md5(payload).digest()).decode('ascii')
+        return {'records': len(records), 'bytes': len(payload), 'md5': md5}
+
+    value = json.dumps(metadata, ensure_ascii=False)
+    size = len(METADATA_KEY) + len(value.encode('utf-8'))
+    if size > METADATA_MAX_BYTES:
+        # Statistik detail disimpan di object terpisah, bukan di blob metadata
+        raise ValueError(f"Blob metadata too large for {blob.name}: {size} bytes (max {METADATA_MAX_BYTES})")
+    blob.metadata = {METADATA_KEY: value}
+    if raw_format == 'ndjson.gz':
+        count, out = _write_ndjson_gz(blob, records, chunk_size)
+    elif raw_format == 'parquet':
+        count, out = _write_parquet(blob, records, chunk_size)
+    else:
+        raise ValueError(f"Unknown raw format: {raw_format}")
+    return {'records': count, 'bytes': out.size, 'md5': out.md5}
+
+
+def read_metadata(blob):
+    """Ambil ingestion metadata dari blob metadata (format ndjson.gz/parquet)"""
+    if blob.metadata is None:
+        blob.reload()
+    value = (blob.metadata or {}).get(METADATA_KEY)
+    return json.loads(value) if value else {}
+
+
+class _JsonEnvelopeReader:
+    """
+    Parser incremental untuk envelope json {'metadata': ..., 'data': [...]}
+
+    Buffer hanya berisi satu window teks; tiap record di array 'data'
+    di-decode sendiri dengan JSONDecoder.raw_decode.
+    """
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, stream, read_size=JSON_READ_SIZE, values=None):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.keys = set()
+        # Nilai key selain array records (mis. metadata), diisi begitu terbaca
+        self.values = values if values is not None else {}
+
+    def _fill(self):
+        data = self.stream.read(self.read_size)
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Invalid json envelope: expected '{char}', found '{found}'")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Angka di ujung buffer bisa saja terpotong
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def records(self, key='data'):
+        self._expect('{')
+        while self._peek() != '}':
+            name = self._value()
+            self.keys.add(name)
+            self._expect(':')
+            if name != key:
+                self.values[name] = self._value()
+            else:
+                self._expect('[')
+                while self._peek() != ']':
+                    yield self._value()
+                    if self._peek() == ',':
+                        self.pos += 1
+                self.pos += 1
+            if self._peek() == ',':
+                self.pos += 1
+
+
+class _CountingStream:
+    """Proxy file object yang menjumlahkan bytes terbaca ke stats['bytes_read']"""
+
+    def __init__(self, stream, stats):
+        self.stream = stream
+        self.stats = stats
+        stats.setdefault('bytes_read', 0)
+
+    def _count(self, data):
+        self.stats['bytes_read'] += len(data)
+        return data
+
+    def read(self, size=-1):
+        return self._count(self.stream.read(size))
+
+    def read1(self, size=-1):
+        read1 = getattr(self.stream, 'read1', self.stream.read)
+        return self._count(read1(size))
+
+    def readinto(self, buffer):
+        count = self.stream.readinto(buffer)
+        self.stats['bytes_read'] += count or 0
+        return count
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def iter_raw_records(blob, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """
+    Iterasi records dari raw blob sebagai stream
+
+    Memory tidak bergantung pada ukuran blob: ndjson.gz per baris, parquet per
+    row group batch, dan envelope json lama lewat parser incremental.
+
+    stats: dict opsional yang diisi selama iterasi - bytes_read (bytes blob yang
+    sudah dibaca), untuk envelope json envelope (key selain data, mis. metadata,
+    begitu terbaca) dan envelope_keys (setelah envelope selesai dibaca).
+    """
+    raw_format = detect_format(blob.name)
+
+    if raw_format == 'json':
+        with blob.open('rb') as raw:
+            if stats is not None:
+                raw = _CountingStream(raw, stats)
+            values = stats.setdefault('envelope', {}) if stats is not None else None
+            reader = _JsonEnvelopeReader(io.TextIOWrapper(raw, encoding='utf-8'), values=values)
+            yield from reader.records()
+            if stats is not None:
+                stats['envelope_keys'] = sorted(reader.keys)
+
+    elif raw_format == 'ndjson.gz':
+        with blob.open('rb') as raw:
+            if stats is not None:
+                raw = _CountingStream(raw, stats)
+            with gzip.GzipFile(fileobj=raw, mode='rb') as gz:
+                for line in io.TextIOWrapper(gz, encoding='utf-8'):
+                    if line.strip():
+                        yield json.loads(line)
+
+    else:
+        import pyarrow.parquet as pq
+
+        with blob.open('rb') as raw:
+            if stats is not None:
+                raw = _CountingStream(raw, stats)
+            for batch in pq.ParquetFile(raw).iter_batches(batch_size=chunk_size):
+                yield from batch.to_pylist()
+
+
+def read_raw_blob(blob):
+    """Baca raw blob format apa pun sebagai envelope {'metadata': ..., 'data': [...]}"""
+    raw_format = detect_format(blob.name)
+
+    if raw_format == 'json':
+        return json.loads(blob.download_as_bytes())
+
+    return {
+        'metadata': read_metadata(blob),
+        'data': list(iter_raw_records(blob)),
+    }
@@ -0,0 +1,526 @@
+"""
+Schema registry dari DDL BigQuery (bigquery/schemas/create_tables.sql)
+
+DDL di-parse sekali per proses, lalu tiap tabel di-compile menjadi satu fungsi
+validasi khusus (source di-generate lalu di-exec): tanpa loop per kolom atau
+lookup tipe saat runtime, hanya if-chain untuk kolom tabel tersebut.
+
+Rule yang dicek:
+- NOT NULL     -> missing_<kolom>
+- tipe kolom   -> invalid_<kolom> (nilai yang bisa diterima load job BigQuery)
+- range        -> out_of_range_<kolom>
+
+BigQuery tidak punya CHECK constraint, jadi range (dan field wajib record yang
+berbeda dari NOT NULL tabel) dideklarasikan di TABLE_RULES; kolomnya tetap
+harus ada di DDL.
+
+Schema load job ETL (kolom yang benar-benar di-load ke tabel) ada di LOAD_SCHEMAS;
+dipakai parquet load ETL dan `bq mk` di scripts/deploy-free-tier.sh.
+
+Dipakai ketiga Cloud Functions supaya aturan validasi hanya ada di satu tempat.
+DDL ikut ter-deploy sebagai module shared/schema_ddl.py (di-generate dari
+create_tables.sql oleh scripts/generate_schema_module.py), jadi tidak ada file
+yang harus di-copy saat deploy.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+DDL_FILENAME = 'create_tables.sql'
+
+ID_FIELD = 'product_id'
+SAMPLE_ID_LIMIT = 5
+
+Column = namedtuple('Column', 'name type required default minimum maximum')
+
+_CREATE_TABLE = re.compile(r'CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?([\w.-]+)`?\s*\(',
+                           re.IGNORECASE)
+_CREATE_VIEW = re.compile(r'CREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+`?([\w.-]+)`?', re.IGNORECASE)
+_NOT_NULL = re.compile(r'\bNOT\s+NULL\b', re.IGNORECASE)
+_DEFAULT = re.compile(r'\bDEFAULT\s+(.+?)(?:\s+OPTIONS\s*\(.*)?$', re.IGNORECASE | re.DOTALL)
+
+# Alias tipe BigQuery → tipe yang dicek validator
+TYPE_ALIASES = {
+    'INTEGER': 'INT64',
+    'INT': 'INT64',
+    'SMALLINT': 'INT64',
+    'BIGINT': 'INT64',
+    'FLOAT': 'FLOAT64',
+    'NUMERIC': 'FLOAT64',
+    'BIGNUMERIC': 'FLOAT64',
+    'DECIMAL': 'FLOAT64',
+    'BOOLEAN': 'BOOL',
+}
+
+NUMERIC_TYPES = ('INT64', 'FLOAT64')
+
+# Rule per tabel yang tidak bisa dinyatakan di DDL; nama kolom harus ada di DDL.
+# - required : field wajib record, menggantikan kolom NOT NULL tabel
+# - ranges   : {kolom: (min, max)}, batas None = terbuka
+TABLE_RULES = {
+    'raw_sales': {
+        # Functions me-load katalog produk ke raw_sales (lihat schema drift di
+        # scripts/run_local_pipeline.py): transaction_id NOT NULL di tabel tapi
+        # tidak ada di record produk, jadi yang wajib adalah field produk
+        'required': ('product_id', 'product_name', 'category', 'price'),
+        'ranges': {
+            'price': (0, None),
+            'discount_percent': (0, 100),
+            'actual_price': (0, None),
+            'quantity': (0, None),
+            'total_amount': (0, None),
+        },
+    },
+    'tokopedia_reviews': {
+        'ranges': {'rating': (1, 5), 'product_price': (0, None), 'sold_count': (0, None)},
+    },
+}
+
+# Kolom yang di-load ETL per tabel: (nama, tipe BigQuery). raw_sales berisi record
+# produk hasil transform, bukan schema transaksi di DDL (lihat TABLE_RULES).
+# Satu-satunya definisi: parquet_load.py (ETL) dan `bq mk` di
+# scripts/deploy-free-tier.sh membaca dari sini.
+LOAD_SCHEMAS = {
+    'raw_sales': (
+        ('product_id', 'STRING'),
+        ('product_name', 'STRING'),
+        ('category', 'STRING'),
+        ('price', 'FLOAT'),
+        ('original_price', 'FLOAT'),
+        ('discount_percent', 'INTEGER'),
+        ('sales_count', 'INTEGER'),
+        ('rating', 'FLOAT'),
+        ('review_count', 'INTEGER'),
+        ('stock', 'INTEGER'),
+        ('seller_name', 'STRING'),
+        ('seller_location', 'STRING'),
+        ('ingestion_date', 'DATE'),
+        ('sale_date', 'DATE'),
+        ('revenue', 'FLOAT'),
+    ),
+}
+
+
+def _split_top_level(text, separator=','):
+    """Pisah text pada separator di luar kurung"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in '(<':
+            depth += 1
+        elif char in ')>':
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parse_column(definition):
+    tokens = definition.split()
+    name, bq_type = tokens[0].strip('`'), re.split(r'[(<]', tokens[1])[0].upper()
+
+    default = None
+    default_match = _DEFAULT.search(definition)
+    if default_match:
+        default = default_match.group(1).strip()
+
+    return Column(name, bq_type, bool(_NOT_NULL.search(definition)), default, None, None)
+
+
+def apply_rules(table, columns, rules):
+    """
+    Terapkan TABLE_RULES (required, ranges) ke kolom hasil parse_ddl
+
+    Raises:
+        ValueError: jika rule menyebut kolom yang tidak ada di DDL tabel
+    """
+    names = {column.name for column in columns}
+    required = rules.get('required')
+    ranges = rules.get('ranges', {})
+    unknown = (set(required or ()) | set(ranges)) - names
+    if unknown:
+        raise ValueError(f"Rules for {table} reference columns not in DDL: {', '.join(sorted(unknown))}")
+
+    applied = []
+    for column in columns:
+        if required is not None:
+            column = column._replace(required=column.name in required)
+        if column.name in ranges:
+            minimum, maximum = ranges[column.name]
+            column = column._replace(
+                minimum=None if minimum is None else float(minimum),
+                maximum=None if maximum is None else float(maximum),
+            )
+        applied.append(column)
+    return applied
+
+
+def parse_ddl(sql):
+    """
+    Parse CREATE TABLE BigQuery menjadi {table: [Column]}
+
+    PARTITION BY / CLUSTER BY / OPTIONS tabel diabaikan; view dilewati
+    (dikembalikan terpisah di list kedua).
+    """
+    sql = '\n'.join(line.split('--', 1)[0] for line in sql.splitlines())
+    tables, views = {}, []
+    for statement in sql.split(';'):
+        view = _CREATE_VIEW.search(statement)
+        if view:
+            views.append(view.group(1).rsplit('.', 1)[-1])
+            continue
+        match = _CREATE_TABLE.search(statement)
+        if not match:
+            continue
+        # Isi kurung pertama = daftar kolom
+        depth, start = 0, match.end() - 1
+        for end in range(start, len(statement)):
+            depth += {'(': 1, ')': -1}.get(statement[end], 0)
+            if depth == 0:
+                break
+        columns = [_parse_column(definition) for definition in _split_top_level(statement[start + 1:end])]
+        tables[match.group(1).rsplit('.', 1)[-1]] = columns
+    return tables, views
+
+
+# ============================================
+# Type checks (dipanggil dari validator hasil compile, hanya untuk nilai
+# yang tidak lolos fast path `value.__class__ is ...`)
+# ============================================
+
+def _as_float(value):
+    """float dari angka atau string angka; None jika tidak valid"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _as_int(value):
+    """int dari int, float bulat atau string angka bulat; None jika tidak valid"""
+    number = _as_float(value)
+    if number is None or not math.isfinite(number) or number != int(number):
+        return None
+    return int(number)
+
+
+def _is_string(value):
+    # Angka diterima: load job BigQuery meng-cast-nya ke STRING
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def _is_date(value):
+    if isinstance(value, date):
+        return not isinstance(value, datetime)
+    if isinstance(value, str):
+        try:
+            date.fromisoformat(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_timestamp(value):
+    if isinstance(value, datetime):
+        return True
+    if isinstance(value, str):
+        try:
+            datetime.fromisoformat(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_bool(value):
+    return isinstance(value, bool) or (isinstance(value, str) and value.lower() in ('true', 'false'))
+
+
+_HELPERS = {
+    '_as_float': _as_float,
+    '_as_int': _as_int,
+    '_is_string': _is_string,
+    '_is_date': _is_date,
+    '_is_timestamp': _is_timestamp,
+    '_is_bool': _is_bool,
+}
+
+# tipe → (fast path class, fungsi cek); numeric mengembalikan nilai hasil coercion
+_TYPE_CHECKS = {
+    'STRING': ('str', '_is_string'),
+    'DATE': ('str', '_is_date'),
+    'DATETIME': ('str', '_is_timestamp'),
+    'TIMESTAMP': ('str', '_is_timestamp'),
+    'BOOL': ('bool', '_is_bool'),
+}
+
+
+def _column_source(column):
+    """Baris-baris source untuk satu kolom (indent relatif terhadap body fungsi)"""
+    name = column.name
+    bq_type = TYPE_ALIASES.get(column.type, column.type)
+    lines = [f"value = get({name!r})"]
+    if column.required:
+        lines += ["if value is None:", f"    return {'missing_' + name!r}"]
+        body, indent = lines, ''
+    else:
+        body, indent = [], '    '
+
+    if bq_type in NUMERIC_TYPES:
+        fast = 'cls is int' if bq_type == 'INT64' else '(cls is float or cls is int)'
+        convert = '_as_int' if bq_type == 'INT64' else '_as_float'
+        body += [
+            "cls = value.__class__",
+            f"if not {fast}:",
+            f"    value = {convert}(value)",
+            "    if value is None:",
+            f"        return {'invalid_' + name!r}",
+        ]
+        out_of_range = []
+        if column.minimum is not None:
+            out_of_range.append(f"value >= {column.minimum!r}")
+        if column.maximum is not None:
+            out_of_range.append(f"value <= {column.maximum!r}")
+        if out_of_range:
+            # `not (a and b)` juga menolak NaN
+            body += [f"if not ({' and '.join(out_of_range)}):", f"    return {'out_of_range_' + name!r}"]
+    elif bq_type in _TYPE_CHECKS:
+        fast_class, check = _TYPE_CHECKS[bq_type]
+        if bq_type in ('STRING', 'BOOL'):
+            body += [f"if value.__class__ is not {fast_class} and not {check}(value):"]
+        else:
+            body += [f"if not {check}(value):"]
+        body += [f"    return {'invalid_' + name!r}"]
+
+    if not column.required and body:
+        lines += ["if value is not None:"] + [indent + line for line in body]
+    return lines
+
+
+def compile_validator(table, columns):
+    """
+    Compile fungsi validate(record) untuk satu tabel
+
+    Returns:
+        fungsi yang mengembalikan None (valid) atau reason code rule pertama
+        yang gagal, mis. 'missing_price' atau 'out_of_range_rating'
+    """
+    function_name = f"validate_{re.sub(r'[^0-9a-zA-Z_]', '_', table)}"
+    body = ["get = record.get"]
+    for column in columns:
+        body += _column_source(column)
+    body.append("return None")
+    source = f"def {function_name}(record):\n" + '\n'.join('    ' + line for line in body) + '\n'
+
+    namespace = dict(_HELPERS)
+    exec(compile(source, f'<schema:{table}>', 'exec'), namespace)
+    validator = namespace[function_name]
+    validator.source = source
+    return validator
+
+
+class RejectReport:
+    """Jumlah reject per rule + contoh product_id, format sama dengan reject report ingestion"""
+
+    def __init__(self, id_field=ID_FIELD):
+        self.id_field = id_field
+        self.rejected = 0
+        self.rules = {}
+        self.sample_ids = {}
+
+    def add(self, reason, record):
+        self.rejected += 1
+        self.rules[reason] = self.rules.get(reason, 0) + 1
+        samples = self.sample_ids.setdefault(reason, [])
+        if len(samples) < SAMPLE_ID_LIMIT:
+            value = record.get(self.id_field)
+            samples.append(str(value) if value is not None else 'unknown')
+
+    def as_dict(self, total):
+        return {
+            'total': total,
+            'accepted': total - self.rejected,
+            'rejected': self.rejected,
+            'rules': dict(self.rules),
+            'sample_ids': {rule: list(ids) for rule, ids in self.sample_ids.items()},
+        }
+
+
+class TableSchema:
+    """Kolom satu tabel + validator hasil compile"""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = list(columns)
+        self.by_name = {column.name: column for column in self.columns}
+        self.required = tuple(column.name for column in self.columns if column.required)
+        self.validate = compile_validator(name, self.columns)
+        # Berubah hanya jika rule tabel ini berubah (mis. untuk cache hasil validasi)
+        self.fingerprint = hashlib.sha1(self.validate.source.encode('utf-8')).hexdigest()[:12]
+
+    def validate_batch(self, records, id_field=ID_FIELD):
+        """
+        Validasi list of dict dalam satu pass
+
+        Returns:
+            (accepted records, reject report dict)
+        """
+        validate = self.validate
+        report = RejectReport(id_field)
+        accepted = []
+        total = 0
+        for record in records:
+            total += 1
+            reason = validate(record)
+            if reason is None:
+                accepted.append(record)
+            else:
+                report.add(reason, record)
+        return accepted, report.as_dict(total)
+
+    def arrow_rule_masks(self, table):
+        """
+        Rule masks (numpy bool per rule) untuk pyarrow.Table yang sudah bertipe
+
+        Tipe kolom sudah dijamin schema Arrow, jadi hanya NOT NULL dan range yang dicek.
+        """
+        import pyarrow.compute as pc
+
+        masks = {}
+        for name in table.column_names:
+            column = self.by_name.get(name)
+            if column is None:
+                continue
+            values = table.column(name)
+            if column.required and values.null_count:
+                masks[f'missing_{name}'] = values.is_null().to_numpy(zero_copy_only=False)
+            if column.minimum is None and column.maximum is None:
+                continue
+            out_of_range = None
+            for bound, compare in ((column.minimum, pc.less), (column.maximum, pc.greater)):
+                if bound is not None:
+                    mask = compare(values, bound)
+                    out_of_range = mask if out_of_range is None else pc.or_(out_of_range, mask)
+            out_of_range = pc.fill_null(out_of_range, False).to_numpy(zero_copy_only=False)
+            if out_of_range.any():
+                masks[f'out_of_range_{name}'] = out_of_range
+        return masks
+
+    def filter_table(self, table, id_field=ID_FIELD):
+        """
+        Buang baris pyarrow.Table yang melanggar NOT NULL/range
+
+        Returns:
+            (accepted table, reject report dict)
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        total = table.num_rows
+        masks = self.arrow_rule_masks(table)
+        if not masks:
+            return table, RejectReport(id_field).as_dict(total)
+
+        rejected = np.zeros(total, dtype=bool)
+        rules, sample_ids = {}, {}
+        ids = table.column(id_field) if id_field in table.column_names else None
+        for rule, mask in masks.items():
+            rejected |= mask
+            rules[rule] = int(mask.sum())
+            if ids is not None:
+                sample_ids[rule] = [
+                    str(value) if value is not None else 'unknown'
+                    for value in ids.filter(pa.array(mask)).slice(0, SAMPLE_ID_LIMIT).to_pylist()
+                ]
+        rejected_count = int(rejected.sum())
+        report = {
+            'total': total,
+            'accepted': total - rejected_count,
+            'rejected': rejected_count,
+            'rules': rules,
+            'sample_ids': sample_ids,
+        }
+        return table.filter(pa.array(~rejected)), report
+
+
+def read_ddl(path=None):
+    """
+    Teks DDL; return (sql, asal)
+
+    Default DDL yang di-embed di shared/schema_ddl.py; path atau env
+    SCHEMA_DDL_PATH memakai file .sql lain (mis. untuk test).
+    """
+    path = path or os.environ.get('SCHEMA_DDL_PATH')
+    if path:
+        with open(path) as f:
+            return f.read(), path
+    from shared.schema_ddl import SOURCE, SQL
+    return SQL, SOURCE
+
+
+_lock = threading.Lock()
+_schemas = None
+
+
+def load_schemas(path=None, rules=None):
+    """Parse DDL dan compile validator semua tabel; return {table: TableSchema}"""
+    sql, source = read_ddl(path)
+    tables, _ = parse_ddl(sql)
+    rules = TABLE_RULES if rules is None else rules
+    schemas = {
+        name: TableSchema(name, apply_rules(name, columns, rules.get(name, {})))
+        for name, columns in tables.items()
+    }
+    logger.info(f"Compiled validators for {len(schemas)} tables from {source}")
+    return schemas
+
+
+def get_schema(table):
+    """TableSchema untuk tabel; DDL di-parse dan di-compile sekali per proses"""
+    global _schemas
+    if _schemas is None:
+        with _lock:
+            if _schemas is None:
+                _schemas = load_schemas()
+    try:
+        return _schemas[table]
+    except KeyError:
+        raise KeyError(f"Table {table} not found in {DDL_FILENAME}") from None
+
+
+def load_schema(table):
+    """Kolom load job ETL untuk tabel: tuple (nama, tipe BigQuery)"""
+    try:
+        return LOAD_SCHEMAS[table]
+    except KeyError:
+        raise KeyError(f"No load schema for table {table}") from None
+
+
+def bq_schema_string(table):
+    """Schema inline untuk `bq mk --table`, mis. 'product_id:STRING,price:FLOAT'"""
+    return ','.join(f"{name}:{field_type}" for name, field_type in load_schema(table))
+
+
+def reset_schemas():
+    """Lupakan schema yang sudah di-compile (untuk test / ganti SCHEMA_DDL_PATH)"""
+    global _schemas
+    with _lock:
+        _schemas = None
@@ -0,0 +1,99 @@
+"""
+Sharded raw writes + manifest
+
+Output ingestion dipecah menjadi beberapa shard dengan batas ukuran, di-upload
+paralel, lalu satu manifest JSON mencatat nama shard, jumlah row dan checksum.
+ETL membaca manifest untuk fan-out satu invocation per shard.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.raw_format import EXTENSIONS, write_raw_blob
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+SIZE_SAMPLE = 100
+
+
+def is_manifest(blob_name):
+    return blob_name.endswith(f'/{MANIFEST_NAME}')
+
+
+def estimate_record_bytes(records, sample_size=SIZE_SAMPLE):
+    """Perkiraan ukuran rata-rata satu record (NDJSON, belum dikompresi)"""
+    if not records:
+        return 0
+    step = max(1, len(records) // sample_size)
+    sample = records[::step][:sample_size]
+    total = sum(len(json.dumps(record, ensure_ascii=False).encode('utf-8')) + 1 for record in sample)
+    return max(1, total // len(sample))
+
+
+def plan_shards(records, max_bytes):
+    """Pecah records menjadi list shard; tiap shard kira-kira <= max_bytes"""
+    if not records:
+        return []
+    if not max_bytes:
+        return [records]
+    rows_per_shard = max(1, int(max_bytes) // estimate_record_bytes(records))
+    return [records[i:i + rows_per_shard] for i in range(0, len(records), rows_per_shard)]
+
+
+def shard_blob_name(prefix, index, raw_format):
+    return f"{prefix}/part-{index:05d}{EXTENSIONS[raw_format]}"
+
+
+def write_shards(bucket, prefix, records, metadata, raw_format, max_bytes, max_workers=4):
+    """
+    Tulis records sebagai shard paralel di bawah prefix, lalu tulis manifest
+
+    Returns:
+        dict manifest (juga disimpan di {prefix}/manifest.json)
+    """
+    shards = plan_shards(records, max_bytes)
+
+    def upload(index_and_rows):
+        index, rows = index_and_rows
+        name = shard_blob_name(prefix, index, raw_format)
+        shard_metadata = dict(metadata, shard_index=index, shard_count=len(shards))
+        stats = write_raw_blob(bucket.blob(name), rows, shard_metadata, raw_format=raw_format)
+        return {
+            'name': name,
+            'row_count': stats['records'],
+            'bytes': stats['bytes'],
+            'md5': stats['md5'],
+        }
+
+    workers = max(1, min(int(max_workers), len(shards) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        shard_entries = list(executor.map(upload, enumerate(shards)))
+
+    manifest = {
+        'metadata': metadata,
+        'format': raw_format,
+        'total_rows': sum(entry['row_count'] for entry in shard_entries),
+        'total_bytes': sum(entry['bytes'] for entry in shard_entries),
+        'shards': shard_entries,
+    }
+    manifest_name = f"{prefix}/{MANIFEST_NAME}"
+    bucket.blob(manifest_name).upload_from_string(
+        json.dumps(manifest, ensure_ascii=False),
+        content_type='application/json'
+    )
+    manifest['manifest_name'] = manifest_name
+
+    logger.info(
+        f"Wrote {len(shard_entries)} shards ({manifest['total_rows']} rows, "
+        f"{manifest['total_bytes']} bytes) with manifest gs://{bucket.name}/{manifest_name}"
+    )
+    return manifest
+
+
+def read_manifest(bucket, manifest_name):
+    """Baca manifest shard dari GCS"""
+    manifest = json.loads(bucket.blob(manifest_name).download_as_bytes())
+    manifest['manifest_name'] = manifest_name
+    return manifest
@@ -0,0 +1,203 @@
+"""
+Cold-start benchmark untuk Cloud Functions
+
+Tiap run memakai interpreter baru (seperti instance baru), lalu mengukur:
+- import_ms      : waktu `import main` (functions_framework sudah dimuat runtime)
+- first_call_ms  : latency invocation pertama tiap entry point ringan
+- heavy_modules  : SDK berat yang ikut termuat (harus kosong)
+
+Usage:
+    python scripts/benchmark_cold_start.py
+    python scripts/benchmark_cold_start.py --save-baseline
+    python scripts/benchmark_cold_start.py --max-import-ms 150 --max-regression 25
+    python scripts/benchmark_cold_start.py --no-baseline
+
+Exit code 1 jika threshold absolut terlampaui, median regress melewati
+--max-regression persen dibanding baseline, atau ada heavy module yang termuat.
+Baseline (file maupun entry per function) yang belum ada juga gagal, kecuali
+dengan --no-baseline (hanya threshold absolut). Regresi juga harus lebih dari
+MIN_REGRESSION_MS; import hanya beberapa ms, jadi 25% di sini masih noise timer.
+
+Baseline berisi angka absolut dari satu mesin. benchmarks/cold_start_baseline.json
+di-commit dari mesin referensi; di mesin lain atau CI runner, generate ulang dulu
+dengan --save-baseline di runner yang sama.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FUNCTIONS_DIR = os.path.join(ROOT_DIR, 'cloud-functions')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'cold_start_baseline.json')
+
+# Entry point ringan yang harus bisa jalan tanpa memuat GCP SDK
+ENTRY_POINTS = {
+    'data-ingestion': ['health_check'],
+    'etl-pipeline': ['health_check', 'etl_pipeline_http'],
+    'data-validation': ['validate_data'],
+}
+
+# Kenaikan di bawah ini tidak dianggap regresi (timer noise, import hanya beberapa ms)
+MIN_REGRESSION_MS = 5.0
+
+HEAVY_MODULES = [
+    'google.cloud.storage',
+    'google.cloud.bigquery',
+    'google.cloud.pubsub_v1',
+    'requests',
+    'pyarrow',
+    'numpy',
+]
+
+CHILD_SCRIPT = r'''
+import json, sys, time
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+entry_points = sys.argv[3].split(',')
+heavy = sys.argv[4].split(',')
+
+import functions_framework  # dimuat runtime sebelum main.py
+
+class Request:
+    def get_json(self, silent=False):
+        return {}
+
+class Event:
+    data = {'bucket': 'benchmark', 'name': 'raw/benchmark/manifest.json',
+            'message': {'data': ''}}
+
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+
+first_call_ms = {}
+for name in entry_points:
+    fn = getattr(main, name)
+    arg = Event() if name == 'validate_data' else Request()
+    start = time.perf_counter()
+    fn(arg)
+    first_call_ms[name] = (time.perf_counter() - start) * 1000
+
+print(json.dumps({
+    'import_ms': import_ms,
+    'first_call_ms': first_call_ms,
+    'heavy_modules': [m for m in heavy if m in sys.modules],
+}))
+'''
+
+
+def measure_once(function_name, entry_points=None):
+    """Satu cold start di interpreter baru; return dict hasil"""
+    entry_points = entry_points or ENTRY_POINTS[function_name]
+    env = dict(os.environ, USE_SAMPLE_DATA='true', PYTHONDONTWRITEBYTECODE='1')
+    output = subprocess.run(
+        [
+            sys.executable, '-c', CHILD_SCRIPT,
+            os.path.join(FUNCTIONS_DIR, function_name),
+            FUNCTIONS_DIR,
+            ','.join(entry_points),
+            ','.join(HEAVY_MODULES),
+        ],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(function_name, runs=5):
+    """Median import/first-call dari beberapa cold start"""
+    samples = [measure_once(function_name) for _ in range(runs)]
+    return {
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 2),
+        'first_call_ms': {
+            name: round(statistics.median(s['first_call_ms'][name] for s in samples), 2)
+            for name in ENTRY_POINTS[function_name]
+        },
+        'heavy_modules': sorted({m for s in samples for m in s['heavy_modules']}),
+    }
+
+
+def check(results, baseline, max_import_ms, max_first_call_ms, max_regression, min_regression_ms=MIN_REGRESSION_MS):
+    """Return list pesan kegagalan; baseline None = hanya threshold absolut"""
+    failures = []
+    for function_name, result in results.items():
+        if result['heavy_modules']:
+            failures.append(f"{function_name}: heavy modules loaded at cold start: {result['heavy_modules']}")
+        if result['import_ms'] > max_import_ms:
+            failures.append(f"{function_name}: import {result['import_ms']}ms > {max_import_ms}ms")
+        for name, value in result['first_call_ms'].items():
+            if value > max_first_call_ms:
+                failures.append(f"{function_name}.{name}: first call {value}ms > {max_first_call_ms}ms")
+
+        if baseline is None:
+            continue
+        previous = baseline.get(function_name)
+        if not previous:
+            failures.append(f"{function_name}: no baseline entry (run with --save-baseline)")
+            continue
+        limit = 1 + max_regression / 100.0
+        import_ms = result['import_ms']
+        if import_ms > previous['import_ms'] * limit and import_ms - previous['import_ms'] >= min_regression_ms:
+            failures.append(
+                f"{function_name}: import regressed {previous['import_ms']}ms -> {result['import_ms']}ms"
+            )
+        for name, value in result['first_call_ms'].items():
+            before = previous.get('first_call_ms', {}).get(name)
+            if before is None:
+                failures.append(f"{function_name}.{name}: no baseline entry (run with --save-baseline)")
+            elif value > before * limit and value - before >= min_regression_ms:
+                failures.append(f"{function_name}.{name}: first call regressed {before}ms -> {value}ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark untuk Cloud Functions')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--functions', nargs='*', default=list(ENTRY_POINTS))
+    parser.add_argument('--max-import-ms', type=float, default=200.0)
+    parser.add_argument('--max-first-call-ms', type=float, default=50.0)
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Persen regresi maksimal dibanding baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--no-baseline', action='store_true',
+                        help='Lewati perbandingan baseline; hanya threshold absolut dan heavy modules')
+    args = parser.parse_args()
+
+    results = {name: measure(name, args.runs) for name in args.functions}
+    for name, result in results.items():
+        print(f"{name:16s} import {result['import_ms']:8.2f}ms  first call {result['first_call_ms']}")
+
+    if args.save_baseline:
+        # Merge, supaya --functions sebagian tidak menghapus entry function lain
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = None
+    if not args.no_baseline:
+        if not os.path.exists(args.baseline):
+            print(f"FAIL: baseline {args.baseline} not found (run with --save-baseline, or --no-baseline)")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failures = check(results, baseline, args.max_import_ms, args.max_first_call_ms, args.max_regression)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("Cold start OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Micro-benchmark untuk hot path pipeline
+
+Case (masing-masing di 1k, 100k dan 1M rows secara default):
+- generate_sample_data : ingestion main.generate_sample_data
+- validate_data        : ingestion main.validate_data (loop per-row + reject report)
+- transform_data       : ETL main.transform_data
+- save_to_gcs_json     : ingestion main.save_to_gcs dengan RAW_FORMAT json ke bucket null (serialisasi saja)
+- dedup_filter         : scripts/data_loader.filter_new_records, separuh key sudah ada
+
+Case tambahan (hanya lewat --cases, tidak ikut gate default):
+- validate_row_loop    : validate_data versi lama (tanpa reject report), pembanding validate_data
+
+Tiap case x ukuran jalan di interpreter baru supaya peak memory tidak tercampur
+case lain. Dicatat: us_per_row (run tercepat dari --repeat, seperti timeit) dan rss_growth_mb
+(kenaikan ru_maxrss setelah input dibuat). Sebelum tiap run, loop kalibrasi tetap
+(calibrate) juga diukur (relative = us_per_row / calibration_us). Waktu dianggap
+regress hanya jika us_per_row dan relative sama-sama melewati batas, jadi mesin yang
+sedang lambat (CPU throttling, tetangga VM) tidak terbaca sebagai regresi.
+
+Usage:
+    python scripts/benchmark_hot_paths.py
+    python scripts/benchmark_hot_paths.py --sizes 1000 100000 --save-baseline
+    python scripts/benchmark_hot_paths.py --cases validate_data transform_data --max-regression 15
+
+Exit code 1 jika us_per_row atau rss_growth_mb regress melewati --max-regression
+persen dibanding baseline, atau jika baseline (file maupun entry case@rows) belum
+ada. Hanya ukuran >= --min-gate-rows yang dibandingkan; waktu di 1k rows hanya
+beberapa ms dan terlalu noisy untuk gate, jadi hanya ditampilkan.
+
+Baseline berisi angka absolut dari satu mesin. benchmarks/hot_paths_baseline.json
+di-commit dari mesin referensi; di mesin lain atau CI runner, generate ulang dulu
+dengan --save-baseline di runner yang sama (dan setelah case/ukuran baru ditambahkan)
+sebelum memakai gate ini.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'hot_paths_baseline.json')
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+CASES = ['generate_sample_data', 'validate_data', 'transform_data', 'save_to_gcs_json', 'dedup_filter']
+EXTRA_CASES = ['validate_row_loop']
+
+# Ukuran lebih kecil dari ini tidak ikut gate (run hanya beberapa ms, didominasi noise)
+MIN_GATE_ROWS = 100000
+DEFAULT_REPEAT = 5
+
+CALIBRATION_ITERATIONS = 100000
+
+# Kenaikan RSS di bawah ini dianggap noise (allocator, import lazy) dan tidak dibandingkan
+MIN_MEMORY_MB = 8.0
+WARMUP_ROWS = 10
+
+
+class NullBlob:
+    """Blob yang membuang payload; cukup untuk write_raw_blob format json"""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        self.bucket.bytes_written += len(data)
+
+
+class NullBucket:
+    def __init__(self, name):
+        self.name = name
+        self.bytes_written = 0
+
+    def blob(self, name):
+        return NullBlob(self, name)
+
+
+class NullStorageClient:
+    def __init__(self):
+        self.buckets = {}
+
+    def bucket(self, name):
+        return self.buckets.setdefault(name, NullBucket(name))
+
+
+def validate_row_loop(data):
+    """validate_data sebelum reject report: satu warning per bad row"""
+    required_fields = ['product_id', 'product_name', 'price', 'category']
+    validated_data = []
+    for item in data:
+        if all(field in item for field in required_fields):
+            item['price'] = float(item.get('price', 0))
+            item['sales_count'] = int(item.get('sales_count', 0))
+            validated_data.append(item)
+        else:
+            logging.warning(f"Item missing required fields: {item.get('product_id', 'unknown')}")
+    return validated_data
+
+
+def setup_case(case, rows):
+    """
+    Siapkan input di luar pengukuran
+
+    Returns:
+        callable tanpa argumen yang menjalankan satu iterasi case
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    from local_stack import load_function
+
+    if case == 'dedup_filter':
+        import pandas as pd
+
+        from data_loader import filter_new_records
+
+        df = pd.DataFrame({
+            'transaction_id': [f'TRX{i:08d}' for i in range(rows)],
+            'price': [float(i % 500) for i in range(rows)],
+            'quantity': [i % 7 for i in range(rows)],
+        })
+        existing_ids = {f'TRX{i:08d}' for i in range(0, rows, 2)}
+        return lambda: filter_new_records(df, 'transaction_id', existing_ids)
+
+    ingestion = load_function('data-ingestion')
+    if case == 'generate_sample_data':
+        return lambda: ingestion.generate_sample_data(num_products=rows)
+
+    records = ingestion.generate_sample_data(num_products=rows)
+    if case == 'validate_data':
+        return lambda: ingestion.validate_data(records)
+
+    if case == 'validate_row_loop':
+        return lambda: validate_row_loop(records)
+
+    if case == 'transform_data':
+        etl = load_function('etl-pipeline')
+        envelope = {'metadata': {'ingestion_id': 'BENCH', 'record_count': rows}, 'data': records}
+        return lambda: etl.transform_data(envelope)
+
+    if case == 'save_to_gcs_json':
+        from shared import clients
+
+        clients.set_factory('storage', lambda project, location, **options: NullStorageClient())
+        envelope = {'metadata': {'ingestion_id': 'BENCH', 'record_count': rows}, 'data': records}
+        return lambda: ingestion.save_to_gcs(envelope, 'benchmark', 'raw', raw_format='json')
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+def calibrate(iterations=CALIBRATION_ITERATIONS):
+    """
+    Waktu (us per iterasi) loop Python tetap: buat dict, format string, konversi angka
+
+    Mirip pekerjaan hot path, jadi ikut melambat saat mesin melambat. Memory
+    konstan supaya tidak ikut terhitung di rss_growth_mb; GC dimatikan supaya
+    ukuran heap case (jutaan record) tidak ikut terukur.
+    """
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        total = 0.0
+        for i in range(iterations):
+            record = {'id': f'P{i:06d}', 'value': str(i)}
+            total += float(record['value'])
+        return (time.perf_counter() - start) * 1e6 / iterations
+    finally:
+        gc.enable()
+
+
+def run_case(case, rows, repeat=DEFAULT_REPEAT):
+    """Jalankan satu case di proses ini; return dict hasil"""
+    from shared.metrics import peak_rss_mb
+
+    # Warm-up kecil: import lazy (pyarrow, pandas) tidak ikut dihitung sebagai waktu/memory case
+    setup_case(case, WARMUP_ROWS)()
+    fn = setup_case(case, rows)
+    rss_before = peak_rss_mb()
+    seconds = []
+    calibrations = []
+    for _ in range(repeat):
+        calibrations.append(calibrate())
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    rss_after = peak_rss_mb()
+
+    # Run tercepat paling sedikit terganggu noise mesin (GC, proses lain)
+    best = min(seconds)
+    us_per_row = best * 1e6 / rows
+    calibration = min(calibrations)
+    return {
+        'case': case,
+        'rows': rows,
+        'runs': repeat,
+        'best_seconds': round(best, 4),
+        'median_seconds': round(statistics.median(seconds), 4),
+        'us_per_row': round(us_per_row, 3),
+        'calibration_us': round(calibration, 4),
+        'relative': round(us_per_row / calibration, 3),
+        'peak_rss_mb': rss_after,
+        'rss_growth_mb': round(rss_after - rss_before, 1) if rss_after is not None else None,
+    }
+
+
+def measure(case, rows, repeat=DEFAULT_REPEAT):
+    """run_case di interpreter baru"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', case, str(rows), str(repeat)],
+        capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def result_key(case, rows):
+    return f"{case}@{rows}"
+
+
+def check(results, baseline, max_regression, min_memory_mb=MIN_MEMORY_MB, min_rows=MIN_GATE_ROWS):
+    """Return list pesan kegagalan; hasil dengan rows < min_rows tidak dibandingkan"""
+    failures = []
+    limit = 1 + max_regression / 100.0
+    for key, result in results.items():
+        if result['rows'] < min_rows:
+            continue
+        previous = baseline.get(key)
+        if not previous:
+            failures.append(f"{key}: no baseline entry (run with --save-baseline)")
+            continue
+        # Regresi waktu harus terlihat absolut dan relatif terhadap kalibrasi; noise
+        # mesin biasanya hanya menggeser salah satunya
+        slower = result['us_per_row'] > previous['us_per_row'] * limit
+        if slower and 'relative' in previous and 'relative' in result:
+            slower = result['relative'] > previous['relative'] * limit
+        if slower:
+            failures.append(f"{key}: time regressed {previous['us_per_row']}us/row -> {result['us_per_row']}us/row"
+                            f" ({previous.get('relative')}x -> {result.get('relative')}x calibration)")
+        before = previous.get('rss_growth_mb') or 0
+        after = result.get('rss_growth_mb') or 0
+        if max(before, after) >= min_memory_mb and after > before * limit:
+            failures.append(f"{key}: memory regressed {before}MB -> {after}MB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark hot path pipeline')
+    parser.add_argument('--cases', nargs='*', default=CASES, choices=CASES + EXTRA_CASES)
+    parser.add_argument('--sizes', nargs='*', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='Jumlah run per case; yang dibandingkan run tercepat')
+    parser.add_argument('--max-regression', type=float, default=25.0,
+                        help='Persen regresi maksimal dibanding baseline (waktu per row dan memory)')
+    parser.add_argument('--min-gate-rows', type=int, default=MIN_GATE_ROWS,
+                        help='Ukuran terkecil yang dibandingkan dengan baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--child', nargs=3, metavar=('CASE', 'ROWS', 'REPEAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.basicConfig(level=logging.WARNING)
+        sys.path.insert(0, os.path.join(ROOT_DIR, 'cloud-functions'))
+        case, rows, repeat = args.child
+        print(json.dumps(run_case(case, int(rows), int(repeat))))
+        return 0
+
+    results = {}
+    for case in args.cases:
+        for rows in args.sizes:
+            result = measure(case, rows, args.repeat)
+            results[result_key(case, rows)] = result
+            print(f"{case:22s} {rows:>9d} rows  {result['us_per_row']:10.3f} us/row  {result['relative']:8.3f}x  "
+                  f"{result['best_seconds']:9.4f}s  +{result['rss_growth_mb']}MB RSS")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"FAIL: baseline {args.baseline} not found (run with --save-baseline)")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    failures = check(results, baseline, args.max_regression, min_rows=args.min_gate_rows)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("Hot paths OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
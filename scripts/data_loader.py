@@ -8,6 +8,11 @@ from google.cloud import bigquery
 from datetime import datetime
 
 
+def filter_new_records(df: pd.DataFrame, unique_key: str, existing_ids: set) -> pd.DataFrame:
+    """Buang baris yang unique_key-nya sudah ada di tabel (filter step load_with_deduplication)"""
+    return df[~df[unique_key].isin(existing_ids)]
+
+
 def load_with_deduplication(
     client: bigquery.Client,
     df: pd.DataFrame,
@@ -64,7 +69,7 @@ def load_with_deduplication(
         
         # Filter hanya data baru
         if unique_key in df.columns and len(existing_ids) > 0:
-            df_new = df[~df[unique_key].isin(existing_ids)]
+            df_new = filter_new_records(df, unique_key, existing_ids)
             stats["duplicates_skipped"] = len(df) - len(df_new)
             stats["new_records"] = len(df_new)
             
@@ -220,10 +225,10 @@ def remove_duplicates(
 # Contoh Penggunaan
 # ============================================
 """
-from google.cloud import bigquery
+from shared.clients import get_bigquery_client
 from data_loader import load_with_deduplication, check_duplicates
 
-client = bigquery.Client(project='ipsd-483408')
+client = get_bigquery_client('ipsd-483408')  # dipakai ulang oleh semua helper
 table_id = 'ipsd-483408.umkm_analytics.raw_sales'
 
 # Load CSV
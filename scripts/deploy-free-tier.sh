@@ -19,6 +19,10 @@ print_error() { echo -e "${RED}✗ $1${NC}"; }
 print_info() { echo -e "${YELLOW}ℹ $1${NC}"; }
 print_step() { echo -e "${BLUE}▶ $1${NC}"; }
 
+# Copy cloud-functions/shared ke source function yang sedang di-deploy
+# (gcloud hanya meng-upload folder --source)
+sync_shared() { rm -rf shared && cp -r ../shared shared; }
+
 echo ""
 echo "============================================"
 echo "  UMKM Analytics - Free Tier Deployment"
@@ -55,6 +59,7 @@ gcloud config set project $PROJECT_ID
 print_step "Step 1: Deploying Data Ingestion Cloud Function..."
 
 cd cloud-functions/data-ingestion
+sync_shared
 
 # Check if function exists
 if gcloud functions describe ingest-sales-data --gen2 --region=$REGION &>/dev/null; then
@@ -74,7 +79,7 @@ $DEPLOY_CMD \
     --trigger-topic=data-ingestion-trigger \
     --memory=256MB \
     --timeout=540s \
-    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,USE_SAMPLE_DATA=true" \
+    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,USE_SAMPLE_DATA=true,RAW_FORMAT=ndjson.gz,RAW_SHARD_MAX_BYTES=67108864,SNAPSHOT_DIFF=true" \
     --quiet
 
 print_success "Data Ingestion function deployed"
@@ -87,6 +92,7 @@ cd ../..
 print_step "Step 2: Deploying ETL Pipeline Cloud Function..."
 
 cd cloud-functions/etl-pipeline
+sync_shared
 
 gcloud functions deploy etl-pipeline \
     --gen2 \
@@ -97,7 +103,7 @@ gcloud functions deploy etl-pipeline \
     --trigger-topic=etl-pipeline-trigger \
     --memory=512MB \
     --timeout=540s \
-    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,DATASET_ID=$DATASET_ID" \
+    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,DATASET_ID=$DATASET_ID,ETL_TRIGGER_TOPIC=etl-pipeline-trigger,ETL_STREAMING=true" \
     --quiet
 
 print_success "ETL Pipeline function deployed"
@@ -111,6 +117,7 @@ print_step "Step 3: Deploying Data Validation Cloud Function..."
 
 if [ -d "cloud-functions/data-validation" ]; then
     cd cloud-functions/data-validation
+    sync_shared
     
     gcloud functions deploy validate-sales-data \
         --gen2 \
@@ -137,6 +144,7 @@ fi
 print_step "Step 4: Deploying HTTP trigger for manual ingestion..."
 
 cd cloud-functions/data-ingestion
+sync_shared
 
 gcloud functions deploy ingest-sales-http \
     --gen2 \
@@ -148,7 +156,7 @@ gcloud functions deploy ingest-sales-http \
     --allow-unauthenticated \
     --memory=256MB \
     --timeout=540s \
-    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,USE_SAMPLE_DATA=true" \
+    --set-env-vars="GCP_PROJECT=$PROJECT_ID,BUCKET_NAME=$BUCKET_NAME,USE_SAMPLE_DATA=true,RAW_FORMAT=ndjson.gz,RAW_SHARD_MAX_BYTES=67108864,SNAPSHOT_DIFF=true" \
     --quiet
 
 print_success "HTTP trigger deployed"
@@ -160,12 +168,13 @@ cd ../..
 # ============================================
 print_step "Step 5: Ensuring BigQuery tables exist..."
 
-# Raw sales table
+# Raw sales table (kolom dari LOAD_SCHEMAS di cloud-functions/shared/schema.py)
+RAW_SALES_SCHEMA=$(cd cloud-functions && python3 -c "from shared.schema import bq_schema_string; print(bq_schema_string('raw_sales'))")
 bq mk --table \
     --description="Raw sales data" \
-    --time_partitioning_field=ingestion_date \
+    --time_partitioning_field=sale_date \
     $PROJECT_ID:$DATASET_ID.raw_sales \
-    product_id:STRING,product_name:STRING,category:STRING,price:FLOAT,original_price:FLOAT,discount_percent:INTEGER,sales_count:INTEGER,rating:FLOAT,review_count:INTEGER,stock:INTEGER,seller_name:STRING,seller_location:STRING,ingestion_date:DATE,sale_date:DATE,revenue:FLOAT \
+    $RAW_SALES_SCHEMA \
     2>/dev/null || print_info "Table raw_sales already exists"
 
 # Daily summary table
@@ -18,6 +18,9 @@ print_error() { echo -e "${RED}✗ $1${NC}"; }
 print_info() { echo -e "${YELLOW}ℹ $1${NC}"; }
 print_step() { echo -e "${BLUE}▶ $1${NC}"; }
 
+# Copy cloud-functions/shared ke source function yang sedang di-deploy
+sync_shared() { rm -rf shared && cp -r ../shared shared; }
+
 # ============================================
 # Load Configuration
 # ============================================
@@ -39,6 +42,7 @@ print_step "Step 1: Deploying Cloud Functions..."
 
 # Deploy data ingestion function
 cd cloud-functions/data-ingestion
+sync_shared
 
 print_info "Deploying data-ingestion function..."
 gcloud functions deploy ingest-data \
@@ -225,6 +229,19 @@ EOF
 
 print_info "Import dashboard manually in Cloud Monitoring Console"
 
+# Log-based metrics dari log JSON per stage (shared/metrics.py)
+print_info "Creating log-based pipeline metrics..."
+for config in monitoring/log-filters/*.yaml; do
+    metric_name=$(grep '^name:' "$config" | awk '{print $2}')
+    gcloud logging metrics create "$metric_name" --config-from-file="$config" --project=$PROJECT_ID 2>/dev/null || \
+        gcloud logging metrics update "$metric_name" --config-from-file="$config" --project=$PROJECT_ID
+done
+
+gcloud monitoring dashboards create \
+    --config-from-file=monitoring/dashboards/pipeline-performance.json \
+    --project=$PROJECT_ID \
+    && print_success "Created Pipeline Performance dashboard (p50/p95 per stage)"
+
 # Create uptime check
 print_info "Creating uptime check for HTTP endpoint..."
 HTTP_URL=$(gcloud functions describe ingest-data-http --region=$REGION --format='value(serviceConfig.uri)' --project=$PROJECT_ID)
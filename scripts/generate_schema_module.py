@@ -0,0 +1,66 @@
+"""
+Generate cloud-functions/shared/schema_ddl.py dari bigquery/schemas/create_tables.sql
+
+shared/ ikut ter-deploy bersama tiap Cloud Function, folder bigquery/ tidak;
+DDL di-embed sebagai module Python supaya shared.schema tidak perlu membaca
+file dari repo saat runtime.
+
+Usage:
+    python scripts/generate_schema_module.py
+    python scripts/generate_schema_module.py --check
+
+Exit code 1 dengan --check jika schema_ddl.py tidak sama dengan DDL terbaru.
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DDL_SOURCE = 'bigquery/schemas/create_tables.sql'
+MODULE_PATH = os.path.join(ROOT_DIR, 'cloud-functions', 'shared', 'schema_ddl.py')
+
+TEMPLATE = '''"""
+DDL BigQuery untuk shared.schema
+
+GENERATED dari {source}
+oleh scripts/generate_schema_module.py - jangan diedit manual; ubah file .sql
+lalu jalankan ulang script tersebut.
+"""
+
+SOURCE = {source!r}
+
+SQL = r\'\'\'{sql}\'\'\'
+'''
+
+
+def render(sql):
+    if "'''" in sql or sql.endswith('\\'):
+        raise ValueError(f"{DDL_SOURCE} cannot be embedded as a raw triple-quoted string")
+    return TEMPLATE.format(source=DDL_SOURCE, sql=sql)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Embed create_tables.sql ke shared/schema_ddl.py')
+    parser.add_argument('--check', action='store_true', help='Hanya cek apakah module sudah up to date')
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT_DIR, DDL_SOURCE)) as f:
+        expected = render(f.read())
+
+    if args.check:
+        current = open(MODULE_PATH).read() if os.path.exists(MODULE_PATH) else None
+        if current != expected:
+            print(f"{MODULE_PATH} is out of date, run scripts/generate_schema_module.py")
+            return 1
+        print(f"{MODULE_PATH} is up to date")
+        return 0
+
+    with open(MODULE_PATH, 'w') as f:
+        f.write(expected)
+    print(f"Wrote {MODULE_PATH}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
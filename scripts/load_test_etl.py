@@ -0,0 +1,288 @@
+"""
+Concurrent load test untuk ETL Pipeline
+
+Men-sintesis N CloudEvent Pub/Sub (payload base64 seperti etl_pipeline_http)
+dan mengirimnya ke handler etl_pipeline asli. Tiap worker adalah proses
+terpisah, setara satu instance Cloud Function (concurrency 1 per instance),
+jadi --concurrency 10 meniru max_instances: 10 di config/config.yaml.
+
+GCS dan BigQuery diganti stand-in lokal dari local_stack.py (folder + SQLite
+yang dipakai bersama semua worker), dengan latency buatan per request GCS
+dan per job BigQuery.
+
+Report per level concurrency: throughput (events/s dan rows/s), latency
+p50/p95/p99, error rate dan p95 per stage; lalu kurva saturasi.
+
+Usage:
+    python scripts/load_test_etl.py --events 40 --concurrency 1 2 4 8 10
+    python scripts/load_test_etl.py --events 100 --rows-per-blob 5000 --gcs-latency-ms 30 --bq-latency-ms 1500 \\
+        --bq-latency-jitter-ms 500 --json load_test.json
+"""
+
+import argparse
+import base64
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from local_stack import (  # noqa: E402
+    FUNCTIONS_DIR, Latency, LocalBigQueryClient, LocalStorageClient, SqliteWarehouse, load_function
+)
+from run_local_pipeline import BUCKET_NAME, DATASET_ID, PROJECT_ID, MetricsCapture, percentile  # noqa: E402
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 10]
+
+# Level dianggap saturasi jika throughput-nya sudah >= fraksi ini dari throughput tertinggi
+SATURATION_FRACTION = 0.9
+
+
+def make_event(payload):
+    """CloudEvent Pub/Sub seperti yang dibuat etl_pipeline_http"""
+    from cloudevents.http import CloudEvent
+
+    attributes = {
+        "type": "google.cloud.pubsub.topic.v1.messagePublished",
+        "source": "load-test"
+    }
+    message_data = base64.b64encode(json.dumps(payload).encode()).decode()
+    return CloudEvent(attributes, {"message": {"data": message_data}})
+
+
+def write_blobs(storage_client, prefix, count, rows_per_blob, raw_format):
+    """Raw blob sintetis untuk satu level; return list blob_name"""
+    from shared.raw_format import raw_blob_name, write_raw_blob
+
+    ingestion = load_function('data-ingestion')
+    records = ingestion.generate_sample_data(num_products=rows_per_blob)
+    bucket = storage_client.bucket(BUCKET_NAME)
+    names = []
+    for index in range(count):
+        name = raw_blob_name(prefix, f"event_{index:05d}", raw_format)
+        write_raw_blob(bucket.blob(name), records, {'ingestion_id': f'LOAD_{index:05d}'}, raw_format=raw_format)
+        names.append(name)
+    return names
+
+
+def _latency(config, kind, seed):
+    return Latency(config[f'{kind}_latency_ms'], config[f'{kind}_latency_jitter_ms'], seed=seed)
+
+
+def worker(worker_id, config, tasks, results):
+    """Satu 'instance': setup stand-in, load etl_pipeline, proses task sampai sentinel None"""
+    os.environ.update(config['env'])
+    sys.path.insert(0, FUNCTIONS_DIR)
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from shared import clients
+
+    storage_client = LocalStorageClient(config['gcs_root'], latency=_latency(config, 'gcs', worker_id))
+    warehouse = SqliteWarehouse(config['warehouse'], ddl_path=config['ddl'])
+    bigquery_client = LocalBigQueryClient(warehouse, latency=_latency(config, 'bq', worker_id))
+    clients.set_factory('storage', lambda project, location, **options: storage_client)
+    clients.set_factory('bigquery', lambda project, location, **options: bigquery_client)
+    etl = load_function('etl-pipeline')
+    results.put({'ready': worker_id})
+
+    with open(os.devnull, 'w') as devnull:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            capture = MetricsCapture(devnull)
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(capture):
+                    result = etl.etl_pipeline(make_event(task['payload']))
+                status = result.get('status', 'error') if isinstance(result, dict) else 'error'
+                message = result.get('message') if isinstance(result, dict) else None
+                rows = result.get('records_processed', 0) if isinstance(result, dict) else 0
+            except Exception as e:
+                status, message, rows = 'error', str(e), 0
+            results.put({
+                'event': task['event'],
+                'worker': worker_id,
+                'status': status,
+                'message': message,
+                'rows': rows or 0,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+                'stages': [(entry['stage'], entry['duration_ms']) for entry in capture.stages],
+            })
+    warehouse.close()
+
+
+def run_level(config, concurrency, blob_names):
+    """
+    Kirim satu event per blob ke `concurrency` worker
+
+    Worker di-start dan siap (module ter-load) sebelum timer mulai, jadi cold
+    start tidak ikut dalam throughput.
+    """
+    context = multiprocessing.get_context('spawn')
+    tasks = context.Queue()
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(worker_id, config, tasks, results), daemon=True)
+        for worker_id in range(concurrency)
+    ]
+    for process in workers:
+        process.start()
+    for _ in workers:
+        results.get()
+
+    start = time.perf_counter()
+    for index, blob_name in enumerate(blob_names):
+        tasks.put({'event': index, 'payload': {'blob_name': blob_name, 'ingestion_id': f'LOAD_{index:05d}'}})
+    for _ in workers:
+        tasks.put(None)
+    outcomes = [results.get() for _ in blob_names]
+    elapsed = time.perf_counter() - start
+    for process in workers:
+        process.join()
+    return summarize_level(concurrency, outcomes, elapsed)
+
+
+def summarize_level(concurrency, outcomes, elapsed):
+    latencies = [outcome['latency_ms'] for outcome in outcomes]
+    errors = [outcome for outcome in outcomes if outcome['status'] not in ('success', 'already_processed')]
+    rows = sum(outcome['rows'] for outcome in outcomes)
+    stages = {}
+    for outcome in outcomes:
+        for stage, duration_ms in outcome['stages']:
+            stages.setdefault(stage, []).append(duration_ms)
+    return {
+        'concurrency': concurrency,
+        'events': len(outcomes),
+        'errors': len(errors),
+        'error_rate': round(len(errors) / len(outcomes), 4) if outcomes else 0.0,
+        'error_samples': sorted({outcome['message'] or outcome['status'] for outcome in errors})[:5],
+        'elapsed_seconds': round(elapsed, 3),
+        'events_per_sec': round(len(outcomes) / elapsed, 2) if elapsed > 0 else None,
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'stage_p95_ms': {stage: percentile(durations, 95) for stage, durations in sorted(stages.items())},
+    }
+
+
+def saturation_point(levels, fraction=SATURATION_FRACTION):
+    """Concurrency terkecil yang throughput-nya >= fraction x throughput tertinggi"""
+    if not levels:
+        return None
+    best = max(level['events_per_sec'] or 0 for level in levels)
+    for level in sorted(levels, key=lambda level: level['concurrency']):
+        if (level['events_per_sec'] or 0) >= best * fraction:
+            return level['concurrency']
+
+
+def run_load_test(args, workdir):
+    os.environ.update({'GCP_PROJECT': PROJECT_ID, 'BUCKET_NAME': BUCKET_NAME, 'DATASET_ID': DATASET_ID})
+    if FUNCTIONS_DIR not in sys.path:
+        sys.path.insert(0, FUNCTIONS_DIR)
+
+    config = {
+        'gcs_root': os.path.join(workdir, 'gcs'),
+        'warehouse': os.path.join(workdir, 'warehouse.db'),
+        'ddl': args.ddl,
+        'gcs_latency_ms': args.gcs_latency_ms,
+        'gcs_latency_jitter_ms': args.gcs_latency_jitter_ms,
+        'bq_latency_ms': args.bq_latency_ms,
+        'bq_latency_jitter_ms': args.bq_latency_jitter_ms,
+        # Env ETL apa adanya (ETL_STREAMING, ETL_LOAD_FORMAT, ...) + project lokal
+        'env': {key: value for key, value in os.environ.items()
+                if key.startswith(('ETL_', 'LEDGER_', 'GCP_', 'BUCKET_', 'DATASET_'))},
+    }
+    # Tabel dibuat sekali sebelum worker start, supaya worker tidak berebut DDL
+    SqliteWarehouse(config['warehouse'], ddl_path=args.ddl).close()
+    storage_client = LocalStorageClient(config['gcs_root'])
+
+    levels = []
+    for concurrency in args.concurrency:
+        blob_names = write_blobs(storage_client, f"raw/loadtest/c{concurrency:03d}", args.events,
+                                 args.rows_per_blob, args.raw_format)
+        level = run_level(config, concurrency, blob_names)
+        levels.append(level)
+        print(f"  concurrency {concurrency:>3}: {level['events_per_sec']} events/s, "
+              f"p95 {level['p95_ms']}ms, errors {level['errors']}/{level['events']}")
+
+    return {
+        'events_per_level': args.events,
+        'rows_per_blob': args.rows_per_blob,
+        'raw_format': args.raw_format,
+        'latency': {
+            'gcs_ms': [args.gcs_latency_ms, args.gcs_latency_jitter_ms],
+            'bq_ms': [args.bq_latency_ms, args.bq_latency_jitter_ms],
+        },
+        'levels': levels,
+        'saturation_concurrency': saturation_point(levels),
+    }
+
+
+def print_report(report):
+    print("")
+    print(f"{'conc':>5} {'events/s':>9} {'rows/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7}  saturation")
+    best = max((level['events_per_sec'] or 0 for level in report['levels']), default=0)
+    for level in report['levels']:
+        bar = '#' * int(round(30 * (level['events_per_sec'] or 0) / best)) if best else ''
+        print(f"{level['concurrency']:>5} {level['events_per_sec']:>9} {level['rows_per_sec']:>10} "
+              f"{level['p50_ms']:>9} {level['p95_ms']:>9} {level['p99_ms']:>9} "
+              f"{level['error_rate'] * 100:>6.1f}%  {bar}")
+    print("")
+    for level in report['levels']:
+        stages = ', '.join(f"{stage} {value}ms" for stage, value in level['stage_p95_ms'].items())
+        print(f"  stage p95 @ {level['concurrency']:>3}: {stages}")
+        for sample in level['error_samples']:
+            print(f"    error: {sample}")
+    print("")
+    print(f"Throughput saturates at concurrency {report['saturation_concurrency']} "
+          f"(>= {int(SATURATION_FRACTION * 100)}% of peak)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent load test for etl_pipeline')
+    parser.add_argument('--events', type=int, default=40, help='Events per concurrency level')
+    parser.add_argument('--concurrency', nargs='*', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--rows-per-blob', type=int, default=1000)
+    parser.add_argument('--raw-format', default='ndjson.gz', choices=['json', 'ndjson.gz', 'parquet'])
+    parser.add_argument('--gcs-latency-ms', type=float, default=20.0)
+    parser.add_argument('--gcs-latency-jitter-ms', type=float, default=10.0)
+    parser.add_argument('--bq-latency-ms', type=float, default=500.0, help='Latency per load/query job')
+    parser.add_argument('--bq-latency-jitter-ms', type=float, default=200.0)
+    parser.add_argument('--ddl', default=os.path.join(os.path.dirname(FUNCTIONS_DIR), 'bigquery', 'schemas',
+                                                      'create_tables.sql'))
+    parser.add_argument('--workdir', help='Folder bucket + warehouse (default: temp dir, dihapus setelah run)')
+    parser.add_argument('--json', dest='json_path', help='Tulis report sebagai JSON ke file ini')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='umkm-loadtest-')
+    try:
+        report = run_load_test(args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(level['errors'] for level in report['levels']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Gabungkan column profile sidecar (<blob>.profile.json) menjadi profile harian
+
+Sidecar ditulis oleh data-validation untuk tiap raw blob. Script ini membaca
+semua sidecar di bawah --prefix, mengelompokkan per tanggal validasi, lalu
+merge sketch HLL/KLL per kolom (shared/profiling.py) - tanpa query BigQuery.
+Hasil ditulis ke {--out-prefix}/date=YYYY-MM-DD.json di bucket yang sama.
+
+Sidecar dari validasi yang berhenti lebih awal (complete=false) dilewati,
+kecuali dengan --include-partial.
+
+Usage:
+    python scripts/merge_profiles.py --bucket umkm-data-lake
+    python scripts/merge_profiles.py --bucket umkm-data-lake --date 2024-01-01 --dry-run
+    python scripts/merge_profiles.py --local-root /tmp/umkm-local/gcs --bucket umkm-data-lake
+"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, '..', 'cloud-functions'))
+
+from shared.profiling import is_profile, merge_profiles, write_profile  # noqa: E402
+
+DEFAULT_PREFIX = 'raw/'
+DEFAULT_OUT_PREFIX = 'profiles/daily'
+
+
+def collect_profiles(client, bucket_name, prefix=DEFAULT_PREFIX, dates=None, include_partial=False):
+    """
+    Baca sidecar di bawah prefix, dikelompokkan per tanggal
+
+    Returns:
+        ({date: [profile]}, jumlah sidecar yang dilewati)
+    """
+    by_date = collections.defaultdict(list)
+    skipped = 0
+    for blob in client.list_blobs(bucket_name, prefix=prefix):
+        if not is_profile(blob.name):
+            continue
+        profile = json.loads(blob.download_as_bytes())
+        if dates and profile.get('date') not in dates:
+            continue
+        if not profile.get('complete', True) and not include_partial:
+            skipped += 1
+            continue
+        by_date[profile.get('date')].append(profile)
+    return dict(by_date), skipped
+
+
+def merge_daily(client, bucket_name, prefix=DEFAULT_PREFIX, out_prefix=DEFAULT_OUT_PREFIX, dates=None,
+                include_partial=False, dry_run=False):
+    """Merge sidecar per tanggal dan tulis profile harian; return ringkasan per tanggal"""
+    by_date, skipped = collect_profiles(client, bucket_name, prefix, dates, include_partial)
+    bucket = client.bucket(bucket_name)
+    summary = []
+    for date in sorted(by_date, key=str):
+        profiles = by_date[date]
+        tables = sorted({profile.get('table') for profile in profiles if profile.get('table')})
+        daily = merge_profiles(profiles, date=date, table=tables[0] if len(tables) == 1 else tables)
+        name = f"{out_prefix}/date={date}.json"
+        if not dry_run:
+            write_profile(bucket.blob(name), daily)
+        summary.append({
+            'date': date,
+            'blob': name,
+            'sidecars': len(profiles),
+            'records': daily['records'],
+            'columns': {
+                column: {key: stats.get(key) for key in ('nulls', 'distinct', 'min', 'max', 'mean')}
+                for column, stats in daily['columns'].items()
+            },
+        })
+    return {'dates': summary, 'skipped_partial': skipped}
+
+
+def print_summary(report):
+    for day in report['dates']:
+        print(f"📅 {day['date']}: {day['records']} records dari {day['sidecars']} sidecar → {day['blob']}")
+        for column, stats in day['columns'].items():
+            print(f"   {column:<20} nulls={stats['nulls']:<8} distinct~{stats['distinct']:<8} "
+                  f"min={stats['min']} max={stats['max']}")
+    if report['skipped_partial']:
+        print(f"⚠️  {report['skipped_partial']} sidecar parsial dilewati (pakai --include-partial)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Merge column profile sidecars into daily profiles')
+    parser.add_argument('--bucket', default=os.environ.get('BUCKET_NAME', 'umkm-data-lake'))
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='Prefix raw blob yang sidecar-nya dibaca')
+    parser.add_argument('--out-prefix', default=DEFAULT_OUT_PREFIX)
+    parser.add_argument('--date', dest='dates', action='append', help='Hanya tanggal ini (boleh berulang)')
+    parser.add_argument('--include-partial', action='store_true', help='Ikutkan sidecar dari validasi yang berhenti awal')
+    parser.add_argument('--dry-run', action='store_true', help='Hanya tampilkan ringkasan, tanpa menulis')
+    parser.add_argument('--local-root', help='Folder bucket local_stack.py sebagai pengganti GCS')
+    parser.add_argument('--project', default=os.environ.get('GCP_PROJECT_ID'))
+    parser.add_argument('--json', dest='json_path', help='Tulis ringkasan sebagai JSON ke file ini')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.local_root:
+        sys.path.insert(0, SCRIPTS_DIR)
+        from local_stack import LocalStorageClient
+        client = LocalStorageClient(args.local_root)
+    else:
+        from shared.clients import get_storage_client
+        client = get_storage_client(args.project)
+
+    report = merge_daily(client, args.bucket, args.prefix, args.out_prefix, args.dates,
+                         args.include_partial, args.dry_run)
+    print_summary(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['dates'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
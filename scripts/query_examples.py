@@ -2,15 +2,18 @@
 Sample Python queries to interact with the data
 """
 
-from google.cloud import bigquery
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud-functions'))
+from shared.clients import get_bigquery_client  # noqa: E402
 
 PROJECT_ID = os.environ.get('GCP_PROJECT')
 DATASET_ID = 'umkm_analytics'
 
 def get_daily_sales_summary():
-    client = bigquery.Client(project=PROJECT_ID)
+    client = get_bigquery_client(PROJECT_ID)
     query = f"""
     SELECT
         summary_date,
@@ -23,7 +26,7 @@ def get_daily_sales_summary():
     return client.query(query).to_dataframe()
 
 def get_top_products():
-    client = bigquery.Client(project=PROJECT_ID)
+    client = get_bigquery_client(PROJECT_ID)
     query = f"""
     SELECT
         product_name,
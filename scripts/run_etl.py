@@ -4,8 +4,11 @@ Dijalankan via GitHub Actions atau Google Colab
 """
 
 import os
+import sys
 import pandas as pd
-from google.cloud import bigquery
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud-functions'))
+from shared.clients import get_bigquery_client  # noqa: E402
 
 # Configuration
 PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'ipsd-483408')
@@ -15,7 +18,7 @@ LOCATION = 'asia-southeast2'
 
 def run_daily_summary_etl():
     """Generate daily summary dari raw_sales"""
-    client = bigquery.Client(project=PROJECT_ID, location=LOCATION)
+    client = get_bigquery_client(PROJECT_ID, LOCATION)
     
     query = f"""
     CREATE OR REPLACE TABLE `{PROJECT_ID}.{DATASET_ID}.daily_summary` AS
@@ -48,7 +51,7 @@ def run_daily_summary_etl():
 
 def run_sentiment_aggregation():
     """Aggregate sentiment dari tokopedia_reviews"""
-    client = bigquery.Client(project=PROJECT_ID, location=LOCATION)
+    client = get_bigquery_client(PROJECT_ID, LOCATION)
     
     query = f"""
     CREATE OR REPLACE TABLE `{PROJECT_ID}.{DATASET_ID}.sentiment_summary` AS
@@ -0,0 +1,295 @@
+"""
+Local end-to-end pipeline runner
+
+Menjalankan code path asli ingest_data → validate_data → etl_pipeline →
+daily summary dalam satu proses, tanpa project GCP:
+
+- bucket GCS   → folder lokal (--workdir/gcs)
+- Pub/Sub      → antrian in-process; object finalize di raw/ men-trigger validate_data
+- BigQuery     → SQLite (--workdir/warehouse.db) dengan tabel dari bigquery/schemas/create_tables.sql
+
+Report berisi throughput end-to-end, latency per invocation dan p50/p95 per stage
+(dari log JSON shared/metrics.py), serta kolom yang dipakai functions tapi tidak
+ada di DDL (schema drift).
+
+Usage:
+    python scripts/run_local_pipeline.py --rows 100000
+    python scripts/run_local_pipeline.py --rows 1000000 --raw-format parquet --load-format parquet
+    python scripts/run_local_pipeline.py --rows 50000 --shard-bytes 4000000 --micro-batch --json report.json
+
+Environment variable function lain (ETL_CHUNK_SIZE, ETL_READ_WORKERS, ...) ikut
+dipakai apa adanya.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_stack import (  # noqa: E402
+    FINALIZE_TOPIC, FUNCTIONS_DIR, LocalBigQueryClient, LocalPublisherClient, LocalQueue,
+    LocalStorageClient, SqliteWarehouse, load_function, pubsub_event, storage_event
+)
+
+PROJECT_ID = 'local-project'
+BUCKET_NAME = 'umkm-data-lake'
+DATASET_ID = 'umkm_analytics'
+INGESTION_TOPIC = 'data-ingestion-trigger'
+ETL_TOPIC = 'etl-pipeline-trigger'
+
+
+class MetricsCapture(io.TextIOBase):
+    """Stdout pengganti: simpan baris JSON shared.metrics, teruskan sisanya"""
+
+    def __init__(self, passthrough, echo=False):
+        self.passthrough = passthrough
+        self.echo = echo
+        self.stages = []
+        self.invocations = []
+        self._pending = ''
+
+    def write(self, text):
+        self._pending += text
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            self._handle(line)
+        return len(text)
+
+    def _handle(self, line):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            entry = None
+        if isinstance(entry, dict) and entry.get('event') == 'pipeline_stage':
+            self.stages.append(entry)
+        elif isinstance(entry, dict) and entry.get('event') == 'pipeline_invocation':
+            self.invocations.append(entry)
+        else:
+            self.passthrough.write(line + '\n')
+            return
+        if self.echo:
+            self.passthrough.write(line + '\n')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return round(values[0], 2)
+    return round(statistics.quantiles(values, n=100, method='inclusive')[pct - 1], 2)
+
+
+def summarize(entries, key):
+    """Group entries per key, hitung count/total/p50/p95 dari duration_ms"""
+    groups = {}
+    for entry in entries:
+        groups.setdefault(key(entry), []).append(entry)
+    summary = {}
+    for name, group in sorted(groups.items()):
+        durations = [entry['duration_ms'] for entry in group]
+        rows = sum(entry.get('rows') or 0 for entry in group)
+        total_ms = round(sum(durations), 2)
+        summary[name] = {
+            'count': len(group),
+            'total_ms': total_ms,
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'rows': rows,
+            'rows_per_sec': round(rows / (total_ms / 1000), 1) if rows and total_ms else None,
+            'errors': sum(1 for entry in group if entry.get('status') == 'error'),
+        }
+    return summary
+
+
+def configure_environment(args):
+    """Env var dibaca saat module main.py di-load, jadi di-set sebelum load_function"""
+    os.environ.update({
+        'GCP_PROJECT': PROJECT_ID,
+        'BUCKET_NAME': BUCKET_NAME,
+        'DATASET_ID': DATASET_ID,
+        'ETL_TRIGGER_TOPIC': ETL_TOPIC,
+        'USE_SAMPLE_DATA': 'true',
+        'SAMPLE_DATA_ROWS': str(args.rows),
+        'RAW_FORMAT': args.raw_format,
+        'RAW_SHARD_MAX_BYTES': str(args.shard_bytes),
+        'ETL_STREAMING': str(args.streaming).lower(),
+        'ETL_TRANSFORM_ENGINE': args.transform_engine,
+        'ETL_LOAD_FORMAT': args.load_format,
+        'ETL_MICRO_BATCH': str(args.micro_batch).lower(),
+    })
+
+
+def run_pipeline(args, workdir):
+    """
+    Jalankan satu ingestion dan semua trigger turunannya sampai antrian kosong
+
+    Returns:
+        dict report
+    """
+    configure_environment(args)
+    if FUNCTIONS_DIR not in sys.path:
+        sys.path.insert(0, FUNCTIONS_DIR)
+
+    from shared import clients
+
+    queue = LocalQueue()
+
+    def on_finalize(bucket_name, blob_name):
+        # Notifikasi bucket hanya untuk raw data, seperti trigger validate_data
+        if blob_name.startswith(os.environ.get('RAW_FOLDER', 'raw') + '/'):
+            queue.put(FINALIZE_TOPIC, json.dumps({'bucket': bucket_name, 'name': blob_name}).encode('utf-8'))
+
+    storage_client = LocalStorageClient(os.path.join(workdir, 'gcs'), on_finalize=on_finalize)
+    warehouse = SqliteWarehouse(os.path.join(workdir, 'warehouse.db'), ddl_path=args.ddl)
+    clients.set_factory('storage', lambda project, location, **options: storage_client)
+    clients.set_factory('bigquery', lambda project, location, **options: LocalBigQueryClient(warehouse))
+    clients.set_factory('publisher', lambda project, location, **options: LocalPublisherClient(queue))
+
+    ingestion = load_function('data-ingestion')
+    validation = load_function('data-validation')
+    etl = load_function('etl-pipeline')
+
+    invocations = []
+
+    def invoke(function_name, fn, event):
+        start = time.perf_counter()
+        result = fn(event)
+        invocations.append({
+            'function': function_name,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'status': result.get('status', 'ok') if isinstance(result, dict) else 'ok',
+        })
+        return result
+
+    handlers = {
+        INGESTION_TOPIC: lambda topic, data, attributes, message_id: invoke(
+            'data-ingestion', ingestion.ingest_data, pubsub_event(data, message_id, **attributes)),
+        ETL_TOPIC: lambda topic, data, attributes, message_id: invoke(
+            'etl-pipeline', etl.etl_pipeline, pubsub_event(data, message_id, **attributes)),
+        FINALIZE_TOPIC: lambda topic, data, attributes, message_id: invoke(
+            'data-validation', validation.validate_data, storage_event(**json.loads(data))),
+    }
+
+    results = []
+    capture = MetricsCapture(sys.stdout, echo=args.verbose)
+    queue.put(INGESTION_TOPIC, json.dumps({'trigger': 'local'}).encode('utf-8'))
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(capture):
+            queue.drain(handlers, on_result=lambda topic, result: results.append((topic, result)))
+    finally:
+        elapsed = time.perf_counter() - start
+        for kind in ('storage', 'bigquery', 'publisher'):
+            clients.set_factory(kind)
+
+    ingest_results = [result for topic, result in results if topic == INGESTION_TOPIC]
+    rows_loaded = warehouse.count('raw_sales')
+    report = {
+        'target_rows': args.rows,
+        'rows_ingested': sum(result.get('record_count', 0) for result in ingest_results
+                             if isinstance(result, dict)),
+        'rows_loaded': rows_loaded,
+        'summary_rows': warehouse.count('daily_summary'),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows_loaded / elapsed, 1) if elapsed > 0 else None,
+        'config': {
+            'raw_format': args.raw_format,
+            'shard_bytes': args.shard_bytes,
+            'streaming': args.streaming,
+            'transform_engine': args.transform_engine,
+            'load_format': args.load_format,
+            'micro_batch': args.micro_batch,
+        },
+        'messages': dict(queue.published),
+        'functions': summarize(invocations, key=lambda entry: entry['function']),
+        'stages': summarize(capture.stages, key=lambda entry: f"{entry['function']}/{entry['stage']}"),
+        'errors': [result for topic, result in results
+                   if isinstance(result, dict) and result.get('status') == 'error'],
+        'schema_drift': {table: columns for table, columns in warehouse.drift.items()},
+        'ddl_views_skipped': warehouse.skipped_views,
+        'peak_rss_mb': max((entry.get('process_peak_rss_mb') or 0 for entry in capture.invocations), default=None),
+    }
+    warehouse.close()
+    return report
+
+
+def print_report(report):
+    print("")
+    print(f"Target rows     : {report['target_rows']}")
+    print(f"Rows ingested   : {report['rows_ingested']}")
+    print(f"Rows loaded     : {report['rows_loaded']} (daily_summary: {report['summary_rows']} rows)")
+    print(f"Elapsed         : {report['elapsed_seconds']}s")
+    print(f"Throughput      : {report['rows_per_sec']} rows/sec end-to-end")
+    print(f"Peak RSS        : {report['peak_rss_mb']} MB")
+    print(f"Messages        : {json.dumps(report['messages'])}")
+    print("")
+
+    header = f"{'':32} {'count':>6} {'total ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'rows/sec':>12}"
+    for title, section in (('Function', report['functions']), ('Stage', report['stages'])):
+        print(f"{title:32}" + header[32:])
+        for name, stats in section.items():
+            rows_per_sec = stats['rows_per_sec'] if stats['rows_per_sec'] is not None else '-'
+            errors = f"  ({stats['errors']} errors)" if stats['errors'] else ''
+            print(f"  {name:30} {stats['count']:>6} {stats['total_ms']:>10} {stats['p50_ms']:>9} "
+                  f"{stats['p95_ms']:>9} {rows_per_sec:>12}{errors}")
+        print("")
+
+    for table, columns in report['schema_drift'].items():
+        print(f"Schema drift    : {table} loaded columns not in DDL: {', '.join(columns)}")
+    for error in report['errors']:
+        print(f"Error           : {error.get('message')}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the ingestion → validation → ETL pipeline locally')
+    parser.add_argument('--rows', type=int, default=10000, help='Sample rows per ingestion run')
+    parser.add_argument('--workdir', help='Folder bucket + warehouse (default: temp dir, dihapus setelah run)')
+    parser.add_argument('--ddl', default=os.path.join(os.path.dirname(FUNCTIONS_DIR), 'bigquery', 'schemas',
+                                                      'create_tables.sql'))
+    parser.add_argument('--raw-format', default=os.environ.get('RAW_FORMAT', 'json'),
+                        choices=['json', 'ndjson.gz', 'parquet'])
+    parser.add_argument('--shard-bytes', type=int, default=int(os.environ.get('RAW_SHARD_MAX_BYTES', '0')),
+                        help='RAW_SHARD_MAX_BYTES; 0 = satu blob per run')
+    parser.add_argument('--streaming', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('ETL_STREAMING', 'true').lower() == 'true')
+    parser.add_argument('--transform-engine', default=os.environ.get('ETL_TRANSFORM_ENGINE', 'dict'),
+                        choices=['dict', 'arrow'])
+    parser.add_argument('--load-format', default=os.environ.get('ETL_LOAD_FORMAT', 'json'),
+                        choices=['json', 'parquet'])
+    parser.add_argument('--micro-batch', action='store_true',
+                        default=os.environ.get('ETL_MICRO_BATCH', 'false').lower() == 'true')
+    parser.add_argument('--json', dest='json_path', help='Tulis report sebagai JSON ke file ini')
+    parser.add_argument('--verbose', action='store_true', help='Tampilkan log function dan stage')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='umkm-local-')
+    try:
+        report = run_pipeline(args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] or report['rows_loaded'] == 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
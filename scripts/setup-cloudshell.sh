@@ -123,7 +123,7 @@ print_info "Creating BigQuery tables..."
 # Raw sales table
 bq mk --table \
     --description="Raw sales data from ingestion" \
-    --time_partitioning_field=ingestion_date \
+    --time_partitioning_field=sale_date \
     $PROJECT_ID:$DATASET_ID.raw_sales \
     product_id:STRING,product_name:STRING,category:STRING,price:FLOAT,quantity:INTEGER,sale_date:DATE,ingestion_date:DATE \
     2>/dev/null && print_success "Created table: raw_sales" || print_info "Table raw_sales may already exist"
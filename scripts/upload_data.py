@@ -1,14 +1,18 @@
 
 import os
+import sys
 import pandas as pd
 from google.cloud import bigquery
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cloud-functions'))
+from shared.clients import get_bigquery_client  # noqa: E402
+
 # Config
 PROJECT_ID = 'ipsd-483408'
 DATASET_ID = 'umkm_analytics'
 
 def upload_table(file_path, table_name):
-    client = bigquery.Client(project=PROJECT_ID)
+    client = get_bigquery_client(PROJECT_ID)
     table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
     
     print(f"Reading {file_path}...")
@@ -1,8 +1,110 @@
+import os
+import sys
+
 import pytest
 
+# Shared modules (cloud-functions/shared) di-copy ke tiap function saat deploy;
+# untuk tests cukup tambahkan parent folder-nya ke path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../cloud-functions')))
+
+
 @pytest.fixture
 def sample_data():
     return {
         "product_id": "P1",
         "price": 100
     }
+
+
+class FakeBlob:
+    """Blob GCS in-memory: cukup untuk upload/download/open yang dipakai functions"""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+
+    def _store(self, payload, content_type=None):
+        self.bucket.objects[self.name] = (payload, dict(self.metadata or {}), content_type)
+        self.bucket.generations[self.name] = self.bucket.generations.get(self.name, 0) + 1
+
+    @property
+    def generation(self):
+        return self.bucket.generations.get(self.name)
+
+    @property
+    def md5_hash(self):
+        import base64
+        import hashlib
+
+        if self.name not in self.bucket.objects:
+            return None
+        return base64.b64encode(hashlib.md5(self.bucket.objects[self.name][0]).digest()).decode('ascii')
+
+    crc32c = None
+
+    def exists(self):
+        return self.name in self.bucket.objects
+
+    def reload(self):
+        self.metadata = self.bucket.objects[self.name][1]
+
+    def delete(self):
+        del self.bucket.objects[self.name]
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._store(data, content_type)
+
+    def download_as_bytes(self, **kwargs):
+        return self.bucket.objects[self.name][0]
+
+    def download_as_text(self, **kwargs):
+        return self.download_as_bytes().decode('utf-8')
+
+    def open(self, mode='r', content_type=None, ignore_flush=None, **kwargs):
+        import io
+
+        if mode.startswith('r'):
+            stream = io.BytesIO(self.download_as_bytes())
+            return stream if 'b' in mode else io.TextIOWrapper(stream, encoding='utf-8')
+
+        blob = self
+
+        class _Writer(io.BytesIO):
+            def close(self):
+                if not self.closed:
+                    blob._store(self.getvalue(), content_type)
+                super().close()
+
+        writer = _Writer()
+        return writer if 'b' in mode else io.TextIOWrapper(writer, encoding='utf-8')
+
+
+class FakeBucket:
+    def __init__(self, name='test-bucket'):
+        self.name = name
+        self.objects = {}
+        self.generations = {}
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        return FakeBlob(self, name) if name in self.objects else None
+
+    def copy_blob(self, blob, destination_bucket, new_name=None):
+        payload, metadata, content_type = self.objects[blob.name]
+        target = destination_bucket.blob(new_name or blob.name)
+        target.metadata = metadata
+        target._store(payload, content_type)
+        return target
+
+    def list_blobs(self, prefix=None):
+        return [FakeBlob(self, name) for name in sorted(self.objects) if not prefix or name.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_bucket():
+    return FakeBucket()
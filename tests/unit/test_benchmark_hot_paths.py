@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+
+from benchmark_hot_paths import CASES, DEFAULT_BASELINE, EXTRA_CASES, DEFAULT_SIZES, check, result_key, run_case
+from local_stack import FUNCTION_MODULES
+from shared import clients
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    for module_name in FUNCTION_MODULES.values():
+        monkeypatch.delitem(sys.modules, module_name, raising=False)
+    yield
+    clients.reset_clients()
+
+
+@pytest.mark.parametrize('case', CASES + EXTRA_CASES)
+def test_run_case_reports_time_per_row(isolated, case):
+    result = run_case(case, 200, repeat=1)
+
+    assert result['rows'] == 200
+    assert result['us_per_row'] > 0
+    assert result['rss_growth_mb'] >= 0
+
+
+def test_check_flags_time_and_memory_regressions():
+    baseline = {
+        'transform_data@100000': {'us_per_row': 2.0, 'rss_growth_mb': 50.0},
+        'validate_data@100000': {'us_per_row': 1.0, 'rss_growth_mb': 0.3},
+    }
+    results = {
+        'transform_data@100000': {'rows': 100000, 'us_per_row': 2.4, 'rss_growth_mb': 80.0},
+        # Memory kecil (noise allocator) tidak dibandingkan
+        'validate_data@100000': {'rows': 100000, 'us_per_row': 1.1, 'rss_growth_mb': 1.2},
+    }
+
+    failures = check(results, baseline, max_regression=25)
+
+    assert failures == ['transform_data@100000: memory regressed 50.0MB -> 80.0MB']
+    assert check(results, baseline, max_regression=10)[0].startswith('transform_data@100000: time regressed')
+
+
+def test_check_fails_without_baseline_entry():
+    results = {'dedup_filter@100000': {'rows': 100000, 'us_per_row': 9.0, 'rss_growth_mb': 0.1}}
+
+    assert check(results, {}, max_regression=25) == [
+        'dedup_filter@100000: no baseline entry (run with --save-baseline)'
+    ]
+
+
+def test_check_skips_sizes_below_gate():
+    # 1k rows hanya beberapa ms; noise mesin bisa lebih dari 25%
+    baseline = {'transform_data@1000': {'us_per_row': 2.56, 'rss_growth_mb': 0.5}}
+    results = {
+        'transform_data@1000': {'rows': 1000, 'us_per_row': 4.35, 'rss_growth_mb': 0.5},
+        'validate_data@1000': {'rows': 1000, 'us_per_row': 1.16, 'rss_growth_mb': 0.5},
+    }
+
+    assert check(results, baseline, max_regression=25) == []
+    assert len(check(results, baseline, max_regression=25, min_rows=1000)) == 2
+
+
+def test_committed_baseline_covers_default_cases():
+    with open(DEFAULT_BASELINE) as f:
+        baseline = json.load(f)
+
+    assert {result_key(case, rows) for case in CASES for rows in DEFAULT_SIZES} <= set(baseline)
+
+
+def test_check_needs_absolute_and_calibrated_slowdown():
+    baseline = {'dedup_filter@100000': {'us_per_row': 3.5, 'relative': 4.0, 'rss_growth_mb': 14.0}}
+    # Mesin lambat: us/row naik, tapi kalibrasi ikut melambat
+    noisy = {'dedup_filter@100000': {'rows': 100000, 'us_per_row': 4.5, 'relative': 4.1, 'rss_growth_mb': 14.0}}
+    slower = {'dedup_filter@100000': {'rows': 100000, 'us_per_row': 4.5, 'relative': 5.2, 'rss_growth_mb': 14.0}}
+
+    assert check(noisy, baseline, max_regression=25) == []
+    assert check(slower, baseline, max_regression=25) == [
+        'dedup_filter@100000: time regressed 3.5us/row -> 4.5us/row (4.0x -> 5.2x calibration)'
+    ]
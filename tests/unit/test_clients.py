@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+import pytest
+
+from shared import clients
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    clients.reset_clients()
+    yield
+    clients.reset_clients()
+
+
+def test_client_created_once_and_reused():
+    with patch.dict(clients._FACTORIES, {'storage': lambda project, location, **options: object()}):
+        first = clients.get_storage_client('proj-a')
+        second = clients.get_storage_client('proj-a')
+        other = clients.get_storage_client('proj-b')
+
+    assert first is second
+    assert other is not first
+    assert clients.client_stats()['storage'] == {'created': 2, 'reused': 1}
+
+
+def test_unknown_client_kind():
+    with pytest.raises(ValueError):
+        clients.get_client('spanner')
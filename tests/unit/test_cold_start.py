@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+
+from benchmark_cold_start import DEFAULT_BASELINE, ENTRY_POINTS, check, measure_once
+
+
+@pytest.mark.parametrize('function_name', sorted(ENTRY_POINTS))
+def test_cold_start_does_not_load_gcp_sdks(function_name):
+    result = measure_once(function_name)
+
+    assert result['heavy_modules'] == []
+    assert set(result['first_call_ms']) == set(ENTRY_POINTS[function_name])
+
+
+def test_check_flags_regression_against_baseline():
+    results = {'etl-pipeline': {'import_ms': 40.0, 'first_call_ms': {'health_check': 0.1}, 'heavy_modules': []}}
+    baseline = {'etl-pipeline': {'import_ms': 20.0, 'first_call_ms': {'health_check': 0.1}}}
+
+    failures = check(results, baseline, max_import_ms=200, max_first_call_ms=50, max_regression=25)
+
+    assert failures == ['etl-pipeline: import regressed 20.0ms -> 40.0ms']
+
+
+def test_check_fails_without_baseline_entry():
+    results = {'etl-pipeline': {'import_ms': 40.0, 'first_call_ms': {'health_check': 0.1}, 'heavy_modules': []}}
+
+    assert check(results, {}, max_import_ms=200, max_first_call_ms=50, max_regression=25) == [
+        'etl-pipeline: no baseline entry (run with --save-baseline)'
+    ]
+    # --no-baseline: hanya threshold absolut
+    assert check(results, None, max_import_ms=200, max_first_call_ms=50, max_regression=25) == []
+
+
+def test_check_ignores_millisecond_noise():
+    results = {'etl-pipeline': {'import_ms': 6.5, 'first_call_ms': {'health_check': 0.3}, 'heavy_modules': []}}
+    baseline = {'etl-pipeline': {'import_ms': 4.8, 'first_call_ms': {'health_check': 0.1}}}
+
+    assert check(results, baseline, max_import_ms=200, max_first_call_ms=50, max_regression=25) == []
+
+
+def test_committed_baseline_covers_entry_points():
+    with open(DEFAULT_BASELINE) as f:
+        baseline = json.load(f)
+
+    for function_name, entry_points in ENTRY_POINTS.items():
+        assert set(entry_points) <= set(baseline[function_name]['first_call_ms'])
@@ -0,0 +1,167 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+from shared.raw_format import iter_raw_records, read_metadata, write_raw_blob
+
+VALIDATION_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../cloud-functions/data-validation'))
+
+
+class Event:
+    def __init__(self, bucket, name):
+        self.data = {'bucket': bucket, 'name': name}
+
+
+@pytest.fixture
+def validation(fake_bucket, monkeypatch):
+    # main.py data-validation di-load dengan nama unik ('main' dipakai data-ingestion)
+    monkeypatch.syspath_prepend(VALIDATION_DIR)
+    spec = importlib.util.spec_from_file_location('validation_main', os.path.join(VALIDATION_DIR, 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, 'validation_main', module)
+    spec.loader.exec_module(module)
+
+    class Client:
+        def bucket(self, name):
+            return fake_bucket
+
+    monkeypatch.setattr(module, 'get_storage_client', lambda project=None: Client())
+    return module
+
+
+def make_records(count, invalid_every=0):
+    records = []
+    for i in range(count):
+        record = {'product_id': f'P{i:06d}', 'price': 1000 + i, 'product_name': f'Produk {i}', 'category': 'Fashion'}
+        if invalid_every and i % invalid_every == 0:
+            del record['price']
+        records.append(record)
+    return records
+
+
+def test_validate_streams_blob_and_reports_rates(validation, fake_bucket):
+    write_raw_blob(fake_bucket.blob('raw/a.ndjson.gz'), make_records(3000, invalid_every=100), {}, 'ndjson.gz')
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/a.ndjson.gz'))
+
+    assert result['status'] == 'success'
+    assert result['verdict'] == 'invalid'
+    assert (result['valid_records'], result['invalid_records']) == (2970, 30)
+    assert result['rules'] == {'missing_price': 30}
+    assert result['stopped_early'] is False
+    assert result['bytes_read'] == len(fake_bucket.objects['raw/a.ndjson.gz'][0])
+    assert result['records_per_sec'] > 0 and result['bytes_per_sec'] > 0
+
+
+def test_validate_stops_early_at_invalid_threshold(validation, fake_bucket, monkeypatch):
+    monkeypatch.setattr(validation, 'VALIDATION_MAX_INVALID', 5)
+    monkeypatch.setattr(validation, 'VALIDATION_CLEAN_COPY', True)
+    write_raw_blob(fake_bucket.blob('raw/b.json'), make_records(50000, invalid_every=2), {'ingestion_id': 'T'}, 'json')
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/b.json'))
+
+    assert result['stopped_early'] is True
+    assert result['invalid_records'] == 5
+    assert result['valid_records'] == 4
+    # Hanya window pertama parser yang terbaca, bukan seluruh file
+    assert result['bytes_read'] < len(fake_bucket.objects['raw/b.json'][0]) / 2
+    # Clean copy parsial dibuang
+    assert result['clean_blob'] is None
+    assert not any(name.startswith('clean/') for name in fake_bucket.objects)
+
+
+def test_validate_rejects_json_envelope_without_metadata(validation, fake_bucket):
+    fake_bucket.blob('raw/c.json').upload_from_string(json.dumps({'data': make_records(3)}))
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/c.json'))
+
+    assert result['status'] == 'error'
+    assert 'metadata' in result['message']
+
+
+def test_validate_quarantines_invalid_records_and_writes_clean_copy(validation, fake_bucket, monkeypatch):
+    monkeypatch.setattr(validation, 'QUARANTINE_BATCH_SIZE', 100)
+    monkeypatch.setattr(validation, 'VALIDATION_CLEAN_COPY', True)
+    write_raw_blob(fake_bucket.blob('raw/d.json'), make_records(1000, invalid_every=2), {'ingestion_id': 'T'}, 'json')
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/d.json'))
+
+    assert result['quarantine']['records'] == 500
+    assert result['quarantine']['files'] == 5
+    quarantined = sorted(name for name in fake_bucket.objects if name.startswith('quarantine/'))
+    assert quarantined[0].startswith('quarantine/reason=missing_price/date=')
+    assert quarantined[0].endswith('/d-00000.ndjson.gz')
+    assert sum(len(list(iter_raw_records(fake_bucket.blob(name)))) for name in quarantined) == 500
+
+    clean = fake_bucket.blob(result['clean_blob'])
+    assert result['clean_blob'] == 'clean/d.ndjson.gz'
+    assert [r['product_id'] for r in iter_raw_records(clean)] == [f'P{i:06d}' for i in range(1, 1000, 2)]
+    assert read_metadata(clean) == {'ingestion_id': 'T'}
+
+    # Output quarantine/clean sendiri tidak divalidasi ulang
+    assert validation.validate_data(Event(fake_bucket.name, result['clean_blob']))['status'] == 'skipped'
+
+
+def test_validate_only_triggers_on_raw_folder(validation, fake_bucket):
+    write_raw_blob(fake_bucket.blob('raw/h.ndjson.gz'), make_records(10), {}, 'ndjson.gz')
+    for name in ('state/api.json', 'state/api.snapshot.parquet', 'ledger/raw/h.ndjson.gz@1.json',
+                 'ingestion-stats/T.json'):
+        fake_bucket.blob(name).upload_from_string('{}')
+
+        assert validation.validate_data(Event(fake_bucket.name, name))['status'] == 'skipped'
+
+    assert validation.validate_data(Event(fake_bucket.name, 'raw/h.ndjson.gz'))['status'] == 'success'
+    # Clean copy opt-in (VALIDATION_CLEAN_COPY); snapshot parquet tidak di-quarantine
+    assert not any(name.startswith(('clean/', 'quarantine/')) for name in fake_bucket.objects)
+
+
+def test_validate_reuses_cached_result_for_identical_content(validation, fake_bucket, monkeypatch):
+    monkeypatch.setattr(validation, 'VALIDATION_CLEAN_COPY', True)
+    write_raw_blob(fake_bucket.blob('raw/e.ndjson.gz'), make_records(100, invalid_every=10), {}, 'ndjson.gz')
+    first = validation.validate_data(Event(fake_bucket.name, 'raw/e.ndjson.gz'))
+    fake_bucket.copy_blob(fake_bucket.blob('raw/e.ndjson.gz'), fake_bucket, 'raw/copy/e.ndjson.gz')
+
+    # Cache hit tidak boleh membaca isi object
+    monkeypatch.setattr(validation, 'iter_raw_records', lambda *args, **kwargs: pytest.fail('object downloaded'))
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/copy/e.ndjson.gz'))
+
+    assert first['cache'] == 'miss'
+    assert result['cache'] == 'hit'
+    assert result['cached_from'] == {'file_name': 'raw/e.ndjson.gz', 'generation': 1}
+    assert (result['verdict'], result['invalid_records'], result['rules']) == ('invalid', 10, {'missing_price': 10})
+    assert result['clean_blob'] == 'clean/copy/e.ndjson.gz'
+    assert fake_bucket.objects['clean/copy/e.ndjson.gz'][0] == fake_bucket.objects['clean/e.ndjson.gz'][0]
+
+
+def test_validate_cache_misses_on_changed_content(validation, fake_bucket):
+    write_raw_blob(fake_bucket.blob('raw/f.ndjson.gz'), make_records(100), {}, 'ndjson.gz')
+    validation.validate_data(Event(fake_bucket.name, 'raw/f.ndjson.gz'))
+    write_raw_blob(fake_bucket.blob('raw/f.ndjson.gz'), make_records(100, invalid_every=10), {}, 'ndjson.gz')
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/f.ndjson.gz'))
+
+    assert result['cache'] == 'miss'
+    assert (result['generation'], result['invalid_records']) == (2, 10)
+
+
+def test_validate_writes_profile_sidecar(validation, fake_bucket):
+    write_raw_blob(fake_bucket.blob('raw/g.ndjson.gz'), make_records(500, invalid_every=5), {}, 'ndjson.gz')
+
+    result = validation.validate_data(Event(fake_bucket.name, 'raw/g.ndjson.gz'))
+
+    assert result['profile_blob'] == 'raw/g.ndjson.gz.profile.json'
+    profile = json.loads(fake_bucket.objects[result['profile_blob']][0])
+    assert (profile['records'], profile['complete'], profile['generation']) == (500, True, 1)
+    # Kolom profile = field record yang di-ingest, bukan kolom DDL raw_sales
+    assert set(profile['columns']) == set().union(*make_records(500))
+    price = profile['columns']['price']
+    assert price['type'] == 'INT64'
+    assert (price['nulls'], price['min'], price['max']) == (100, 1001, 1499)
+    assert profile['columns']['product_id']['distinct'] == pytest.approx(500, rel=0.05)
+    assert profile['columns']['category']['distinct'] == 1
+
+    # Sidecar sendiri tidak divalidasi ulang
+    assert validation.validate_data(Event(fake_bucket.name, result['profile_blob']))['status'] == 'skipped'
@@ -0,0 +1,287 @@
+import gzip
+import importlib.util
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+ETL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../cloud-functions/etl-pipeline'))
+
+
+def load_module(name, filename):
+    """
+    Load module ETL langsung dari file; folder ETL tidak ditambahkan ke sys.path
+    karena 'main' sudah dipakai oleh data-ingestion
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ETL_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+NdjsonGzipStream = load_module('stream_load', 'stream_load.py').NdjsonGzipStream
+
+
+def load_etl_main():
+    for filename in sorted(os.listdir(ETL_DIR)):
+        if filename.endswith('.py') and filename != 'main.py':
+            load_module(filename[:-3], filename)
+    return load_module('etl_main', 'main.py')
+
+
+RECORDS = [
+    {'product_id': f'P{i}', 'product_name': f' Produk {i} ', 'price': 1000 + i, 'sales_count': i % 7}
+    for i in range(2500)
+]
+
+
+def test_ndjson_gzip_stream_reads_in_small_pieces():
+    stream = NdjsonGzipStream(iter(RECORDS), chunk_size=100)
+
+    pieces = []
+    while True:
+        piece = stream.read(4096)
+        if not piece:
+            break
+        pieces.append(piece)
+
+    lines = gzip.decompress(b''.join(pieces)).decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == RECORDS
+    assert stream.records == len(RECORDS)
+    assert stream.tell() == sum(len(p) for p in pieces)
+
+
+def test_stream_to_bigquery_matches_batch_transform(fake_bucket, mocker):
+    from shared.raw_format import write_raw_blob
+
+    etl = load_etl_main()
+    records = RECORDS + [{'product_id': 'P-deleted', 'change_type': 'delete'}]
+    write_raw_blob(fake_bucket.blob('raw/x.ndjson.gz'), records, {'ingestion_id': 'T'}, 'ndjson.gz')
+
+    uploaded = {}
+
+    def load_table_from_file(stream, table_ref, job_config=None):
+        uploaded['body'] = stream.read(1 << 20) + stream.read()
+        return MagicMock()
+
+    storage = MagicMock()
+    storage.bucket.return_value = fake_bucket
+    bigquery = MagicMock()
+    bigquery.load_table_from_file.side_effect = load_table_from_file
+    mocker.patch.object(etl, 'get_storage_client', return_value=storage)
+    mocker.patch.object(etl, 'get_bigquery_client', return_value=bigquery)
+
+    counts = etl.stream_to_bigquery('test-bucket', 'raw/x.ndjson.gz', 'raw_sales', chunk_size=300)
+
+    streamed = [json.loads(line) for line in gzip.decompress(uploaded['body']).splitlines()]
+    assert streamed == etl.transform_data({'data': records})
+    assert counts['transformed'] == len(RECORDS)
+    assert counts['skipped_deletes'] == 1
+
+
+def test_columnar_transform_matches_dict_transform():
+    import pyarrow as pa
+
+    etl = load_etl_main()
+    from columnar_transform import transform_columnar
+
+    records = [
+        {'product_id': 'P1', 'product_name': '  Kopi Gayo ', 'category': 'Minuman', 'price': 25000,
+         'original_price': 30000, 'discount_percent': 16, 'sales_count': 12, 'rating': 4.5,
+         'review_count': 7, 'stock': 40, 'seller_name': 'Toko A', 'seller_location': 'Aceh'},
+        {'product_id': 123, 'product_name': 'Keripik', 'price': '15000.5', 'sales_count': '3', 'rating': 4},
+        {'product_id': 'P3', 'product_name': 'Batik', 'price': 99.9, 'sales_count': 2.7},
+        {'product_id': 'P4', 'change_type': 'delete'},
+        {'product_id': 'P5', 'product_name': 'Tas', 'category': 'Fashion', 'price': 120000,
+         'stock': 5, 'change_type': 'update'},
+    ]
+    expected = etl.transform_data({'data': [dict(r) for r in records]})
+
+    from_records = transform_columnar([dict(r) for r in records], today=expected[0]['sale_date'])
+    assert from_records.to_pylist() == expected
+
+    rows = [r for r in records if r['product_id'] != 123]
+    keys = dict.fromkeys(key for row in rows for key in row)
+    table = pa.table({key: [row.get(key) for row in rows] for key in keys})
+    from_table = transform_columnar(table, today=expected[0]['sale_date'])
+    assert from_table.to_pylist() == [e for e in expected if e['product_id'] != '123']
+
+
+def test_load_to_bigquery_parquet_uses_raw_sales_types(mocker):
+    import datetime
+
+    import pyarrow.parquet as pq
+
+    etl = load_etl_main()
+    records = etl.transform_data({'data': RECORDS[:50]})
+
+    uploaded = {}
+
+    def load_table_from_file(buffer, table_ref, job_config=None):
+        uploaded['table'] = pq.read_table(buffer)
+        uploaded['config'] = job_config
+        return MagicMock(started=None, ended=None)
+
+    bigquery = MagicMock()
+    bigquery.load_table_from_file.side_effect = load_table_from_file
+    mocker.patch.object(etl, 'get_bigquery_client', return_value=bigquery)
+
+    stats = etl.load_to_bigquery(records, 'raw_sales', load_format='parquet')
+
+    table = uploaded['table']
+    assert uploaded['config'].source_format == 'PARQUET'
+    assert str(table.schema.field('sale_date').type) == 'date32[day]'
+    assert str(table.schema.field('sales_count').type) == 'int64'
+    assert table.column('revenue').to_pylist() == [r['revenue'] for r in records]
+    assert table.column('sale_date')[0].as_py() == datetime.date.fromisoformat(records[0]['sale_date'])
+    assert stats['format'] == 'parquet' and stats['rows'] == 50 and stats['upload_bytes'] > 0
+
+
+def make_event(payload):
+    import base64
+
+    event = MagicMock()
+    event.data = {'message': {'data': base64.b64encode(json.dumps(payload).encode()).decode()}}
+    return event
+
+
+def write_micro_batch_blobs(fake_bucket, mocker, etl):
+    from shared.raw_format import write_raw_blob
+
+    for i, raw_format in enumerate(['json', 'ndjson.gz', 'parquet']):
+        write_raw_blob(fake_bucket.blob(f'raw/2024/part-{i}.{raw_format}'),
+                       RECORDS[i * 10:(i + 1) * 10], {'ingestion_id': f'T{i}'}, raw_format)
+    fake_bucket.blob('raw/2024/manifest.json').upload_from_string('{}')
+
+    storage = MagicMock()
+    storage.bucket.return_value = fake_bucket
+    storage.list_blobs.side_effect = lambda bucket, prefix: [
+        fake_bucket.blob(name) for name in fake_bucket.objects if name.startswith(prefix)
+    ]
+    mocker.patch.object(etl, 'get_storage_client', return_value=storage)
+    return mocker.patch.object(etl, 'generate_daily_summary')
+
+
+def test_micro_batch_prefix_issues_one_atomic_load_job(fake_bucket, mocker):
+    etl = load_etl_main()
+    summary = write_micro_batch_blobs(fake_bucket, mocker, etl)
+    load = mocker.patch.object(etl, 'load_to_bigquery')
+
+    result = etl.etl_pipeline(make_event({'prefix': 'raw/2024/'}))
+
+    assert result['status'] == 'success'
+    assert result['blob_count'] == 3
+    assert result['load_jobs'] == 1
+    assert load.call_count == 1
+    assert len(load.call_args[0][0]) == 30
+    summary.assert_called_once_with(result['sale_dates'])
+    # Ledger hanya ditulis setelah load job sukses
+    assert sorted(name for name in fake_bucket.objects if name.startswith('ledger/')) == [
+        'ledger/raw/2024/part-0.json@1.json', 'ledger/raw/2024/part-1.ndjson.gz@1.json',
+        'ledger/raw/2024/part-2.parquet@1.json',
+    ]
+
+
+def test_micro_batch_failed_load_leaves_ledger_empty(fake_bucket, mocker):
+    etl = load_etl_main()
+    write_micro_batch_blobs(fake_bucket, mocker, etl)
+    mocker.patch.object(etl, 'load_to_bigquery', side_effect=RuntimeError('load failed'))
+
+    result = etl.etl_pipeline(make_event({'prefix': 'raw/2024/'}))
+
+    assert result['status'] == 'error'
+    assert not any(name.startswith('ledger/') for name in fake_bucket.objects)
+
+
+def test_micro_batch_honours_transform_engine_and_streaming(fake_bucket, mocker):
+    import pyarrow as pa
+
+    etl = load_etl_main()
+    write_micro_batch_blobs(fake_bucket, mocker, etl)
+    load = mocker.patch.object(etl, 'load_to_bigquery')
+    blob_names = etl.list_raw_blobs('test-bucket', 'raw/2024/')
+
+    mocker.patch.object(etl, 'ETL_TRANSFORM_ENGINE', 'arrow')
+    result = etl.run_micro_batch('test-bucket', blob_names)
+    assert isinstance(load.call_args[0][0], pa.Table)
+    assert load.call_args[0][0].num_rows == result['records_processed'] == 30
+
+    stream = mocker.patch.object(etl, 'stream_to_bigquery', return_value={
+        'blob_rows': {name: 10 for name in blob_names}, 'sale_dates': {'2024-01-01'}})
+    mocker.patch.object(etl, 'ETL_STREAMING', True)
+    result = etl.run_micro_batch('test-bucket', blob_names)
+    stream.assert_called_once_with('test-bucket', blob_names, 'raw_sales')
+    assert (result['load_jobs'], result['sale_dates']) == (1, ['2024-01-01'])
+    assert load.call_count == 1
+
+
+def test_stream_to_bigquery_streams_many_blobs_into_one_load_job(fake_bucket, mocker):
+    from shared.raw_format import write_raw_blob
+
+    etl = load_etl_main()
+    for i in range(2):
+        write_raw_blob(fake_bucket.blob(f'raw/s{i}.ndjson.gz'), RECORDS[i * 100:(i + 1) * 100], {}, 'ndjson.gz')
+    storage = MagicMock()
+    storage.bucket.return_value = fake_bucket
+    bigquery = MagicMock()
+    bigquery.load_table_from_file.side_effect = lambda stream, table_ref, job_config=None: stream.read() and MagicMock()
+    mocker.patch.object(etl, 'get_storage_client', return_value=storage)
+    mocker.patch.object(etl, 'get_bigquery_client', return_value=bigquery)
+
+    counts = etl.stream_to_bigquery('test-bucket', ['raw/s0.ndjson.gz', 'raw/s1.ndjson.gz'], 'raw_sales')
+
+    assert bigquery.load_table_from_file.call_count == 1
+    assert counts['blob_rows'] == {'raw/s0.ndjson.gz': 100, 'raw/s1.ndjson.gz': 100}
+
+
+def test_daily_summary_merges_only_touched_partitions(mocker):
+    import datetime
+
+    etl = load_etl_main()
+    job = MagicMock(total_bytes_processed=1024, total_bytes_billed=10485760, num_dml_affected_rows=2)
+    bigquery = MagicMock()
+    bigquery.query.return_value = job
+    mocker.patch.object(etl, 'get_bigquery_client', return_value=bigquery)
+
+    stats = etl.generate_daily_summary({'2024-01-02', '2024-01-01', '2024-01-02'})
+
+    query, = bigquery.query.call_args[0]
+    job_config = bigquery.query.call_args[1]['job_config']
+    assert query.strip().startswith('MERGE')
+    assert query.count('.raw_sales`') == 1
+    assert job_config.query_parameters[0].values == [datetime.date(2024, 1, 1), datetime.date(2024, 1, 2)]
+    assert stats['dates'] == ['2024-01-01', '2024-01-02']
+    assert stats['bytes_processed'] == 1024
+    assert etl.generate_daily_summary(set()) is False
+
+
+def test_ledger_skips_redelivered_blob_unless_forced(fake_bucket, mocker):
+    from shared.raw_format import write_raw_blob
+
+    etl = load_etl_main()
+    write_raw_blob(fake_bucket.blob('raw/x.json'), RECORDS[:20], {'ingestion_id': 'T'}, 'json')
+
+    storage = MagicMock()
+    storage.bucket.return_value = fake_bucket
+    mocker.patch.object(etl, 'get_storage_client', return_value=storage)
+    mocker.patch.object(etl, 'ETL_STREAMING', False)
+    load = mocker.patch.object(etl, 'load_to_bigquery')
+    mocker.patch.object(etl, 'generate_daily_summary')
+
+    first = etl.etl_pipeline(make_event({'blob_name': 'raw/x.json'}))
+    second = etl.etl_pipeline(make_event({'blob_name': 'raw/x.json'}))
+
+    assert first['status'] == 'success'
+    assert second['status'] == 'already_processed'
+    assert second['records_processed'] == 20
+    assert load.call_count == 1
+
+    forced = etl.etl_pipeline(make_event({'blob_name': 'raw/x.json', 'force': True}))
+    assert forced['status'] == 'success'
+    assert load.call_count == 2
+
+    # Blob ditulis ulang (generation baru) diproses lagi tanpa force
+    write_raw_blob(fake_bucket.blob('raw/x.json'), RECORDS[:5], {'ingestion_id': 'T2'}, 'json')
+    assert etl.etl_pipeline(make_event({'blob_name': 'raw/x.json'}))['status'] == 'success'
+    assert load.call_count == 3
@@ -1,3 +1,4 @@
+import json
 import pytest
 import sys
 import os
@@ -21,3 +22,328 @@ def test_ingest_data_success(mock_cloud_event):
         with patch('main.publish_message') as mock_publish:
             response = ingest_data(mock_cloud_event)
             assert response['status'] == 'success'
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Session palsu yang melayani offset/cursor pagination dari list in-memory"""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls.append(dict(params or {}))
+        limit = params['limit']
+        if 'offset' in params:
+            start = params['offset']
+            return FakeResponse({'data': self.records[start:start + limit]})
+        start = int(params.get('cursor', 0))
+        end = start + limit
+        next_cursor = str(end) if end < len(self.records) else None
+        return FakeResponse({'data': self.records[start:end], 'next_cursor': next_cursor})
+
+
+def test_fetch_pages_offset_concurrent_in_order():
+    from source_api import FetchStats, fetch_pages
+
+    records = [{'product_id': f'P{i}'} for i in range(250)]
+    stats = FetchStats()
+    pages = list(fetch_pages('http://api', mode='offset', page_size=100, max_in_flight=3,
+                             session=FakeSession(records), stats=stats))
+
+    assert [len(p) for p in pages] == [100, 100, 50]
+    assert [r for p in pages for r in p] == records
+    assert stats.records == 250
+    assert stats.as_dict()['records_per_sec'] >= 0
+
+
+def test_fetch_pages_cursor():
+    from source_api import fetch_pages
+
+    records = [{'product_id': f'P{i}'} for i in range(25)]
+    session = FakeSession(records)
+    pages = list(fetch_pages('http://api', mode='cursor', page_size=10, session=session))
+
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert len(session.calls) == 3
+
+
+def test_batch_publisher_does_not_block_and_logs_failures():
+    from concurrent.futures import Future
+
+    from shared.publisher import BatchPublisher
+
+    client = Mock()
+    client.topic_path.side_effect = lambda project, topic: f'projects/{project}/topics/{topic}'
+    futures = []
+
+    def fake_publish(topic_path, data):
+        future = Future()
+        futures.append(future)
+        return future
+
+    client.publish.side_effect = fake_publish
+    publisher = BatchPublisher('proj', max_messages=10)
+    publisher._client = client
+
+    for i in range(3):
+        publisher.publish('etl-trigger', {'blob_name': f'raw/{i}.json'})
+
+    # Belum ada future yang selesai: publish() tidak menunggu
+    assert client.publish.call_count == 3
+    futures[0].set_result('m0')
+    futures[1].set_exception(RuntimeError('boom'))
+    futures[2].set_result('m2')
+
+    result = publisher.flush()
+    assert result['published'] == 2
+    assert result['failed'] == 1
+    assert result['message_ids'] == ['m0', 'm2']
+
+
+def test_batch_publisher_counts_timed_out_messages_as_failed():
+    from concurrent.futures import Future
+
+    from shared.publisher import BatchPublisher
+
+    client = Mock()
+    pending = Future()
+    client.publish.side_effect = [pending, Future()]
+    publisher = BatchPublisher('proj')
+    publisher._client = client
+    publisher.publish('etl-trigger', {'blob_name': 'raw/a.json'})
+    publisher.publish('etl-trigger', {'blob_name': 'raw/b.json'}).set_result('m1')
+
+    result = publisher.flush(timeout=0.05)
+
+    assert (result['published'], result['failed'], result['timed_out']) == (1, 1, 1)
+
+
+class ConditionalSession:
+    """Source API palsu dengan filter updated_since dan ETag"""
+
+    def __init__(self, records, etag='"v1"'):
+        self.records = records
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append((dict(params or {}), dict(headers or {})))
+        response = Mock()
+        response.headers = {'ETag': self.etag}
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            return response
+        since = (params or {}).get('updated_since', '')
+        response.status_code = 200
+        response.json.return_value = [r for r in self.records if r['updated_at'] > since]
+        return response
+
+
+def test_fetch_incremental_uses_watermark_and_etag():
+    import main
+
+    records = [
+        {'product_id': 'P1', 'product_name': 'A', 'price': 1, 'category': 'X', 'updated_at': '2024-01-01T00:00:00'},
+        {'product_id': 'P2', 'product_name': 'B', 'price': 2, 'category': 'X', 'updated_at': '2024-01-03T00:00:00'},
+    ]
+    session = ConditionalSession(records)
+
+    with patch('source_api.get_session', return_value=session):
+        data, fetched, _, state = main.fetch_incremental('http://api', None, {})
+        assert fetched == 2
+        assert state['watermark'] == '2024-01-03T00:00:00'
+        assert state['etag'] == '"v1"'
+
+        # Run berikutnya: ETag sama → 304, tidak ada record
+        data, fetched, _, state = main.fetch_incremental('http://api', None, state)
+        assert fetched == 0
+        assert session.requests[-1][0] == {'updated_since': '2024-01-03T00:00:00'}
+
+        # Full refresh mengabaikan watermark dan ETag
+        data, fetched, _, _ = main.fetch_incremental('http://api', None, state, full_refresh=True)
+        assert fetched == 2
+        assert session.requests[-1][0] == {}
+
+
+def test_fetch_incremental_fallback_watermark_overlaps_fetch_start():
+    from datetime import datetime, timedelta, timezone
+
+    import main
+
+    records = [{'product_id': 'P1', 'product_name': 'A', 'price': 1, 'category': 'X', 'updated_at': '2024-01-01'}]
+    session = ConditionalSession(records)
+
+    before = datetime.now(timezone.utc)
+    # Records tanpa field updated (API_UPDATED_FIELD) dan tanpa sync cursor
+    with patch('source_api.get_session', return_value=session), patch.object(main, 'API_UPDATED_FIELD', 'modified_at'), \
+            patch.object(main, 'API_PAGINATION', 'none'), patch.object(main, 'API_WATERMARK_OVERLAP', 600):
+        _, _, _, state = main.fetch_incremental('http://api', None, {})
+
+    watermark = datetime.fromisoformat(state['watermark'])
+    assert before - timedelta(seconds=600) <= watermark <= datetime.now(timezone.utc) - timedelta(seconds=600)
+    assert main.INCREMENTAL_INGESTION is False
+
+
+def test_snapshot_diff_emits_only_changes(fake_bucket):
+    from snapshot_diff import diff_snapshot, load_index, save_index
+
+    first = [
+        {'product_id': 'P1', 'price': 100.0, 'stock': 5, 'timestamp': 't1'},
+        {'product_id': 'P2', 'price': 200.0, 'stock': 1, 'timestamp': 't1'},
+        {'product_id': 'P3', 'price': 300.0, 'stock': 0, 'timestamp': 't1'},
+    ]
+    changes, index, stats = diff_snapshot(first, {})
+    assert stats['insert'] == 3
+    save_index(fake_bucket, 'state/api.snapshot.parquet', index)
+
+    second = [
+        {'product_id': 'P1', 'price': 100.0, 'stock': 5, 'timestamp': 't2'},
+        {'product_id': 'P2', 'price': 150.0, 'stock': 1, 'timestamp': 't2'},
+        {'product_id': 'P4', 'price': 400.0, 'stock': 9, 'timestamp': 't2'},
+    ]
+    changes, index, stats = diff_snapshot(second, load_index(fake_bucket, 'state/api.snapshot.parquet'))
+
+    assert {(c['product_id'], c['change_type']) for c in changes} == {
+        ('P2', 'update'), ('P4', 'insert'), ('P3', 'delete')
+    }
+    assert stats['unchanged'] == 1
+    assert stats['diff_ratio'] == 1.0
+    assert set(index) == {'P1', 'P2', 'P4'}
+
+
+class ScriptedSession:
+    """Session yang mengembalikan status code sesuai skrip"""
+
+    def __init__(self, statuses, delays=None, headers=None):
+        self.statuses = list(statuses)
+        self.delays = list(delays or [])
+        self.headers = headers or {}
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        import time
+
+        index = self.calls
+        self.calls += 1
+        if index < len(self.delays):
+            time.sleep(self.delays[index])
+        response = Mock()
+        response.status_code = self.statuses[min(index, len(self.statuses) - 1)]
+        response.headers = self.headers
+        return response
+
+
+def make_executor(**kwargs):
+    from request_executor import AdaptiveTokenBucket, RequestExecutor
+
+    clock = {'now': 0.0}
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock['now'] += seconds
+
+    executor = RequestExecutor(sleep=fake_sleep, **kwargs)
+    executor.limiter = AdaptiveTokenBucket(10, clock=lambda: clock['now'], sleep=fake_sleep)
+    return executor, sleeps
+
+
+def test_executor_retries_throttled_requests_and_honours_retry_after():
+    executor, sleeps = make_executor(hedge=False, max_retries=3)
+    session = ScriptedSession([429, 429, 200], headers={'Retry-After': '2'})
+
+    response = executor.get(session, 'http://api')
+
+    assert response.status_code == 200
+    assert executor.retries == 2
+    assert executor.throttled == 2
+    assert executor.limiter.rate < 10
+    assert sum(sleeps) >= 4
+    assert executor.summary()['requests'] == 3
+
+
+def test_executor_circuit_breaker_counts_failed_requests_not_attempts():
+    import pytest
+    from request_executor import CircuitOpenError
+
+    executor, _ = make_executor(hedge=False, max_retries=2, failure_threshold=2, cooldown=60)
+    session = ScriptedSession([503])
+
+    # Satu request dengan retry habis = satu kegagalan; breaker belum open
+    assert executor.get(session, 'http://api').status_code == 503
+    assert executor.breaker.state == 'closed'
+    assert executor.get(session, 'http://api').status_code == 503
+
+    with pytest.raises(CircuitOpenError):
+        executor.get(session, 'http://api')
+    assert session.calls == 6
+
+
+def test_executor_hedges_slow_requests():
+    executor, _ = make_executor(hedge=True, hedge_min_samples=3)
+    executor.latencies = [0.01, 0.01, 0.01]
+    session = ScriptedSession([200], delays=[0.5])
+
+    response = executor.get(session, 'http://api')
+    executor.close()
+
+    assert response.status_code == 200
+    assert executor.hedged == 1
+    assert executor.hedge_wins == 1
+    # Primary + hedge masing-masing memakai satu token
+    assert executor.limiter.tokens == pytest.approx(8)
+
+
+def test_executor_skips_hedge_without_rate_limit_token():
+    from request_executor import AdaptiveTokenBucket
+
+    executor, _ = make_executor(hedge=True, hedge_min_samples=3)
+    executor.limiter = AdaptiveTokenBucket(1, clock=lambda: 0.0, sleep=lambda seconds: None)
+    executor.latencies = [0.01, 0.01, 0.01]
+    session = ScriptedSession([200], delays=[0.2])
+
+    response = executor.get(session, 'http://api')
+    executor.close()
+
+    assert response.status_code == 200
+    assert session.calls == 1
+    assert (executor.hedged, executor.hedge_skipped) == (0, 1)
+
+
+def test_ingest_keeps_detailed_stats_out_of_blob_metadata(fake_bucket, monkeypatch):
+    import main
+    from shared.raw_format import METADATA_KEY
+
+    class Client:
+        def bucket(self, name):
+            return fake_bucket
+
+    monkeypatch.setattr(main, 'get_storage_client', lambda project=None: Client())
+    monkeypatch.setattr(main, 'RAW_FORMAT', 'ndjson.gz')
+    monkeypatch.setattr(main, 'SNAPSHOT_DIFF', True)
+
+    with patch('main.publish_message'), patch('main.flush_messages'):
+        result = main.ingest_data(Mock(data={}))
+
+    assert result['status'] == 'success'
+    stats_blob = [name for name in fake_bucket.objects if name.startswith('ingestion-stats/')]
+    assert stats_blob == [f"ingestion-stats/{result['ingestion_id']}.json"]
+    metadata = json.loads(fake_bucket.objects[result['blob_name']][1][METADATA_KEY])
+    assert metadata['stats_blob'] == stats_blob[0]
+    assert 'snapshot_diff' not in metadata
+    diff_stats = json.loads(fake_bucket.objects[stats_blob[0]][0])['snapshot_diff']
+    # Diff ratio + jumlah changed/unchanged tetap terbaca tanpa membaca stats_blob
+    assert metadata['diff_ratio'] == diff_stats['diff_ratio'] == 1.0
+    assert (metadata['changed_count'], metadata['unchanged_count']) == (metadata['record_count'], 0)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+
+from load_test_etl import parse_args, run_load_test, saturation_point, summarize_level
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    monkeypatch.setattr(os, 'environ', dict(os.environ))
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    monkeypatch.delitem(sys.modules, 'ingestion_main', raising=False)
+
+
+def test_load_test_replays_events_against_etl_workers(isolated, tmp_path):
+    args = parse_args(['--events', '3', '--concurrency', '2', '--rows-per-blob', '50',
+                       '--gcs-latency-ms', '0', '--gcs-latency-jitter-ms', '0',
+                       '--bq-latency-ms', '5', '--bq-latency-jitter-ms', '0'])
+
+    report = run_load_test(args, str(tmp_path))
+
+    level = report['levels'][0]
+    assert level['events'] == 3
+    assert level['errors'] == 0
+    assert level['rows_per_sec'] > 0
+    assert {'bq_load', 'summary'} <= set(level['stage_p95_ms'])
+    assert report['saturation_concurrency'] == 2
+
+
+def test_summarize_level_and_saturation_point():
+    outcomes = [
+        {'status': 'success', 'message': None, 'rows': 10, 'latency_ms': float(ms), 'stages': [('bq_load', 5.0)]}
+        for ms in range(1, 100)
+    ] + [{'status': 'error', 'message': 'boom', 'rows': 0, 'latency_ms': 100.0, 'stages': []}]
+
+    level = summarize_level(4, outcomes, elapsed=2.0)
+
+    assert level['events_per_sec'] == 50.0
+    assert level['error_rate'] == 0.01
+    assert level['error_samples'] == ['boom']
+    assert level['p50_ms'] == 50.5
+    assert saturation_point([
+        {'concurrency': 1, 'events_per_sec': 1.0},
+        {'concurrency': 4, 'events_per_sec': 3.7},
+        {'concurrency': 8, 'events_per_sec': 4.0},
+    ]) == 4
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+
+from local_stack import FUNCTION_MODULES
+from run_local_pipeline import parse_args, run_pipeline
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    # Runner men-set env var dan me-load main.py tiap function; jangan bocor ke test lain
+    monkeypatch.setattr(os, 'environ', dict(os.environ))
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    for module_name in FUNCTION_MODULES.values():
+        monkeypatch.delitem(sys.modules, module_name, raising=False)
+
+
+@pytest.mark.parametrize('extra_args', [
+    [],
+    ['--raw-format', 'ndjson.gz', '--shard-bytes', '40000', '--micro-batch'],
+    ['--raw-format', 'parquet', '--no-streaming', '--transform-engine', 'arrow', '--load-format', 'parquet'],
+])
+def test_local_pipeline_runs_end_to_end(isolated, tmp_path, extra_args):
+    report = run_pipeline(parse_args(['--rows', '300'] + extra_args), str(tmp_path))
+
+    assert report['errors'] == []
+    assert report['rows_ingested'] == 300
+    assert report['rows_loaded'] == 300
+    assert report['summary_rows'] == 1
+    assert report['functions']['data-validation']['count'] >= 1
+    assert report['stages']['etl-pipeline/summary']['count'] == 1
+    # ETL me-load record produk; raw_sales di create_tables.sql masih schema transaksi
+    assert 'revenue' in report['schema_drift']['raw_sales']
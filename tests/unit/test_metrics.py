@@ -0,0 +1,76 @@
+import io
+import json
+import time
+
+import pytest
+
+from shared.metrics import instrumented, span, start_invocation, end_invocation
+
+
+def test_spans_emit_structured_json_with_exclusive_durations():
+    stream = io.StringIO()
+    start_invocation('etl-pipeline', invocation_id='inv-1', stream=stream)
+    with span('load_gcs') as outer:
+        time.sleep(0.02)
+        with span('transform') as inner:
+            time.sleep(0.02)
+            inner.set(rows=10, nbytes=2048)
+        outer.set(rows=10)
+    end_invocation('success')
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    transform, load_gcs, invocation = entries
+
+    assert transform['event'] == 'pipeline_stage'
+    assert transform['stage'] == 'transform'
+    assert transform['rows'] == 10 and transform['bytes'] == 2048
+    assert transform['invocation_id'] == 'inv-1'
+    assert load_gcs['wall_ms'] >= load_gcs['duration_ms'] + transform['duration_ms'] - 1
+    assert invocation['event'] == 'pipeline_invocation'
+    assert set(invocation['stage_ms']) == {'load_gcs', 'transform'}
+    assert invocation['status'] == 'success'
+
+
+def test_instrumented_marks_failed_stage_and_invocation(capsys):
+    @instrumented('data-ingestion')
+    def handler():
+        with span('fetch'):
+            raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        handler()
+
+    entries = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(e['event'], e['status']) for e in entries] == [
+        ('pipeline_stage', 'error'), ('pipeline_invocation', 'error')
+    ]
+    assert entries[0]['severity'] == 'ERROR'
+
+
+def test_concurrent_invocations_keep_their_own_stages():
+    import threading
+
+    barrier = threading.Barrier(2)
+    streams = {}
+
+    def handler(name):
+        streams[name] = io.StringIO()
+        start_invocation(name, invocation_id=name, stream=streams[name])
+        with span(f'{name}-stage'):
+            # Kedua invocation aktif bersamaan di proses yang sama
+            barrier.wait(timeout=5)
+        end_invocation('success')
+
+    threads = [threading.Thread(target=handler, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name, stream in streams.items():
+        stage, invocation = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert (stage['invocation_id'], stage['stage']) == (name, f'{name}-stage')
+        assert invocation['stage_ms'].keys() == {f'{name}-stage'}
+        # Memory per stage bukan high-water mark proses
+        assert 'peak_rss_mb' not in stage and 'rss_delta_mb' in stage
+        assert 'process_peak_rss_mb' in invocation
@@ -0,0 +1,110 @@
+import os
+import sys
+
+import numpy as np
+
+from shared.profiling import (
+    HyperLogLog, ProfileBuilder, QuantileSketch, hash_strings, merge_profiles, write_profile
+)
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../scripts')))
+
+from merge_profiles import merge_daily  # noqa: E402
+
+COLUMNS = [('product_id', 'STRING'), ('price', 'NUMERIC'), ('rating', 'FLOAT64')]
+
+
+def make_records(start, count):
+    return [
+        {'product_id': f'P{i:06d}', 'price': float(i % 1000), 'rating': None if i % 4 == 0 else 4.5}
+        for i in range(start, start + count)
+    ]
+
+
+def profile_of(records, **details):
+    builder = ProfileBuilder(COLUMNS, batch_size=1000)
+    for _ in builder.observe(records):
+        pass
+    return builder.to_dict(**details)
+
+
+def test_hll_and_quantile_sketch_accuracy():
+    hll = HyperLogLog()
+    hll.add_hashes(hash_strings([f'seller-{i % 50000}' for i in range(200000)]))
+    assert abs(hll.estimate() - 50000) / 50000 < 0.05
+
+    values = np.random.default_rng(7).uniform(0, 1000, 100000)
+    sketch = QuantileSketch(seed=7)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+    for name, fraction in (('p05', 0.05), ('p50', 0.5), ('p95', 0.95)):
+        assert abs(sketch.quantiles()[name] - np.quantile(values, fraction)) < 20
+    assert sum(len(items) for items in sketch.levels) < 3 * 128 * 2
+
+
+def test_hash_strings_is_stable_for_long_values():
+    short = hash_strings(['a', 'b', 'a'])
+    assert short[0] == short[2] and short[0] != short[1]
+    long_values = ['x' * 1000, 'y' * 1000, 'x' * 1000]
+    hashed = hash_strings(long_values)
+    assert hashed[0] == hashed[2] and hashed[0] != hashed[1]
+
+
+def test_merge_profiles_matches_single_pass():
+    first, second = make_records(0, 6000), make_records(6000, 4000)
+
+    merged = merge_profiles([profile_of(first, source='a'), profile_of(second, source='b')], date='2024-01-01')
+    single = profile_of(first + second)
+
+    assert merged['records'] == single['records'] == 10000
+    assert merged['sources'] == ['a', 'b']
+    for name in ('product_id', 'price', 'rating'):
+        for key in ('count', 'nulls', 'min', 'max'):
+            assert merged['columns'][name][key] == single['columns'][name][key]
+    assert merged['columns']['rating']['nulls'] == 2500
+    assert merged['columns']['price']['mean'] == single['columns']['price']['mean']
+    assert abs(merged['columns']['product_id']['distinct'] - 10000) / 10000 < 0.05
+    assert abs(merged['columns']['price']['quantiles']['p50'] - 500) < 25
+
+
+def test_merge_daily_groups_sidecars_by_date(fake_bucket):
+    class Client:
+        def bucket(self, name):
+            return fake_bucket
+
+        def list_blobs(self, bucket_name, prefix=None):
+            return fake_bucket.list_blobs(prefix=prefix)
+
+    write_profile(fake_bucket.blob('raw/a.ndjson.gz.profile.json'), profile_of(make_records(0, 100), date='2024-01-01'))
+    write_profile(fake_bucket.blob('raw/b.ndjson.gz.profile.json'), profile_of(make_records(100, 50), date='2024-01-01'))
+    write_profile(fake_bucket.blob('raw/c.ndjson.gz.profile.json'),
+                  profile_of(make_records(0, 10), date='2024-01-01', complete=False))
+    write_profile(fake_bucket.blob('raw/d.ndjson.gz.profile.json'), profile_of(make_records(0, 10), date='2024-01-02'))
+
+    report = merge_daily(Client(), fake_bucket.name)
+
+    assert [(day['date'], day['sidecars'], day['records']) for day in report['dates']] == [
+        ('2024-01-01', 2, 150), ('2024-01-02', 1, 10)
+    ]
+    assert report['skipped_partial'] == 1
+    assert 'profiles/daily/date=2024-01-01.json' in fake_bucket.objects
+
+
+def test_profile_builder_discovers_columns_from_records():
+    records = make_records(0, 30)
+    for i, record in enumerate(records):
+        record['seller_name'] = f'Seller {i % 3}'
+        if i >= 20:
+            record['stock'] = i
+    builder = ProfileBuilder(batch_size=10)
+    for _ in builder.observe(records):
+        pass
+    profile = builder.to_dict()
+
+    assert list(profile['columns']) == ['product_id', 'price', 'rating', 'seller_name', 'stock']
+    assert {name: column['type'] for name, column in profile['columns'].items()} == {
+        'product_id': 'STRING', 'price': 'FLOAT64', 'rating': 'FLOAT64', 'seller_name': 'STRING', 'stock': 'INT64',
+    }
+    # stock baru muncul di batch ketiga; records sebelumnya dihitung null
+    assert (profile['columns']['stock']['count'], profile['columns']['stock']['nulls']) == (30, 20)
+    assert profile['columns']['seller_name']['distinct'] == 3
@@ -0,0 +1,71 @@
+import pytest
+
+from shared.raw_format import raw_blob_name, read_raw_blob, write_raw_blob
+
+RECORDS = [
+    {'product_id': f'PROD{i:05d}', 'product_name': f'Produk {i}', 'price': float(i * 1000), 'sales_count': i}
+    for i in range(25)
+]
+METADATA = {'ingestion_id': 'ING_TEST', 'record_count': len(RECORDS)}
+
+
+@pytest.mark.parametrize('raw_format', ['json', 'ndjson.gz', 'parquet'])
+def test_roundtrip_all_formats(fake_bucket, raw_format):
+    name = raw_blob_name('raw', '20240101_000000', raw_format)
+    write_raw_blob(fake_bucket.blob(name), RECORDS, METADATA, raw_format=raw_format, chunk_size=10)
+
+    envelope = read_raw_blob(fake_bucket.blob(name))
+
+    assert envelope['metadata'] == METADATA
+    assert envelope['data'] == RECORDS
+
+
+def test_compressed_blob_smaller_than_json(fake_bucket):
+    for raw_format in ('json', 'ndjson.gz'):
+        write_raw_blob(fake_bucket.blob(raw_blob_name('raw', 'x', raw_format)), RECORDS, METADATA, raw_format)
+
+    json_size = len(fake_bucket.objects['raw/x.json'][0])
+    gz_size = len(fake_bucket.objects['raw/x.ndjson.gz'][0])
+    assert gz_size < json_size / 2
+
+
+def test_write_shards_respects_size_limit_and_writes_manifest(fake_bucket):
+    from shared.sharding import estimate_record_bytes, read_manifest, write_shards
+
+    records = [dict(r) for r in RECORDS * 8]
+    max_bytes = estimate_record_bytes(records) * 30
+
+    manifest = write_shards(fake_bucket, 'raw/20240101_000000', records, METADATA,
+                            raw_format='ndjson.gz', max_bytes=max_bytes, max_workers=3)
+
+    assert len(manifest['shards']) == 7
+    assert [s['row_count'] for s in manifest['shards']][:6] == [30] * 6
+    assert manifest['total_rows'] == len(records)
+
+    stored = read_manifest(fake_bucket, manifest['manifest_name'])
+    rows = []
+    for shard in stored['shards']:
+        envelope = read_raw_blob(fake_bucket.blob(shard['name']))
+        assert envelope['metadata']['shard_count'] == 7
+        rows.extend(envelope['data'])
+    assert rows == records
+
+
+def test_json_envelope_is_parsed_incrementally():
+    import io
+    import json
+
+    from shared.raw_format import _JsonEnvelopeReader
+
+    document = json.dumps({'metadata': {'data': [1, 2]}, 'data': RECORDS, 'extra': 123456789}, indent=2)
+    reader = _JsonEnvelopeReader(io.StringIO(document), read_size=7)
+
+    assert list(reader.records()) == RECORDS
+    assert len(reader.buffer) < 200
+
+
+def test_blob_metadata_over_gcs_limit_is_rejected(fake_bucket):
+    metadata = dict(METADATA, stats=['x' * 100] * 100)
+
+    with pytest.raises(ValueError, match='metadata too large'):
+        write_raw_blob(fake_bucket.blob('raw/big.ndjson.gz'), RECORDS, metadata, raw_format='ndjson.gz')
@@ -0,0 +1,130 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pyarrow as pa
+import pytest
+
+from shared.schema import Column, TableSchema, apply_rules, bq_schema_string, get_schema, load_schema, parse_ddl
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+DDL = """
+    -- comment; with semicolon
+    CREATE TABLE IF NOT EXISTS `ds.t` (
+        id STRING NOT NULL,
+        amount NUMERIC(10, 2) OPTIONS(description='Nominal'),
+        score INT64,
+        created DATE DEFAULT CURRENT_DATE()
+    )
+    PARTITION BY created
+    OPTIONS(description='x');
+    CREATE OR REPLACE VIEW `ds.v` AS SELECT 1;
+"""
+
+RULES = {'ranges': {'amount': (0, None), 'score': (1, 5)}}
+
+
+def _table_schema():
+    tables, _ = parse_ddl(DDL)
+    return TableSchema('t', apply_rules('t', tables['t'], RULES))
+
+
+def test_parse_ddl_reads_not_null_and_defaults():
+    tables, views = parse_ddl(DDL)
+
+    assert tables == {'t': [
+        Column('id', 'STRING', True, None, None, None),
+        Column('amount', 'NUMERIC', False, None, None, None),
+        Column('score', 'INT64', False, None, None, None),
+        Column('created', 'DATE', False, 'CURRENT_DATE()', None, None),
+    ]}
+    assert views == ['v']
+
+
+def test_apply_rules_sets_ranges_and_required_fields():
+    tables, _ = parse_ddl(DDL)
+
+    columns = apply_rules('t', tables['t'], {'required': ('amount',), 'ranges': {'score': (1, 5)}})
+
+    assert [c.name for c in columns if c.required] == ['amount']
+    assert columns[2] == Column('score', 'INT64', False, None, 1.0, 5.0)
+    with pytest.raises(ValueError):
+        apply_rules('t', tables['t'], {'ranges': {'rating': (1, 5)}})
+
+
+@pytest.mark.parametrize('record,reason', [
+    ({'id': 'a', 'amount': 10, 'score': 3, 'created': '2024-01-01'}, None),
+    ({'id': 7, 'amount': '10.5', 'score': '4'}, None),
+    ({'amount': 10}, 'missing_id'),
+    ({'id': 'a', 'amount': 'abc'}, 'invalid_amount'),
+    ({'id': 'a', 'amount': True}, 'invalid_amount'),
+    ({'id': 'a', 'amount': -1}, 'out_of_range_amount'),
+    ({'id': 'a', 'amount': float('nan')}, 'out_of_range_amount'),
+    ({'id': 'a', 'score': 4.5}, 'invalid_score'),
+    ({'id': 'a', 'score': 6}, 'out_of_range_score'),
+    ({'id': 'a', 'created': '01/01/2024'}, 'invalid_created'),
+    ({'id': ['a']}, 'invalid_id'),
+])
+def test_compiled_validator_reason_codes(record, reason):
+    assert _table_schema().validate(record) == reason
+
+
+def test_validate_batch_and_filter_table_report_rejects():
+    schema = _table_schema()
+    records = [{'id': 'a', 'amount': 1.0}, {'id': 'b', 'amount': -2.0}, {'id': None, 'amount': 3.0}]
+
+    accepted, report = schema.validate_batch(records, id_field='id')
+    table, table_report = schema.filter_table(pa.Table.from_pylist(records), id_field='id')
+
+    assert accepted == records[:1]
+    assert report == {'total': 3, 'accepted': 1, 'rejected': 2,
+                      'rules': {'out_of_range_amount': 1, 'missing_id': 1},
+                      'sample_ids': {'out_of_range_amount': ['b'], 'missing_id': ['unknown']}}
+    assert table.to_pylist() == accepted
+    assert table_report == report
+
+
+def test_repo_ddl_compiles_raw_sales_and_reviews():
+    raw_sales = get_schema('raw_sales')
+
+    assert raw_sales.required == ('product_id', 'product_name', 'category', 'price')
+    assert raw_sales.validate({'product_id': 'P1', 'product_name': 'A', 'category': 'X',
+                               'price': 1000.0, 'discount_percent': 150}) == 'out_of_range_discount_percent'
+    assert get_schema('tokopedia_reviews').validate({'review_id': 'R1', 'rating': 0}) == 'out_of_range_rating'
+
+
+def test_embedded_ddl_matches_create_tables_sql():
+    from shared.schema_ddl import SOURCE, SQL
+
+    with open(os.path.join(ROOT_DIR, SOURCE)) as f:
+        assert SQL == f.read()
+
+
+def test_load_schema_is_single_source_for_raw_sales():
+    # deploy-free-tier.sh membuat tabel dari LOAD_SCHEMAS, bukan daftar kolom sendiri
+    with open(os.path.join(ROOT_DIR, 'scripts', 'deploy-free-tier.sh')) as f:
+        deploy = f.read()
+    assert "bq_schema_string('raw_sales')" in deploy
+    assert 'revenue:FLOAT' not in deploy
+
+    assert bq_schema_string('raw_sales').startswith('product_id:STRING,product_name:STRING,')
+    assert ('revenue', 'FLOAT') in load_schema('raw_sales')
+    with pytest.raises(KeyError):
+        load_schema('daily_summary')
+
+
+def test_deployed_shared_compiles_schema_without_repo(tmp_path):
+    # Sama seperti source Cloud Function: hanya shared/ tanpa folder bigquery/
+    shutil.copytree(os.path.join(ROOT_DIR, 'cloud-functions', 'shared'), tmp_path / 'shared')
+    env = {key: value for key, value in os.environ.items() if key != 'SCHEMA_DDL_PATH'}
+    env['PYTHONPATH'] = str(tmp_path)
+
+    result = subprocess.run(
+        [sys.executable, '-c', "from shared.schema import get_schema; print(get_schema('raw_sales').required)"],
+        cwd=tmp_path, env=env, capture_output=True, text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "('product_id', 'product_name', 'category', 'price')"
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../cloud-functions/data-ingestion')))
+
+from main import generate_sample_data, validate_data
+
+
+def make_records():
+    return [
+        {'product_id': 'P1', 'product_name': 'A', 'price': 1000, 'category': 'Fashion', 'sales_count': 3},
+        {'product_id': 'P2', 'product_name': 'B', 'price': '2500', 'category': 'Fashion'},
+        {'product_id': 'P3', 'product_name': 'C', 'price': 'abc', 'category': 'Fashion', 'sales_count': 1},
+        {'product_id': 'P4', 'product_name': 'D', 'price': 10},
+        {'product_id': 'P5', 'price': 10, 'category': 'Makanan', 'sales_count': 2},
+    ]
+
+
+def test_validate_data_reject_report(caplog):
+    accepted = validate_data(make_records())
+
+    assert [r['product_id'] for r in accepted] == ['P1', 'P2']
+    assert accepted[0]['price'] == 1000.0
+    assert accepted[1]['price'] == 2500.0
+    assert accepted[1]['sales_count'] == 0
+    # Satu warning ringkas, bukan satu per bad row
+    warnings = [r.getMessage() for r in caplog.records if r.levelname == 'WARNING']
+    assert len(warnings) == 1
+    assert '"missing_category": 1' in warnings[0]
+    assert '"missing_product_name": 1' in warnings[0]
+    assert '"invalid_price": ["P3"]' in warnings[0]
+
+
+def test_validate_data_applies_ddl_ranges():
+    records = [
+        {'product_id': 'P1', 'product_name': 'A', 'price': 1000, 'category': 'Fashion', 'sales_count': 3},
+        {'product_id': 'P2', 'product_name': 'B', 'price': -5, 'category': 'Fashion', 'sales_count': 3},
+        {'product_id': 'P3', 'product_name': 'C', 'price': 10, 'category': 'Fashion', 'sales_count': -1},
+    ]
+
+    # sales_count tidak ada di DDL raw_sales, jadi tidak punya range
+    assert [r['product_id'] for r in validate_data(records)] == ['P1', 'P3']
+
+
+def _row_loop(data):
+    """validate_data sebelum reject report"""
+    required_fields = ['product_id', 'product_name', 'price', 'category']
+    validated = []
+    for item in data:
+        if all(field in item for field in required_fields):
+            item['price'] = float(item.get('price', 0))
+            item['sales_count'] = int(item.get('sales_count', 0))
+            validated.append(item)
+    return validated
+
+
+def test_validate_data_matches_row_loop_on_clean_data():
+    records = generate_sample_data(num_products=500)
+
+    assert validate_data([dict(r) for r in records]) == _row_loop([dict(r) for r in records])